@@ -0,0 +1,83 @@
+"""
+Recall-vs-latency report for the product index backends.
+
+Encodes a synthetic catalog once, builds every index type on the same
+embeddings and compares recall@k against the exact flat index.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_ann --products 50000 --queries 500
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from benchmarks.catalog import make_products
+from utils.index_factory import build_index, search_params
+from utils.vector_store import ProductVectorStore
+
+CONFIGS = [
+    ("flat", {}),
+    ("ivf_flat", {"nprobe": 1}),
+    ("ivf_flat", {"nprobe": 8}),
+    ("ivf_flat", {"nprobe": 32}),
+    ("ivf_pq", {"nprobe": 8}),
+    ("ivf_pq", {"nprobe": 32}),
+    ("hnsw", {"ef_search": 16}),
+    ("hnsw", {"ef_search": 64}),
+    ("hnsw", {"ef_search": 256}),
+]
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    products = list(make_products(args.products + args.queries))
+    texts = [ProductVectorStore._product_text(p) for p in products]
+    embeddings = np.asarray(model.encode(texts, batch_size=256), dtype='float32')
+    base, queries = embeddings[:args.products], embeddings[args.products:]
+
+    exact = faiss.IndexFlatL2(base.shape[1])
+    exact.add(base)
+    _, truth = exact.search(queries, args.k)
+
+    built = {}
+    print(f"{'index':>10} {'params':>16} {'build s':>8} {'recall@k':>9} {'ms/query':>9}")
+    for index_type, tuning in CONFIGS:
+        if index_type not in built:
+            start = time.perf_counter()
+            index = build_index(index_type, base)
+            index.add(base)
+            built[index_type] = (index, time.perf_counter() - start)
+        index, build_time = built[index_type]
+        params = search_params(index, **tuning)
+
+        # One query at a time, like the /products endpoint
+        found = np.empty_like(truth)
+        start = time.perf_counter()
+        for i, query in enumerate(queries):
+            _, I = index.search(query[None, :], args.k, params=params)
+            found[i] = I[0]
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        label = ",".join(f"{k}={v}" for k, v in tuning.items()) or "-"
+        print(f"{index_type:>10} {label:>16} {build_time:>8.2f} "
+              f"{recall_at_k(found, truth):>9.3f} {elapsed_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
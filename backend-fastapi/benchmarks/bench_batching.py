@@ -0,0 +1,56 @@
+"""
+Throughput of concurrent product queries with and without micro-batching.
+
+Runs many concurrent asearch() calls (no LLM summary) against the product
+store, once with batching disabled (max batch size 1) and once per
+configured batch size.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_batching --clients 64 --requests 2000
+    python -m benchmarks.bench_batching --batch-sizes 1 8 32 64 --max-wait-ms 1 2 5
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+
+from utils.vector_store import vector_store
+
+QUERIES = ["tumbler", "mug", "cup price", "thunder blue", "ceramic mug", "all day cup"]
+
+
+async def run(clients: int, requests: int) -> float:
+    counter = itertools.count()
+
+    async def client():
+        while (i := next(counter)) < requests:
+            # Unique queries so the embedding cache does not hide the encode cost
+            await vector_store.asearch(f"{QUERIES[i % len(QUERIES)]} {i}", summarize=False)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[2.0])
+    args = parser.parse_args()
+
+    batcher = vector_store.batcher
+    print(f"{'batch size':>10} {'wait ms':>8} {'req/s':>9} {'avg batch':>10}")
+    for batch_size, wait_ms in itertools.product(args.batch_sizes, args.max_wait_ms):
+        batcher.max_batch_size, batcher.max_wait = batch_size, wait_ms / 1000
+        batcher.batches = batcher.queries = 0
+        throughput = asyncio.run(run(args.clients, args.requests))
+        print(f"{batch_size:>10} {wait_ms:>8.1f} {throughput:>9.1f} "
+              f"{batcher.stats()['avg_batch_size']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
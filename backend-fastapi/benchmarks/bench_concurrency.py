@@ -0,0 +1,80 @@
+"""
+/calculate latency while /products is under load.
+
+Drives the FastAPI app in-process on one event loop (like a single uvicorn
+worker). First measures /calculate alone, then again while a pool of
+clients keeps /products busy.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_concurrency --clients 32 --probes 200
+    python -m benchmarks.bench_concurrency --summarize   # include the Groq summary
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+from main import app
+
+QUERIES = ["tumbler", "mug", "cup price", "thunder blue", "ceramic mug", "all day cup"]
+
+
+async def probe_calculate(client: httpx.AsyncClient, probes: int):
+    latencies = []
+    for i in range(probes):
+        start = time.perf_counter()
+        response = await client.post("/calculate", json={"num1": i, "operator": "+", "num2": 1})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def products_load(client: httpx.AsyncClient, stop: asyncio.Event, summarize: bool, counter: list):
+    rng = random.Random()
+    while not stop.is_set():
+        # Unique suffix so the query embedding cache does not hide the encode cost
+        query = f"{rng.choice(QUERIES)} {rng.randrange(1_000_000)}"
+        await client.post("/products", json={"query": query, "summarize": summarize})
+        counter[0] += 1
+
+
+def report(label: str, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"{label:>22} {statistics.median(latencies):>9.2f} {p99:>9.2f} {latencies[-1]:>9.2f}")
+
+
+async def run(clients: int, probes: int, summarize: bool):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"{'/calculate latency':>22} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        report("idle", await probe_calculate(client, probes))
+
+        stop, counter = asyncio.Event(), [0]
+        load = [asyncio.create_task(products_load(client, stop, summarize, counter)) for _ in range(clients)]
+        start = time.perf_counter()
+        latencies = await probe_calculate(client, probes)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*load)
+        report(f"{clients} /products clients", latencies)
+        print(f"/products throughput during run: {counter[0] / elapsed:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--summarize", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.probes, args.summarize))
+
+
+if __name__ == "__main__":
+    main()
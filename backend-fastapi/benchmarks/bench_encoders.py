@@ -0,0 +1,76 @@
+"""
+Compare encoder backends: query latency, batch throughput and retrieval
+agreement with the full-precision torch model.
+
+Agreement is measured on a fixed query set over the mock catalog plus a
+synthetic one: for each backend, the overlap of its top-k products with the
+torch model's top-k, and the cosine similarity of the query embeddings.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_encoders
+    python -m benchmarks.bench_encoders --backends torch int8 onnx --onnx-file onnx/model_qint8_avx512_vnni.onnx
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.catalog import make_products
+from data.mock_data import MOCK_PRODUCTS
+from utils.encoders import ENCODER_BACKENDS, create_encoder
+from utils.vector_store import ProductVectorStore
+
+QUERIES = [
+    "tumbler", "mug", "cup price", "thunder blue", "ceramic mug", "all day cup",
+    "all-can tumbler", "cup for hot and cold drinks", "cheap drinkware", "green cup",
+    "something to keep my coffee hot", "flip top lid bottle", "aqua collection",
+    "mountain collection", "gift for a coffee lover", "stainless steel", "16oz mug",
+    "500ml cup", "cloud white mug", "space black", "ocean breeze", "tumbler for the gym",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS))
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-file", default=None)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    catalog = MOCK_PRODUCTS + list(make_products(args.products))
+    texts = [ProductVectorStore._product_text(p) for p in catalog]
+
+    baseline = None
+    print(f"{'backend':>8} {'ms/query':>9} {'texts/s':>9} {'top-k overlap':>14} {'query cosine':>13}")
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        encoder = create_encoder(backend, args.model, onnx_file=args.onnx_file if backend == "onnx" else None)
+        encoder.encode(QUERIES[:2])  # warm up
+
+        start = time.perf_counter()
+        query_embeddings = np.vstack([encoder.encode([q]) for q in QUERIES])
+        latency_ms = (time.perf_counter() - start) * 1000 / len(QUERIES)
+
+        start = time.perf_counter()
+        product_embeddings = encoder.encode(texts, batch_size=64)
+        throughput = len(texts) / (time.perf_counter() - start)
+
+        index = faiss.IndexFlatL2(product_embeddings.shape[1])
+        index.add(product_embeddings)
+        _, top = index.search(query_embeddings, args.k)
+
+        if baseline is None:
+            baseline = (top, query_embeddings)
+            overlap, cosine = 1.0, 1.0
+        else:
+            overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top, baseline[0])])
+            a, b = query_embeddings, baseline[1]
+            cosine = np.mean(np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)))
+        print(f"{backend:>8} {latency_ms:>9.2f} {throughput:>9.0f} {overlap:>14.3f} {cosine:>13.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark bulk product ingestion into ProductVectorStore.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_ingest --sizes 10000 100000
+
+Pass --legacy to also time the one-product-at-a-time path
+(add_product per item, which rewrites the index on every call).
+"""
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.catalog import make_products
+from utils.vector_store import ProductVectorStore
+
+
+def time_bulk(n: int, batch_size: int) -> float:
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = ProductVectorStore(data_dir=data_dir)
+        start = time.perf_counter()
+        store.add_products(make_products(n), batch_size=batch_size)
+        return time.perf_counter() - start
+
+
+def time_legacy(n: int) -> float:
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = ProductVectorStore(data_dir=data_dir)
+        start = time.perf_counter()
+        for product in make_products(n):
+            store.add_product(product)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--legacy", action="store_true", help="also time per-product add_product")
+    args = parser.parse_args()
+
+    print(f"{'products':>10} {'path':>8} {'seconds':>10} {'products/s':>12}")
+    for n in args.sizes:
+        elapsed = time_bulk(n, args.batch_size)
+        print(f"{n:>10} {'bulk':>8} {elapsed:>10.2f} {n / elapsed:>12.0f}")
+        if args.legacy:
+            elapsed = time_legacy(n)
+            print(f"{n:>10} {'legacy':>8} {elapsed:>10.2f} {n / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Nearest-outlet search: full scan vs R*Tree bounding box plus haversine rerank.
+
+Seeds a temporary database with synthetic outlets spread over the Klang
+Valley (outlets_rtree is filled in by the triggers), then answers random
+"k nearest within radius" queries both ways, checks that they agree, and
+reports the median latency and candidate count.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_nearby --outlets 20000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Rough Klang Valley bounds
+LAT_RANGE = (2.85, 3.35)
+LON_RANGE = (101.35, 101.85)
+
+
+def seed(engine, n: int):
+    from sqlalchemy import text
+
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO outlets (name, address, opening_time, closing_time, services, latitude, longitude) "
+                 "VALUES (:name, :address, '08:00', '22:00', '[]', :latitude, :longitude)"),
+            [
+                {
+                    "name": f"ZUS Coffee - Bench {i}",
+                    "address": f"{i}, Jalan Bench, Selangor",
+                    "latitude": rng.uniform(*LAT_RANGE),
+                    "longitude": rng.uniform(*LON_RANGE),
+                }
+                for i in range(n)
+            ],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--outlets", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--radius-km", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["OUTLETS_DB_PATH"] = os.path.join(tmp, "bench.db")
+        from sqlalchemy import text
+        from utils import database
+        from utils.geo import BOUNDING_BOX_SQL, bounding_box, nearest
+
+        database.init_db(seed=False)
+        seed(database.engine, args.outlets)
+        rng = random.Random(1)
+        points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(args.queries)]
+        scan_ms, rtree_ms, candidates = [], [], []
+        with database.engine.connect() as conn:
+            for lat, lon in points:
+                start = time.perf_counter()
+                rows = [dict(row._mapping) for row in conn.execute(
+                    text("SELECT * FROM outlets WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+                )]
+                expected = nearest(rows, lat, lon, args.k, args.radius_km)
+                scan_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                rows = [dict(row._mapping) for row in conn.execute(
+                    text(BOUNDING_BOX_SQL), bounding_box(lat, lon, args.radius_km)
+                )]
+                found = nearest(rows, lat, lon, args.k, args.radius_km)
+                rtree_ms.append((time.perf_counter() - start) * 1000)
+                candidates.append(len(rows))
+
+                assert [row["id"] for _, row in found] == [row["id"] for _, row in expected]
+
+        print(f"{args.outlets} outlets, k={args.k}, radius={args.radius_km} km, {args.queries} queries")
+        print(f"{'method':<22} {'p50 ms':>8} {'candidates':>11}")
+        print(f"{'full scan':<22} {statistics.median(scan_ms):>8.2f} {args.outlets:>11}")
+        print(f"{'rtree + haversine':<22} {statistics.median(rtree_ms):>8.2f} {statistics.median(candidates):>11.0f}")
+        database.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Service filters: JSON-string LIKE scan vs the indexed outlet_services table.
+
+Seeds a temporary database with synthetic outlets (the outlet_services
+rows are filled in by the triggers), then times each service filter in both
+forms and prints the query plans.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_outlet_services --outlets 50000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# (listed name, share of outlets offering it)
+SERVICES = [("Dine-in", 0.9), ("Takeaway", 0.8), ("No-contact delivery", 0.3), ("Drive-Thru", 0.02)]
+CODES = {"Dine-in": "dine-in", "Takeaway": "takeaway", "No-contact delivery": "delivery", "Drive-Thru": "drive-thru"}
+
+LIKE_SQL = "SELECT * FROM outlets WHERE json_extract(services, '$') LIKE :term"
+INDEXED_SQL = "SELECT * FROM outlets WHERE id IN (SELECT outlet_id FROM outlet_services WHERE code = :code)"
+
+
+def seed(engine, n: int):
+    from sqlalchemy import text
+
+    rng = random.Random(0)
+    rows = [
+        {
+            "name": f"ZUS Coffee - Bench {i}",
+            "address": f"{i}, Jalan Bench, Selangor",
+            "services": json.dumps([name for name, share in SERVICES if rng.random() < share]),
+        }
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO outlets (name, address, opening_time, closing_time, services) "
+                 "VALUES (:name, :address, '08:00', '22:00', :services)"),
+            rows,
+        )
+
+
+def time_ms(conn, sql, params, repeat):
+    from sqlalchemy import text
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(text(sql), params).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--outlets", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["OUTLETS_DB_PATH"] = os.path.join(tmp, "bench.db")
+        from sqlalchemy import text
+        from utils import database
+
+        database.init_db(seed=False)
+        seed(database.engine, args.outlets)
+        with database.engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            print(f"{'service':<20} {'rows':>6} {'LIKE ms':>9} {'indexed ms':>11} {'speedup':>8}")
+            for name, _ in SERVICES:
+                code = CODES[name]
+                like_ms, like_rows = time_ms(conn, LIKE_SQL, {"term": f"%{name}%"}, args.repeat)
+                indexed_ms, indexed_rows = time_ms(conn, INDEXED_SQL, {"code": code}, args.repeat)
+                assert like_rows == indexed_rows, (name, like_rows, indexed_rows)
+                print(f"{code:<20} {indexed_rows:>6} {like_ms:>9.2f} {indexed_ms:>11.2f} {like_ms / indexed_ms:>7.1f}x")
+
+            for label, sql, params in (("LIKE", LIKE_SQL, {"term": "%x%"}), ("indexed", INDEXED_SQL, {"code": "x"})):
+                plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).all()
+                print(f"\n{label} plan:")
+                for row in plan:
+                    print(f"  {row[-1]}")
+        database.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Load test for outlet queries: blocking sync session vs async WAL engine.
+
+Seeds a temporary database with synthetic outlets, then runs concurrent
+readers (address LIKE scans with varying terms) on one event loop, with a
+background writer inserting rows. The "sync" mode runs queries through the
+synchronous session inside the event loop, as /outlets used to; "async"
+uses the aiosqlite engine and session pool.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_outlets_load --outlets 20000 --clients 32
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+AREAS = ["Bangsar", "Cheras", "Petaling Jaya", "Subang Jaya", "Damansara", "Puchong", "Kepong", "Ampang"]
+QUERY = "SELECT * FROM outlets WHERE address LIKE :term"
+
+
+def seed(engine, n: int):
+    from sqlalchemy import text
+
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO outlets (name, address, opening_time, closing_time, services) "
+                 "VALUES (:name, :address, '08:00', '22:00', '[\"Dine-in\"]')"),
+            [{"name": f"ZUS Coffee - Bench {i}",
+              "address": f"{i}, Jalan {rng.randrange(1, 99)}, {rng.choice(AREAS)}, Selangor"}
+             for i in range(n)],
+        )
+
+
+async def writer(engine, stop: asyncio.Event):
+    from sqlalchemy import text
+
+    i = 0
+    while not stop.is_set():
+        def insert():
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO outlets (name, address) VALUES (:n, 'Writer Street')"),
+                             {"n": f"writer {i}"})
+        await asyncio.to_thread(insert)
+        i += 1
+        await asyncio.sleep(0.01)
+
+
+async def run(mode: str, clients: int, requests: int) -> float:
+    from sqlalchemy import text
+    from utils import database
+
+    async def sync_client(n):
+        for j in range(n):
+            with database.SessionLocal() as db:
+                db.execute(text(QUERY), {"term": f"%{AREAS[j % len(AREAS)]}%"}).all()
+            await asyncio.sleep(0)
+
+    async def async_client(n):
+        for j in range(n):
+            async with database.AsyncSessionLocal() as db:
+                (await db.execute(text(QUERY), {"term": f"%{AREAS[j % len(AREAS)]}%"})).all()
+
+    client = sync_client if mode == "sync" else async_client
+    stop = asyncio.Event()
+    write_task = asyncio.create_task(writer(database.engine, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(requests // clients) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await write_task
+    return (requests // clients) * clients / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--outlets", type=int, default=20_000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["OUTLETS_DB_PATH"] = os.path.join(tmp, "bench.db")
+        from utils import database
+
+        database.init_db(seed=False)
+        seed(database.engine, args.outlets)
+        print(f"{'mode':>6} {'queries/s':>10}")
+        for mode in ("sync", "async"):
+            print(f"{mode:>6} {asyncio.run(run(mode, args.clients, args.requests)):>10.1f}")
+        database.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Per-worker startup time and RSS: pickled metadata vs memory-mapped store.
+
+Writes a synthetic catalog (random embeddings, no model needed) in both
+formats, then starts a fresh interpreter per format that loads the index
+and metadata the way a uvicorn worker would and looks up a few rows.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_startup --products 100000
+"""
+
+import argparse
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+DIM = 384
+
+
+def read_rss_kb():
+    """Return (total, anonymous, file-backed) resident set size in KiB (Linux)"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                values[key] = int(rest.split()[0])
+    return values.get("VmRSS", 0), values.get("RssAnon", 0), values.get("RssFile", 0)
+
+
+def child(mode: str, data_dir: str):
+    import faiss
+    from utils.product_store import ProductMetadataStore
+
+    start = time.perf_counter()
+    index_file = os.path.join(data_dir, "product_index.faiss")
+    if mode == "pickle":
+        index = faiss.read_index(index_file)
+        with open(os.path.join(data_dir, "products.pkl"), "rb") as f:
+            products = pickle.load(f)
+    else:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        index = faiss.read_index(index_file, flags)
+        products = ProductMetadataStore(
+            os.path.join(data_dir, "products.dat"), os.path.join(data_dir, "products.idx")
+        )
+    startup = time.perf_counter() - start
+
+    # Decode a handful of rows, as a search would
+    for idx in random.Random(0).sample(range(len(products)), 10):
+        products[idx]["name"]
+
+    rss, anon, shared = read_rss_kb()
+    print(f"{mode:>8} {index.ntotal:>10} {startup * 1000:>11.1f} {rss / 1024:>9.1f} "
+          f"{anon / 1024:>9.1f} {shared / 1024:>9.1f}")
+
+
+def write_dataset(data_dir: str, n: int):
+    import faiss
+    import numpy as np
+    from benchmarks.catalog import make_products
+    from utils.product_store import ProductMetadataStore
+
+    products = list(make_products(n))
+    index = faiss.IndexFlatL2(DIM)
+    index.add(np.random.default_rng(0).random((n, DIM), dtype="float32"))
+    faiss.write_index(index, os.path.join(data_dir, "product_index.faiss"))
+    with open(os.path.join(data_dir, "products.pkl"), "wb") as f:
+        pickle.dump(products, f)
+    ProductMetadataStore(
+        os.path.join(data_dir, "products.dat"), os.path.join(data_dir, "products.idx")
+    ).rewrite(products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_dataset(data_dir, args.products)
+        print(f"{'format':>8} {'products':>10} {'startup ms':>11} {'RSS MiB':>9} "
+              f"{'anon MiB':>9} {'file MiB':>9}")
+        for mode in ("pickle", "mmap"):
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode, data_dir],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
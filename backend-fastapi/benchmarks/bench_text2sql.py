@@ -0,0 +1,82 @@
+"""
+Latency of the rule-based Text2SQL fast path vs the LLM path.
+
+Runs a fixed set of outlet questions through the rule compiler and through
+the LLM (generate_template, with its cache cleared), and reports fast-path
+coverage and per-question latency for each path, plus the latency of
+questions served from a cached SQL template. The LLM path needs
+GROQ_API_KEY; pass --no-llm to time only the fast path.
+
+Run from the backend-fastapi directory:
+
+    python -m benchmarks.bench_text2sql
+"""
+
+import argparse
+import statistics
+import time
+
+from utils.text2sql import sql_generator
+
+QUESTIONS = [
+    "Show me outlets in Bangsar",
+    "Which outlets are open after 8pm?",
+    "Find outlets in Petaling Jaya",
+    "Which outlets offer dine-in service?",
+    "Show me outlets with delivery service",
+    "outlets in Kuala Lumpur that offer takeaway",
+    "any outlets in SS 2 open after 9:30 pm?",
+    "stores in Damansara with delivery",
+    "How many outlets are in Kuala Lumpur?",
+    "Which outlet closes the latest?",
+    "List outlets sorted by name",
+    "Is there an outlet near the LRT?",
+]
+
+
+# Questions the rules don't cover that share one lifted template
+TEMPLATE_VARIANTS = [
+    "How many outlets are in Kuala Lumpur?",
+    "How many outlets are in Cheras?",
+    "How many outlets are in Subang Jaya?",
+    "How many outlets are in Shah Alam?",
+]
+
+
+def time_ms(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=1000, help="fast-path repetitions per question")
+    parser.add_argument("--no-llm", action="store_true")
+    args = parser.parse_args()
+
+    rules = sql_generator.rules
+    covered = [q for q in QUESTIONS if rules.compile(q) is not None]
+    print(f"fast-path coverage: {len(covered)}/{len(QUESTIONS)} questions")
+
+    fast = [time_ms(lambda: [rules.compile(q) for _ in range(args.repeat)]) / args.repeat for q in covered]
+    print(f"{'path':>10} {'p50 ms':>10} {'max ms':>10}")
+    print(f"{'fast path':>10} {statistics.median(fast):>10.4f} {max(fast):>10.4f}")
+
+    if not args.no_llm:
+        llm = []
+        for q in QUESTIONS:
+            sql_generator.sql_cache.clear()
+            lifted = rules.lift(q)
+            llm.append(time_ms(sql_generator.generate_template, lifted.template, lifted.params))
+        print(f"{'llm':>10} {statistics.median(llm):>10.1f} {max(llm):>10.1f}")
+
+        # Same template, new values: served from the template cache
+        sql_generator.sql_cache.clear()
+        sql_generator.generate(TEMPLATE_VARIANTS[0])
+        hits = [time_ms(sql_generator.generate, q) for q in TEMPLATE_VARIANTS[1:]]
+        print(f"{'template':>10} {statistics.median(hits):>10.4f} {max(hits):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
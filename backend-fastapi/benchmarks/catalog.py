@@ -0,0 +1,23 @@
+"""
+Synthetic product catalog shared by the benchmarks.
+"""
+
+import random
+
+WORDS = (
+    "cup tumbler mug bottle ceramic steel glass lid straw travel cold hot "
+    "coffee tea matte gloss classic mini grande blue green black white"
+).split()
+
+
+def make_products(n: int, seed: int = 0):
+    """Generate n synthetic products"""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "name": f"ZUS {' '.join(rng.choices(WORDS, k=3)).title()} #{i}",
+            "description": " ".join(rng.choices(WORDS, k=40)),
+            "price": round(rng.uniform(19, 129), 2),
+            "colors": rng.sample(["Thunder Blue", "Cloud White", "Space Black", "Pine Green"], 2),
+            "category": "Drinkware",
+        }
@@ -11,13 +11,17 @@ MOCK_OUTLETS = [
         "opening_time": "07:00",
         "closing_time": "21:40",
         "services": ["Dine-in", "Takeaway", "No-contact delivery"],
+        "latitude": 3.1186,
+        "longitude": 101.6221,
     },
     {
         "name": "ZUS Coffee - Uptown Damansara",
         "address": "44-G (Ground Floor, Jalan SS21/39, Damansara Utama, 47400 Petaling Jaya, Selangor",
         "opening_time": "07:00",
-        "closing_time": "10:40",
+        "closing_time": "22:40",
         "services": ["Dine-in", "Takeaway", "No-contact delivery"],
+        "latitude": 3.1357,
+        "longitude": 101.6235,
     },
     {
         "name": "ZUS Coffee - Menara UOA Bangsar",
@@ -25,6 +29,8 @@ MOCK_OUTLETS = [
         "opening_time": "07:30",
         "closing_time": "19:40",
         "services": ["Dine-in", "Takeaway", "No-contact delivery"],
+        "latitude": 3.1285,
+        "longitude": 101.6787,
     },
     {
         "name": "ZUS Coffee - M3 Shopping Mall",
@@ -32,6 +38,8 @@ MOCK_OUTLETS = [
         "opening_time": "10:00",
         "closing_time": "21:40",
         "services": ["Dine-in", "Takeaway"],
+        "latitude": 3.2171,
+        "longitude": 101.7236,
     }
 ]
 
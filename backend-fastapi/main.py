@@ -2,20 +2,35 @@
 FastAPI application with all endpoints.
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Query
 from pydantic import BaseModel, Field
 from typing import List, Optional, Literal
-from sqlalchemy.orm import Session
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
+import logging
 
-from utils.database import get_db, Outlet
+from utils.database import get_async_db, execute_cached, init_db, result_cache, sql_guard
+from utils.sql_guard import SQLRejected
+from utils.hours import OPEN_AT_SQL, WEEKDAYS, local_now, to_minutes
+from utils.geo import ANY_LOCATED_SQL, BOUNDING_BOX_SQL, bounding_box, nearest
 from utils.vector_store import vector_store
+from utils.product_filters import ProductFilters
 from utils.text2sql import sql_generator
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create or migrate the outlets database before serving requests
+    init_db()
+    yield
+
 app = FastAPI(
     title="ZUS Coffee API",
-    description="API for calculator, product search, and outlet queries"
+    description="API for calculator, product search, and outlet queries",
+    lifespan=lifespan
 )
 
 # Calculator endpoint
@@ -53,6 +68,13 @@ async def calculate(request: CalculationRequest):
 class ProductQuery(BaseModel):
     query: str = Field(..., description="Search query for products")
     top_k: Optional[int] = Field(default=3, description="Number of results to return")
+    nprobe: Optional[int] = Field(default=None, description="IVF lists to probe (IVF indexes only)")
+    ef_search: Optional[int] = Field(default=None, description="HNSW search depth (HNSW indexes only)")
+    summarize: bool = Field(default=True, description="Generate an AI summary of the results")
+    category: Optional[str] = Field(default=None, description="Only return products in this category")
+    min_price: Optional[float] = Field(default=None, description="Minimum price")
+    max_price: Optional[float] = Field(default=None, description="Maximum price")
+    color: Optional[str] = Field(default=None, description="Only return products available in this colour")
 
 class ProductResponse(BaseModel):
     name: str
@@ -67,7 +89,14 @@ async def search_products(query: ProductQuery):
     Search for products using vector similarity search and generate AI summary
     """
     try:
-        result = vector_store.search(query.query, k=query.top_k)
+        filters = ProductFilters(
+            category=query.category, min_price=query.min_price,
+            max_price=query.max_price, color=query.color
+        )
+        result = await vector_store.asearch(
+            query.query, k=query.top_k, nprobe=query.nprobe,
+            ef_search=query.ef_search, summarize=query.summarize, filters=filters
+        )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -83,43 +112,127 @@ class OutletResponse(BaseModel):
     closing_time: str
     services: List[str]
 
+def format_outlet(outlet: dict) -> dict:
+    return {
+        "name": outlet.get("name"),
+        "address": outlet.get("address"),
+        "opening_time": outlet.get("opening_time"),
+        "closing_time": outlet.get("closing_time"),
+        "services": json.loads(outlet["services"]) if outlet.get("services") else []
+    }
+
 @app.post("/outlets")
-async def query_outlets(query: OutletQuery, db: Session = Depends(get_db)):
+async def query_outlets(query: OutletQuery, db: AsyncSession = Depends(get_async_db)):
     """
     Query outlets using natural language to SQL conversion
     """
     try:
         # Generate SQL from natural language query
-        sql_query = sql_generator.generate_sql(query.query)
+        sql_query, sql_params = await sql_generator.agenerate(query.query)
         
-        # Execute the generated SQL
-        results = db.execute(text(sql_query))
-        outlets = results.all()
+        # Execute the generated SQL through the guard (cached until the outlets table changes)
+        try:
+            outlets = await execute_cached(db, sql_query, sql_params, guard=sql_guard)
+        except SQLRejected as e:
+            raise HTTPException(
+                status_code=400,
+                detail={"reason": e.reason, "message": e.detail, "sql_query": sql_query}
+            )
         
         if outlets:
             return {
-                "results": [
-                    {
-                        "name": outlet.name,
-                        "address": outlet.address,
-                        "opening_time": outlet.opening_time,
-                        "closing_time": outlet.closing_time,
-                        "services": outlet.get_services() if hasattr(outlet, 'get_services') else json.loads(outlet.services) if outlet.services else []
-                    }
-                    for outlet in outlets
-                ],
-                "sql_query": sql_query
+                "results": [format_outlet(outlet) for outlet in outlets],
+                "sql_query": sql_query,
+                "sql_params": sql_params
             }
         else:
             return {
                 "results": [],
                 "message": "No outlets found matching your query.",
-                "sql_query": sql_query
+                "sql_query": sql_query,
+                "sql_params": sql_params
             }
             
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+@app.get("/outlets/open")
+async def open_outlets(
+    at: Optional[str] = Query(default=None, description="Time as HH:MM (defaults to now)"),
+    weekday: Optional[str] = Query(default=None, description="Day name, e.g. sunday (defaults to today)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Outlets open at a given time, answered from the indexed hours table
+    without the LLM
+    """
+    today, now = local_now()
+    minute = now if at is None else to_minutes(at)
+    if minute is None:
+        raise HTTPException(status_code=400, detail="'at' must be a time as HH:MM.")
+    if weekday is None:
+        day = today
+    elif weekday.strip().lower() in WEEKDAYS:
+        day = WEEKDAYS.index(weekday.strip().lower())
+    else:
+        raise HTTPException(status_code=400, detail=f"'weekday' must be one of {', '.join(WEEKDAYS)}.")
+    params = {"weekday": day, "minute": minute}
+    try:
+        outlets = await execute_cached(db, OPEN_AT_SQL, params)
+        return {
+            "results": [format_outlet(outlet) for outlet in outlets],
+            "weekday": WEEKDAYS[day],
+            "at": f"{minute // 60:02d}:{minute % 60:02d}"
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+@app.get("/outlets/nearby")
+async def nearby_outlets(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the customer"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the customer"),
+    k: int = Query(default=5, ge=1, le=50, description="Number of outlets to return"),
+    radius_km: float = Query(default=10.0, gt=0, le=100, description="Search radius in kilometres"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    The k nearest outlets within a radius: R*Tree bounding-box lookup,
+    then exact haversine distance
+    """
+    try:
+        result = await db.execute(text(BOUNDING_BOX_SQL), bounding_box(lat, lon, radius_km))
+        candidates = [dict(row._mapping) for row in result]
+        response = {
+            "results": [
+                {**format_outlet(outlet), "distance_km": round(distance, 3)}
+                for distance, outlet in nearest(candidates, lat, lon, k, radius_km)
+            ],
+            "candidates": len(candidates)
+        }
+        if not candidates and not (await db.execute(text(ANY_LOCATED_SQL))).scalar():
+            logger.warning("No outlet has coordinates, so /outlets/nearby cannot find any")
+            response["message"] = "No outlets have coordinates yet, so none can be found by location."
+        return response
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+@app.get("/stats")
+async def stats():
+    """
+    Cache counters for checking hit rates
+    """
+    return {
+        "query_embedding_cache": vector_store.query_cache.stats(),
+        "search_batching": vector_store.batcher.stats(),
+        "product_summary_cache": vector_store.summary_cache.stats(),
+        "text2sql_cache": sql_generator.sql_cache.stats(),
+        "text2sql_fast_path": sql_generator.rules.stats(),
+        "outlet_result_cache": result_cache.stats(),
+        "sql_guard": sql_guard.stats()
+    }
+
 @app.get("/")
 async def root():
     """
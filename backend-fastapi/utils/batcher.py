@@ -0,0 +1,127 @@
+"""
+Micro-batching of concurrent product queries.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class QueryBatcher:
+    """
+    Coalesces concurrent search requests into batches.
+    Requests are collected for up to max_wait_ms or until max_batch_size
+    are waiting, then retrieve_many(queries, k, *options) runs once per batch
+    in the executor (one encoder call and one matrix index search) and each
+    caller gets its own slice of the results. Requests are only batched with
+    others that have the same (hashable) options. At most max_queue_size
+    requests wait to be batched; further submits wait for room.
+    """
+
+    def __init__(
+        self,
+        retrieve_many: Callable[..., List[List[Dict]]],
+        executor: Executor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_queue_size: int = 1024,
+    ):
+        self.retrieve_many = retrieve_many
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # The loop only keeps weak references to tasks; hold in-flight
+        # dispatches so they can't be garbage-collected before they finish
+        self._dispatches: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.queries = 0
+
+    async def submit(self, query: str, k: int, *options: Hashable) -> List[Dict]:
+        """Queue a query and wait for its results"""
+        loop = asyncio.get_running_loop()
+        if self.max_batch_size <= 1:
+            self._record(1)
+            results = await loop.run_in_executor(
+                self.executor, self.retrieve_many, [query], k, *options
+            )
+            return results[0]
+
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        await self._queue.put((query, k, options, future))
+        return await future
+
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop):
+        """Start the collector task on the current event loop"""
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = loop.create_task(self._collect())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without waiting so the next batch can be collected meanwhile
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple]):
+        """Run one retrieve_many call per distinct options group"""
+        loop = asyncio.get_running_loop()
+        groups: Dict[Tuple, List[Tuple]] = {}
+        for item in batch:
+            groups.setdefault(item[2], []).append(item)
+
+        for options, items in groups.items():
+            items = [item for item in items if not item[3].done()]
+            if not items:
+                continue
+            queries = [item[0] for item in items]
+            k = max(item[1] for item in items)
+            self._record(len(items))
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.retrieve_many, queries, k, *options
+                )
+            except Exception as e:
+                for item in items:
+                    if not item[3].done():
+                        item[3].set_exception(e)
+                continue
+            for item, result in zip(items, results):
+                if not item[3].done():
+                    item[3].set_result(result[:item[1]])
+
+    def _record(self, size: int):
+        self.batches += 1
+        self.queries += size
+
+    def stats(self) -> Dict:
+        """Return batching counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": len(self._dispatches),
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+        }
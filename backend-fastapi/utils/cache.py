@@ -0,0 +1,220 @@
+"""
+Caching helpers.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU cache with an optional time-to-live.
+    Keeps hit/miss/eviction counters so callers can check how well it works.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 on_evict: Optional[Callable[[Hashable], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict  # called with each key dropped for size
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default on a miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entry if full"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key from the cache and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def normalize_text(text: str) -> str:
+    """Normalize free text for use as a cache key"""
+    return " ".join(text.lower().split())
+
+
+class SummaryCache:
+    """
+    Cache for LLM product summaries, keyed by normalized query plus the
+    ordered ids of the products in the result.
+    An in-memory LRU tier sits in front of an optional SQLite tier that
+    survives restarts. Entries are dropped when a product they mention
+    changes (invalidate_products).
+    """
+
+    def __init__(self, maxsize: int = 1024, db_file: Optional[str] = None):
+        self.memory = LRUCache(maxsize=maxsize, on_evict=self._forget)
+        self._keys_by_product: Dict[str, Set[Tuple]] = defaultdict(set)
+        self._lock = threading.RLock()
+        self.invalidations = 0
+        self.disk_hits = 0
+        self._db = None
+        if db_file:
+            self._db = sqlite3.connect(db_file, check_same_thread=False)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS summaries (
+                    key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    created REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS summary_products (
+                    key TEXT NOT NULL,
+                    product_id TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_summary_products_product ON summary_products (product_id);
+                CREATE INDEX IF NOT EXISTS ix_summary_products_key ON summary_products (key);
+            """)
+
+    @staticmethod
+    def make_key(query: str, product_ids: Iterable[str]) -> Tuple:
+        return (normalize_text(query), tuple(product_ids))
+
+    def get(self, query: str, product_ids: Iterable[str]) -> Optional[str]:
+        key = self.make_key(query, product_ids)
+        summary = self.memory.get(key)
+        if summary is not None or self._db is None:
+            return summary
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary FROM summaries WHERE key = ?", (json.dumps(key),)
+            ).fetchone()
+        if row is None:
+            return None
+        self.disk_hits += 1
+        self._remember(key, row[0])
+        return row[0]
+
+    def set(self, query: str, product_ids: Iterable[str], summary: str):
+        key = self.make_key(query, product_ids)
+        self._remember(key, summary)
+        if self._db is None:
+            return
+        disk_key = json.dumps(key)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM summary_products WHERE key = ?", (disk_key,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created) VALUES (?, ?, ?)",
+                (disk_key, summary, time.time())
+            )
+            self._db.executemany(
+                "INSERT INTO summary_products (key, product_id) VALUES (?, ?)",
+                [(disk_key, product_id) for product_id in set(key[1])]
+            )
+
+    def _remember(self, key: Tuple, summary: str):
+        # Hold our lock around the LRU update so on_evict (_forget) always
+        # takes the locks in the same order as invalidate_products
+        with self._lock:
+            for product_id in key[1]:
+                self._keys_by_product[product_id].add(key)
+            self.memory.set(key, summary)
+
+    def _forget(self, key: Tuple):
+        """Drop an evicted key from the product reverse index"""
+        with self._lock:
+            for product_id in key[1]:
+                keys = self._keys_by_product.get(product_id)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_product[product_id]
+
+    def invalidate_products(self, product_ids: Iterable[str]):
+        """Drop every summary that mentions any of the products"""
+        product_ids = list(product_ids)
+        with self._lock:
+            for product_id in product_ids:
+                for key in self._keys_by_product.pop(product_id, set()):
+                    if self.memory.pop(key) is not None:
+                        self.invalidations += 1
+                    self._forget(key)
+            if self._db is not None and product_ids:
+                placeholders = ",".join("?" * len(product_ids))
+                with self._db:
+                    keys = f"SELECT key FROM summary_products WHERE product_id IN ({placeholders})"
+                    self._db.execute(f"DELETE FROM summaries WHERE key IN ({keys})", product_ids)
+                    self._db.execute(f"DELETE FROM summary_products WHERE key IN ({keys})", product_ids)
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            self._keys_by_product.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM summaries")
+                    self._db.execute("DELETE FROM summary_products")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats.update(
+            invalidations=self.invalidations,
+            disk_enabled=self._db is not None,
+            disk_hits=self.disk_hits,
+        )
+        return stats
@@ -2,23 +2,67 @@
 Database configuration and models.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Time
+from sqlalchemy import create_engine, event, Column, Float, ForeignKey, Index, Integer, String, Time, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import os
 import json
+from typing import Any, Dict, List, Optional, Tuple
 from data.mock_data import MOCK_OUTLETS
+from utils.cache import LRUCache
+from utils.hours import day_intervals, to_minutes
+from utils.sql_guard import SQLGuard
 
-# Ensure data directory exists
-os.makedirs("data", exist_ok=True)
+DATABASE_PATH = os.getenv("OUTLETS_DB_PATH", "./data/zus.db")
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/zus.db"
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
+# Prepared statements kept per connection; generated SQL is parameterized,
+# so one compiled statement serves every value of a template
+STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "256"))
+
+# Synchronous engine, used for schema setup and scripts
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "cached_statements": STATEMENT_CACHE_SIZE}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so queries don't block the event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "8")),
+    max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", "8")),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    connect_args={"timeout": 5, "cached_statements": STATEMENT_CACHE_SIZE},
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# WAL lets readers run concurrently with each other and with a writer.
+# synchronous=NORMAL is durable across application crashes in WAL mode;
+# mmap and a larger page cache cut read syscalls.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -64000,  # KiB
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+event.listen(engine, "connect", _set_sqlite_pragmas)
+event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 Base = declarative_base()
 
 class Outlet(Base):
@@ -30,6 +74,8 @@ class Outlet(Base):
     opening_time = Column(String)
     closing_time = Column(String)
     services = Column(String)  # Store as JSON string
+    latitude = Column(Float)
+    longitude = Column(Float)
 
     def get_services(self):
         """Convert JSON string to list"""
@@ -39,30 +85,338 @@ class Outlet(Base):
         """Convert list to JSON string"""
         self.services = json.dumps(services_list) if services_list else None
 
-# Create tables and populate with mock data
-def init_db():
-    Base.metadata.create_all(bind=engine)
-    
-    # Add mock data
-    db = SessionLocal()
-    try:
-        # Check if we already have data
-        if db.query(Outlet).first() is None:
-            for outlet_data in MOCK_OUTLETS:
-                outlet = Outlet(
-                    name=outlet_data["name"],
-                    address=outlet_data["address"],
-                    opening_time=outlet_data["opening_time"],
-                    closing_time=outlet_data["closing_time"]
-                )
-                outlet.set_services(outlet_data.get("services", []))
-                db.add(outlet)
-            db.commit()
-    finally:
-        db.close()
+class OutletService(Base):
+    """
+    One row per (outlet, service), so service filters are index lookups
+    instead of LIKE scans over the JSON column. Derived from
+    outlets.services by triggers; don't write to it directly.
+    """
+    __tablename__ = "outlet_services"
+
+    outlet_id = Column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True)
+    code = Column(String, primary_key=True)  # canonical code, e.g. 'delivery'
+    name = Column(String)  # name as listed for the outlet
+
+    __table_args__ = (Index("ix_outlet_services_code", "code", "outlet_id"),)
+
+class OutletHours(Base):
+    """
+    Opening intervals in minutes since midnight, one row per (outlet,
+    weekday, interval); see utils/hours.py. Filled with the same hours every
+    day from opening_time/closing_time by triggers, or per weekday with
+    set_weekly_hours().
+    """
+    __tablename__ = "outlet_hours"
+
+    outlet_id = Column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True)
+    weekday = Column(Integer, primary_key=True)  # 0 = Sunday
+    open_min = Column(Integer, primary_key=True)
+    close_min = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_outlet_hours_open", "weekday", "open_min", "close_min", "outlet_id"),)
+
+def set_weekly_hours(db: Session, outlet_id: int, schedule: Dict[int, Optional[Tuple[str, str]]]):
+    """
+    Replace an outlet's hours with a per-weekday schedule of
+    {weekday: ("HH:MM", "HH:MM")}; weekdays missing or None are closed.
+    The schedule stands until the outlet's opening_time or closing_time
+    changes. The caller commits.
+    """
+    db.query(OutletHours).filter(OutletHours.outlet_id == outlet_id).delete()
+    rows = {}
+    for weekday, hours in schedule.items():
+        if hours is None:
+            continue
+        open_min, close_min = to_minutes(hours[0]), to_minutes(hours[1])
+        if open_min is None or close_min is None:
+            raise ValueError(f"Invalid hours for weekday {weekday}: {hours}")
+        for row in day_intervals(weekday, open_min, close_min):
+            rows[row[:2]] = row
+    db.add_all(
+        OutletHours(outlet_id=outlet_id, weekday=day, open_min=open_min, close_min=close_min)
+        for day, open_min, close_min in rows.values()
+    )
+
+def _minutes_sql(hhmm: str) -> str:
+    """SQL for minutes since midnight of an "HH:MM" expression"""
+    return (
+        f"(CAST(substr({hhmm}, 1, instr({hhmm}, ':') - 1) AS INTEGER) * 60"
+        f" + CAST(substr({hhmm}, instr({hhmm}, ':') + 1) AS INTEGER))"
+    )
+
+def _daily_hours_sql(outlet_id: str, opening: str, closing: str, table: str = "") -> List[str]:
+    """
+    INSERTs giving an outlet the same opening_time/closing_time interval on
+    every weekday, split at midnight like day_intervals()
+    """
+    valid = f"{opening} GLOB '[0-9]*:[0-9][0-9]' AND {closing} GLOB '[0-9]*:[0-9][0-9]'"
+    hours = (
+        f"(SELECT {outlet_id} AS outlet_id, {_minutes_sql(opening)} AS open_min, "
+        f"{_minutes_sql(closing)} AS close_min{' FROM ' + table if table else ''} WHERE {valid}) AS h, "
+        "json_each('[0,1,2,3,4,5,6]') AS day"
+    )
+    insert = "INSERT OR IGNORE INTO outlet_hours (outlet_id, weekday, open_min, close_min) "
+    return [
+        insert + "SELECT h.outlet_id, day.value, "
+        "CASE WHEN h.close_min = h.open_min THEN 0 ELSE h.open_min END, "
+        "CASE WHEN h.close_min > h.open_min THEN h.close_min ELSE 1440 END "
+        f"FROM {hours}",
+        insert + "SELECT h.outlet_id, (day.value + 1) % 7, 0, h.close_min "
+        f"FROM {hours} WHERE h.close_min < h.open_min AND h.close_min > 0",
+    ]
+
+def _changed(*columns: str) -> str:
+    """
+    WHEN clause for an UPDATE trigger: UPDATE OF fires whenever a column is
+    assigned, even to the same value (as an upsert does), so derived rows
+    are only rebuilt when one of columns actually changed
+    """
+    return "WHEN " + " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+
+# Daily hours follow opening_time/closing_time for every writer; an outlet
+# whose hours were set per weekday keeps them until its times change
+_new_daily_hours = ";\n        ".join(_daily_hours_sql("NEW.id", "NEW.opening_time", "NEW.closing_time"))
+OUTLET_HOURS_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS outlet_hours_insert AFTER INSERT ON outlets
+    BEGIN
+        {_new_daily_hours};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS outlet_hours_update AFTER UPDATE OF id, opening_time, closing_time ON outlets
+    {_changed("id", "opening_time", "closing_time")}
+    BEGIN
+        DELETE FROM outlet_hours WHERE outlet_id = OLD.id;
+        {_new_daily_hours};
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS outlet_hours_delete AFTER DELETE ON outlets
+    BEGIN
+        DELETE FROM outlet_hours WHERE outlet_id = OLD.id;
+    END""",
+]
+
+# Canonical service code for a listed service name; the Text2SQL rules and
+# prompt filter on these codes
+SERVICE_CODE_SQL = """CASE
+        WHEN lower(value) LIKE '%delivery%' THEN 'delivery'
+        WHEN lower(value) LIKE '%dine%in%' THEN 'dine-in'
+        WHEN lower(value) LIKE '%take%away%' THEN 'takeaway'
+        ELSE lower(trim(value))
+    END"""
 
-# Initialize database with mock data
-init_db()
+def _service_rows_sql(outlet_id: str, services: str, table: str = "") -> str:
+    """SELECT producing (outlet_id, code, name) rows from a services JSON array"""
+    source = f"{table}, " if table else ""
+    return (
+        f"SELECT {outlet_id}, {SERVICE_CODE_SQL}, value "
+        f"FROM {source}json_each(CASE WHEN json_valid({services}) THEN {services} ELSE '[]' END)"
+    )
+
+# Keep outlet_services in step with outlets.services for every writer
+OUTLET_SERVICES_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS outlet_services_insert AFTER INSERT ON outlets
+    BEGIN
+        INSERT OR IGNORE INTO outlet_services (outlet_id, code, name)
+        {_service_rows_sql("NEW.id", "NEW.services")};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS outlet_services_update AFTER UPDATE OF id, services ON outlets
+    {_changed("id", "services")}
+    BEGIN
+        DELETE FROM outlet_services WHERE outlet_id = OLD.id;
+        INSERT OR IGNORE INTO outlet_services (outlet_id, code, name)
+        {_service_rows_sql("NEW.id", "NEW.services")};
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS outlet_services_delete AFTER DELETE ON outlets
+    BEGIN
+        DELETE FROM outlet_services WHERE outlet_id = OLD.id;
+    END""",
+]
+
+# Full-text index over outlet name and address (external content, so the
+# text is stored once in outlets); triggers keep it in step with every writer
+OUTLETS_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS outlets_fts USING fts5(
+        name, address,
+        content='outlets', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS outlets_fts_insert AFTER INSERT ON outlets
+    BEGIN
+        INSERT INTO outlets_fts (rowid, name, address) VALUES (NEW.id, NEW.name, NEW.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS outlets_fts_update AFTER UPDATE OF id, name, address ON outlets
+    {_changed("id", "name", "address")}
+    BEGIN
+        INSERT INTO outlets_fts (outlets_fts, rowid, name, address) VALUES ('delete', OLD.id, OLD.name, OLD.address);
+        INSERT INTO outlets_fts (rowid, name, address) VALUES (NEW.id, NEW.name, NEW.address);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS outlets_fts_delete AFTER DELETE ON outlets
+    BEGIN
+        INSERT INTO outlets_fts (outlets_fts, rowid, name, address) VALUES ('delete', OLD.id, OLD.name, OLD.address);
+    END""",
+]
+
+# Spatial index over outlet coordinates for nearest-outlet search (utils/geo.py)
+_new_point = (
+    "INSERT OR REPLACE INTO outlets_rtree (id, min_lat, max_lat, min_lon, max_lon) "
+    "SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude "
+    "WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL"
+)
+OUTLETS_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS outlets_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    f"""CREATE TRIGGER IF NOT EXISTS outlets_rtree_insert AFTER INSERT ON outlets
+    BEGIN
+        {_new_point};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS outlets_rtree_update AFTER UPDATE OF id, latitude, longitude ON outlets
+    {_changed("id", "latitude", "longitude")}
+    BEGIN
+        DELETE FROM outlets_rtree WHERE id = OLD.id;
+        {_new_point};
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS outlets_rtree_delete AFTER DELETE ON outlets
+    BEGIN
+        DELETE FROM outlets_rtree WHERE id = OLD.id;
+    END""",
+]
+
+UPDATE_TRIGGERS = ["outlet_services_update", "outlets_fts_update", "outlet_hours_update", "outlets_rtree_update"]
+
+# Columns added to outlets after its first release; create_all doesn't
+# alter existing tables
+OUTLET_COLUMNS = {"latitude": "REAL", "longitude": "REAL"}
+
+def _add_columns(conn, table: str, columns: Dict[str, str]):
+    existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+    for name, column_type in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+
+def _sql_string(value: str) -> str:
+    """A SQL string literal, for migrations (which run as plain statements)"""
+    return "'" + value.replace("'", "''") + "'"
+
+# Data migrations for databases created by older versions, applied in order
+# and tracked with PRAGMA user_version
+MIGRATIONS = [
+    # 1: backfill outlet_services from the JSON column
+    [
+        "INSERT OR IGNORE INTO outlet_services (outlet_id, code, name) "
+        + _service_rows_sql("outlets.id", "outlets.services", table="outlets")
+    ],
+    # 2: index outlets that predate outlets_fts
+    ["INSERT INTO outlets_fts (outlets_fts) VALUES ('rebuild')"],
+    # 3: numeric hours for outlets that predate outlet_hours
+    _daily_hours_sql("outlets.id", "outlets.opening_time", "outlets.closing_time", table="outlets"),
+    # 4: index coordinates of outlets that predate outlets_rtree
+    [
+        "INSERT OR REPLACE INTO outlets_rtree (id, min_lat, max_lat, min_lon, max_lon) "
+        "SELECT id, latitude, latitude, longitude, longitude FROM outlets "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    ],
+    # 5: recreate the update triggers with their WHEN clauses
+    [f"DROP TRIGGER IF EXISTS {name}" for name in UPDATE_TRIGGERS] + [
+        statement
+        for statement in OUTLET_SERVICES_DDL + OUTLETS_FTS_DDL + OUTLET_HOURS_DDL + OUTLETS_RTREE_DDL
+        if any(f" {name} " in statement for name in UPDATE_TRIGGERS)
+    ],
+    # 6: coordinates for the mock outlets seeded before they had any, so
+    # /outlets/nearby can find them (the R*Tree update trigger indexes them)
+    [
+        f"UPDATE outlets SET latitude = {outlet['latitude']!r}, longitude = {outlet['longitude']!r} "
+        f"WHERE name = {_sql_string(outlet['name'])} "
+        "AND latitude IS NULL AND longitude IS NULL"
+        for outlet in MOCK_OUTLETS
+        if outlet.get("latitude") is not None and outlet.get("longitude") is not None
+    ],
+]
+
+def _migrate(conn):
+    version = conn.execute(text("PRAGMA user_version")).scalar()
+    for target, statements in enumerate(MIGRATIONS, start=1):
+        if version < target:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text(f"PRAGMA user_version = {target}"))
+
+# Per-table write counters, bumped by triggers so every writer (ORM, raw
+# SQL, other processes) invalidates cached query results
+TABLE_VERSION_DDL = [
+    """CREATE TABLE IF NOT EXISTS table_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )""",
+    "INSERT OR IGNORE INTO table_versions (name, version) VALUES ('outlets', 0)",
+] + [
+    # outlet_hours can also be written directly (set_weekly_hours)
+    f"""CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'outlets';
+    END"""
+    for table in ("outlets", "outlet_hours")
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+# Outlets are upserted by name (utils/ingest.py)
+OUTLET_NAME_DDL = ["CREATE UNIQUE INDEX IF NOT EXISTS ux_outlets_name ON outlets (name)"]
+
+# Create tables and populate with mock data. Called at application startup
+# and by scripts; importing this module doesn't touch the database. bind
+# defaults to the application's engine.
+def init_db(seed: bool = True, bind: Optional[Engine] = None):
+    bind = engine if bind is None else bind
+    # Ensure data directory exists
+    os.makedirs(os.path.dirname(bind.url.database) or ".", exist_ok=True)
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        _add_columns(conn, "outlets", OUTLET_COLUMNS)
+        ddl = (TABLE_VERSION_DDL + OUTLET_NAME_DDL + OUTLET_SERVICES_DDL + OUTLETS_FTS_DDL
+               + OUTLET_HOURS_DDL + OUTLETS_RTREE_DDL)
+        for statement in ddl:
+            conn.execute(text(statement))
+        _migrate(conn)
+        empty = conn.execute(text("SELECT NOT EXISTS (SELECT 1 FROM outlets)")).scalar()
+
+    if seed and empty:
+        from utils.ingest import upsert_outlets
+        upsert_outlets(bind, MOCK_OUTLETS)
+
+async def get_table_version(db: AsyncSession, table: str = "outlets") -> int:
+    """Current write counter for a table"""
+    version = (await db.execute(
+        text("SELECT version FROM table_versions WHERE name = :name"), {"name": table}
+    )).scalar()
+    return version or 0
+
+# Cache of query results, keyed by SQL, parameters and the outlets table version
+result_cache = LRUCache(maxsize=int(os.getenv("OUTLET_RESULT_CACHE_SIZE", "512")))
+
+# Checks and runs generated SQL on read-only connections (utils/sql_guard.py)
+sql_guard = SQLGuard(
+    DATABASE_PATH,
+    known_tables=["outlets", "outlet_services", "outlet_hours", "outlets_fts", "outlets_rtree"],
+    max_rows=int(os.getenv("SQL_GUARD_MAX_ROWS", "200")),
+    time_budget_ms=float(os.getenv("SQL_GUARD_TIME_BUDGET_MS", "500")),
+    max_scan_rows=int(os.getenv("SQL_GUARD_MAX_SCAN_ROWS", "10000")),
+    workers=int(os.getenv("SQL_GUARD_WORKERS", "4")),
+    statement_cache_size=STATEMENT_CACHE_SIZE,
+)
+
+async def execute_cached(db: AsyncSession, sql: str, params: Optional[Dict[str, Any]] = None,
+                         guard: Optional[SQLGuard] = None) -> List[Dict[str, Any]]:
+    """
+    Run a read query and return its rows as dicts, reusing cached rows
+    while the outlets table is unchanged. Untrusted SQL should pass a
+    guard, which raises SQLRejected for queries it refuses.
+    """
+    key = (sql, tuple(sorted((params or {}).items())), await get_table_version(db))
+    rows = result_cache.get(key)
+    if rows is None:
+        if guard is not None:
+            rows = await guard.execute(sql, params)
+        else:
+            result = await db.execute(text(sql), params or {})
+            rows = [dict(row._mapping) for row in result]
+        result_cache.set(key, rows)
+    return rows
 
 # Dependency
 def get_db():
@@ -70,4 +424,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Async dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db 
\ No newline at end of file
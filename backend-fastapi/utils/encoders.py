@@ -0,0 +1,81 @@
+"""
+Pluggable text encoders for product and query embeddings.
+
+Backends:
+- torch: the full-precision SentenceTransformer model
+- int8: the same model with its Linear layers dynamically quantized to int8
+- onnx: the model run through ONNX Runtime (optionally a quantized ONNX file)
+"""
+
+from typing import List, Optional
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+ENCODER_BACKENDS = ("torch", "int8", "onnx")
+
+
+class Encoder:
+    """Wraps a SentenceTransformer, returning float32 embeddings"""
+
+    backend = "torch"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.model = self._load()
+
+    def _load(self) -> SentenceTransformer:
+        return SentenceTransformer(self.model_name)
+
+    @property
+    def name(self) -> str:
+        """Identifies the embedding space; stored in the catalog manifest"""
+        return self.model_name if self.backend == "torch" else f"{self.model_name}:{self.backend}"
+
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype="float32")
+
+
+class QuantizedEncoder(Encoder):
+    """Dynamic int8 quantization of the model's Linear layers (CPU only)"""
+
+    backend = "int8"
+
+    def _load(self) -> SentenceTransformer:
+        import torch
+
+        model = SentenceTransformer(self.model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxEncoder(Encoder):
+    """ONNX Runtime backend; onnx_file selects e.g. a quantized export from the model repo"""
+
+    backend = "onnx"
+
+    def __init__(self, model_name: str, onnx_file: Optional[str] = None):
+        self.onnx_file = onnx_file
+        super().__init__(model_name)
+
+    @property
+    def name(self) -> str:
+        return f"{super().name}:{self.onnx_file}" if self.onnx_file else super().name
+
+    def _load(self) -> SentenceTransformer:
+        model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+        return SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+
+def create_encoder(backend: str, model_name: str, onnx_file: Optional[str] = None) -> Encoder:
+    """Create the encoder for a backend name"""
+    backend = backend.lower()
+    if backend == "torch":
+        return Encoder(model_name)
+    if backend == "int8":
+        return QuantizedEncoder(model_name)
+    if backend == "onnx":
+        return OnnxEncoder(model_name, onnx_file)
+    raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
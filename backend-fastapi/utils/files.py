@@ -0,0 +1,88 @@
+"""
+File helpers for the product store's on-disk artifacts.
+
+Every uvicorn worker builds a ProductVectorStore at import, so several
+processes may check and rebuild the same files at once. FileLock serializes
+them, and atomic_path/atomic_write give each writer its own temp file, so
+a file is only ever replaced whole.
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive advisory lock (flock) on a file, held across processes.
+    Re-entrant within a process, so locked methods can call each other.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "FileLock":
+        self._lock.acquire()
+        try:
+            if self._depth == 0:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._depth += 1
+        except BaseException:
+            self._release_fd()
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            self._release_fd()
+        self._lock.release()
+
+    def _release_fd(self):
+        if self._fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    A unique temp file name next to path for the block to write; it
+    replaces path when the block succeeds and is removed if it fails
+    """
+    fd, tmp_file = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        yield tmp_file
+        os.replace(tmp_file, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_file)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb", encoding: Optional[str] = None) -> Iterator[IO]:
+    """Open a unique temp file that replaces path when the block succeeds"""
+    with atomic_path(path) as tmp_file:
+        with open(tmp_file, mode, encoding=encoding) as f:
+            yield f
@@ -0,0 +1,61 @@
+"""
+Nearest-outlet search.
+
+Outlet coordinates are indexed in the outlets_rtree R*Tree. A query first
+fetches the outlets inside the bounding box of the search circle from the
+index, then reranks those candidates by exact haversine distance.
+"""
+
+import math
+from typing import Any, Dict, List, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Outlets whose indexed point falls inside a lat/lon box
+BOUNDING_BOX_SQL = (
+    "SELECT outlets.* FROM outlets_rtree JOIN outlets ON outlets.id = outlets_rtree.id "
+    "WHERE outlets_rtree.min_lat <= :max_lat AND outlets_rtree.max_lat >= :min_lat "
+    "AND outlets_rtree.min_lon <= :max_lon AND outlets_rtree.max_lon >= :min_lon"
+)
+
+# Whether any outlet has coordinates at all
+ANY_LOCATED_SQL = "SELECT EXISTS (SELECT 1 FROM outlets_rtree)"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Dict[str, float]:
+    """
+    Box containing every point within radius_km of (lat, lon), as
+    BOUNDING_BOX_SQL parameters. Near the poles or the antimeridian it
+    widens to all longitudes rather than wrapping.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return {"min_lat": max(min_lat, -90.0), "max_lat": min(max_lat, 90.0), "min_lon": -180.0, "max_lon": 180.0}
+    # Widest longitude span of the circle, which is reached at its tangent latitude
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)))))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180 or max_lon > 180:
+        min_lon, max_lon = -180.0, 180.0
+    return {"min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon}
+
+
+def nearest(candidates: List[Dict[str, Any]], lat: float, lon: float,
+            k: int, radius_km: float) -> List[Tuple[float, Dict[str, Any]]]:
+    """The k candidates closest to (lat, lon) within radius_km, as (distance_km, row)"""
+    ranked = []
+    for row in candidates:
+        distance = haversine_km(lat, lon, row["latitude"], row["longitude"])
+        if distance <= radius_km:
+            ranked.append((distance, row))
+    ranked.sort(key=lambda item: item[0])
+    return ranked[:k]
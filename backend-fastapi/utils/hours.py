@@ -0,0 +1,62 @@
+"""
+Outlet opening hours as minutes since midnight.
+
+Hours live in the outlet_hours table, one row per (outlet, weekday, open
+interval) with 0 <= open_min < close_min <= 1440. An interval that runs past
+midnight is split into the evening part on its own day and the early hours
+of the next day, so "open at T" is a single indexed range check. Weekdays
+follow SQLite's strftime('%w'): 0 is Sunday.
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+MINUTES_PER_DAY = 24 * 60
+
+WEEKDAYS = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+
+OUTLETS_TIMEZONE = ZoneInfo(os.getenv("OUTLETS_TIMEZONE", "Asia/Kuala_Lumpur"))
+
+# Outlets open on a weekday at a minute of the day
+OPEN_AT_SQL = (
+    "SELECT * FROM outlets WHERE id IN (SELECT outlet_id FROM outlet_hours "
+    "WHERE weekday = :weekday AND open_min <= :minute AND close_min > :minute)"
+)
+
+_HHMM_RE = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+
+def to_minutes(hhmm: str) -> Optional[int]:
+    """Minutes since midnight for "HH:MM", or None if it isn't a valid time"""
+    match = _HHMM_RE.match(hhmm.strip()) if hhmm else None
+    if match is None:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def day_intervals(weekday: int, open_min: int, close_min: int) -> List[Tuple[int, int, int]]:
+    """
+    (weekday, open_min, close_min) rows for one day's hours. Closing at or
+    before opening means the outlet closes after midnight; equal times mean
+    open all day.
+    """
+    if close_min == open_min:
+        return [(weekday, 0, MINUTES_PER_DAY)]
+    if close_min > open_min:
+        return [(weekday, open_min, close_min)]
+    rows = [(weekday, open_min, MINUTES_PER_DAY)]
+    if close_min > 0:
+        rows.append(((weekday + 1) % 7, 0, close_min))
+    return rows
+
+
+def local_now() -> Tuple[int, int]:
+    """Current (weekday, minute of day) in the outlets' timezone"""
+    now = datetime.now(OUTLETS_TIMEZONE)
+    return now.isoweekday() % 7, now.hour * 60 + now.minute
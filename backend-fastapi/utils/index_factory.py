@@ -0,0 +1,88 @@
+"""
+FAISS index factory for product search.
+"""
+
+import logging
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Below this many vectors, clustering/quantizer training is not meaningful
+MIN_TRAINING_VECTORS = 256
+
+
+def build_index(
+    index_type: str,
+    embeddings: np.ndarray,
+    nlist: Optional[int] = None,
+    pq_m: int = 16,
+    pq_nbits: int = 8,
+    hnsw_m: int = 32,
+    ef_construction: int = 80,
+) -> faiss.Index:
+    """
+    Create an empty index of the given type, trained on embeddings if needed.
+    The caller adds the vectors afterwards.
+    """
+    index_type = index_type.lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    n, dim = embeddings.shape
+    if index_type != "flat" and n < MIN_TRAINING_VECTORS:
+        logger.info("Only %d vectors, using a flat index instead of %s", n, index_type)
+        index_type = "flat"
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        return index
+
+    # IVF variants: about 4 * sqrt(n) lists, with enough points per list to train
+    if nlist is None:
+        nlist = int(4 * math.sqrt(n))
+    nlist = max(1, min(nlist, n // 39))
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        # Sub-quantizer count must divide the dimension; codebooks need 2**nbits points
+        while dim % pq_m:
+            pq_m -= 1
+        pq_nbits = min(pq_nbits, int(math.log2(n)))
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+    index.train(embeddings)
+    return index
+
+
+def search_params(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    selector: Optional[faiss.IDSelector] = None,
+) -> Optional[faiss.SearchParameters]:
+    """
+    Build per-query search parameters for the index, or None for defaults.
+    selector restricts the search to a subset of ids.
+    """
+    selected = {"sel": selector} if selector is not None else {}
+    if isinstance(index, faiss.IndexIVF):
+        if nprobe or selected:
+            return faiss.SearchParametersIVF(nprobe=nprobe or index.nprobe, **selected)
+        return None
+    if isinstance(index, faiss.IndexHNSW):
+        if ef_search or selected:
+            return faiss.SearchParametersHNSW(efSearch=ef_search or index.hnsw.efSearch, **selected)
+        return None
+    if selected:
+        return faiss.SearchParameters(**selected)
+    return None
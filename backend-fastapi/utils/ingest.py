@@ -0,0 +1,160 @@
+"""
+Bulk outlet loader.
+
+Streams outlets from a CSV or JSONL file and upserts them by name in
+chunked executemany transactions. Each chunk commits on its own, so with WAL
+readers keep being served throughout a refresh and the write lock is only
+held briefly. Rows whose values are unchanged are skipped, so a refresh only
+fires the index triggers (services, hours, FTS, R*Tree) for outlets that
+actually changed.
+
+Run from the backend-fastapi directory:
+
+    python -m utils.ingest outlets.csv
+    python -m utils.ingest outlets.jsonl --prune
+
+CSV columns: name, address, opening_time, closing_time, services (separated
+by ";"), latitude, longitude. JSONL objects use the same keys, with services
+as a list.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["name", "address", "opening_time", "closing_time", "services", "latitude", "longitude"]
+
+UPSERT_SQL = (
+    f"INSERT INTO outlets ({', '.join(COLUMNS)}) VALUES ({', '.join(':' + c for c in COLUMNS)}) "
+    "ON CONFLICT (name) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in COLUMNS if c != "name")
+    + " WHERE " + " OR ".join(f"{c} IS NOT excluded.{c}" for c in COLUMNS if c != "name")
+)
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def normalize_outlet(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Outlet row for UPSERT_SQL, or None if the record is unusable"""
+    name = (record.get("name") or "").strip()
+    address = (record.get("address") or "").strip()
+    if not name or not address:
+        return None
+    services = record.get("services") or []
+    if isinstance(services, str):
+        services = [s.strip() for s in services.split(";") if s.strip()]
+    try:
+        latitude = _optional_float(record.get("latitude"))
+        longitude = _optional_float(record.get("longitude"))
+    except ValueError:
+        return None
+    return {
+        "name": name,
+        "address": address,
+        "opening_time": (record.get("opening_time") or "").strip() or None,
+        "closing_time": (record.get("closing_time") or "").strip() or None,
+        "services": json.dumps(services) if services else None,
+        "latitude": latitude,
+        "longitude": longitude,
+    }
+
+
+def read_records(path: str, file_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream raw records from a CSV or JSONL file"""
+    file_format = file_format or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            yield from csv.DictReader(f)
+        elif file_format == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unknown format '{file_format}', expected csv or jsonl")
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def upsert_outlets(engine, records: Iterable[Dict[str, Any]], chunk_size: int = 1000,
+                   prune: bool = False) -> Dict[str, int]:
+    """
+    Upsert outlets by name, one transaction per chunk. With prune, outlets
+    missing from records are deleted afterwards.
+    """
+    stats = {"read": 0, "skipped": 0, "written": 0, "deleted": 0}
+
+    def valid_rows():
+        for record in records:
+            stats["read"] += 1
+            row = normalize_outlet(record)
+            if row is None:
+                stats["skipped"] += 1
+                logger.warning("Skipping outlet record %d: %r", stats["read"], record)
+                continue
+            yield row
+
+    with engine.connect() as conn:
+        if prune:
+            conn.execute(text("CREATE TEMP TABLE IF NOT EXISTS ingest_names (name TEXT PRIMARY KEY)"))
+            conn.execute(text("DELETE FROM temp.ingest_names"))
+            conn.commit()
+        for chunk in _chunks(valid_rows(), chunk_size):
+            with conn.begin():
+                # rowcount counts inserted and changed outlets, not trigger writes
+                stats["written"] += conn.execute(text(UPSERT_SQL), chunk).rowcount
+                if prune:
+                    conn.execute(
+                        text("INSERT OR IGNORE INTO temp.ingest_names (name) VALUES (:name)"),
+                        [{"name": row["name"]} for row in chunk],
+                    )
+        # An empty or unreadable feed must not wipe the table
+        if prune and stats["read"] > stats["skipped"]:
+            with conn.begin():
+                result = conn.execute(text(
+                    "DELETE FROM outlets WHERE name NOT IN (SELECT name FROM temp.ingest_names)"
+                ))
+                stats["deleted"] = result.rowcount
+        if prune:
+            conn.execute(text("DROP TABLE temp.ingest_names"))
+            conn.commit()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load outlets from a CSV or JSONL file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None,
+                        help="file format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("INGEST_CHUNK_SIZE", "1000")))
+    parser.add_argument("--prune", action="store_true", help="delete outlets that are not in the file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from utils.database import engine, init_db
+
+    init_db(seed=False)
+    stats = upsert_outlets(engine, read_records(args.path, args.format), args.chunk_size, args.prune)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+BM25 inverted index for lexical product search.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens. Hyphenated words also yield their parts and a
+    joined form, so "All-Can" matches "all-can", "all can" and "allcan".
+    """
+    tokens = []
+    for word in TOKEN_RE.findall(text.lower()):
+        tokens.append(word)
+        if "-" in word:
+            parts = word.split("-")
+            tokens.extend(parts)
+            tokens.append("".join(parts))
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over integer document ids (0..n-1).
+    Built with add(), or loaded with from_arrays() from postings saved by
+    to_arrays(); a loaded index searches the (memory-mapped) arrays
+    directly and is only converted back to lists if documents are added.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)  # term -> [(doc_id, tf)]
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        # Loaded form: term -> row in offsets, CSR postings and dense lengths
+        self._terms: Optional[Dict[str, int]] = None
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self._length_array: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        if self._arrays is not None:
+            return len(self._arrays["doc_lengths"])
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: int, tokens: List[str]):
+        """Index a document given its tokens"""
+        self._thaw()
+        for term, tf in Counter(tokens).items():
+            self.postings[term].append((doc_id, tf))
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        self._length_array = None
+
+    def to_arrays(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """(meta, arrays) holding the index in CSR form, for save_arrays"""
+        if self._arrays is not None:
+            return {"k1": self.k1, "b": self.b, "terms": list(self._terms),
+                    "total_length": self.total_length}, self._arrays
+        terms = sorted(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(self.postings[term]) for term in terms])
+        postings = [posting for term in terms for posting in self.postings[term]]
+        pairs = np.asarray(postings, dtype="int32").reshape(-1, 2)
+        return (
+            {"k1": self.k1, "b": self.b, "terms": terms, "total_length": self.total_length},
+            {
+                "offsets": offsets,
+                "doc_ids": np.ascontiguousarray(pairs[:, 0]),
+                "tfs": np.ascontiguousarray(pairs[:, 1]),
+                "doc_lengths": self._lengths(),
+            },
+        )
+
+    @classmethod
+    def from_arrays(cls, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> "BM25Index":
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index._terms = {term: row for row, term in enumerate(meta["terms"])}
+        index._arrays = arrays
+        index._length_array = arrays["doc_lengths"]
+        index.total_length = meta["total_length"]
+        return index
+
+    def _thaw(self):
+        """Convert a loaded index back to postings lists so it can grow"""
+        if self._arrays is None:
+            return
+        offsets, doc_ids, tfs = (self._arrays[name] for name in ("offsets", "doc_ids", "tfs"))
+        for term, row in self._terms.items():
+            start, end = offsets[row], offsets[row + 1]
+            self.postings[term] = list(zip(doc_ids[start:end].tolist(), tfs[start:end].tolist()))
+        self.doc_lengths = dict(enumerate(self._arrays["doc_lengths"].tolist()))
+        self._terms = self._arrays = self._length_array = None
+
+    def _lengths(self) -> np.ndarray:
+        """Document lengths indexed by doc id"""
+        if self._length_array is None:
+            lengths = np.zeros(max(self.doc_lengths, default=-1) + 1, dtype="int32")
+            for doc_id, length in self.doc_lengths.items():
+                lengths[doc_id] = length
+            self._length_array = lengths
+        return self._length_array
+
+    def _term_postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(doc_ids, tfs) arrays for a term"""
+        if self._arrays is not None:
+            row = self._terms.get(term)
+            if row is None:
+                return None
+            start, end = self._arrays["offsets"][row], self._arrays["offsets"][row + 1]
+            return self._arrays["doc_ids"][start:end], self._arrays["tfs"][start:end]
+        postings = self.postings.get(term)
+        if not postings:
+            return None
+        pairs = np.asarray(postings, dtype="int64")
+        return pairs[:, 0], pairs[:, 1]
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Return up to k (doc_id, score) pairs, best first, optionally
+        restricted to allowed (a sorted array of doc ids)
+        """
+        n = len(self)
+        if not n:
+            return []
+        avg_length = self.total_length / n
+        lengths = self._lengths()
+        matched_ids, matched_scores = [], []
+        for term in set(tokenize(query)):
+            postings = self._term_postings(term)
+            if postings is None:
+                continue
+            doc_ids, tfs = postings
+            idf = math.log(1 + (n - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            if allowed is not None:
+                keep = np.isin(doc_ids, allowed, assume_unique=True)
+                doc_ids, tfs = doc_ids[keep], tfs[keep]
+            tfs = tfs.astype("float64")
+            length_norm = 1 - self.b + self.b * lengths[doc_ids] / avg_length
+            matched_ids.append(doc_ids)
+            matched_scores.append(idf * tfs * (self.k1 + 1) / (tfs + self.k1 * length_norm))
+        if not matched_ids:
+            return []
+        doc_ids, inverse = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(int(doc_ids[i]), float(scores[i])) for i in best]
+
+
+def reciprocal_rank_fusion(rankings: List[Tuple[List[int], float]], k: int, rrf_k: int = 60) -> List[int]:
+    """
+    Fuse ranked id lists into one ranking.
+    Each entry is (ids best first, weight); a document scores
+    sum(weight / (rrf_k + rank)) over the lists it appears in.
+    """
+    scores: Dict[int, float] = defaultdict(float)
+    for ids, weight in rankings:
+        for rank, doc_id in enumerate(ids):
+            scores[doc_id] += weight / (rrf_k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
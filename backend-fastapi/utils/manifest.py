@@ -0,0 +1,106 @@
+"""
+Catalog manifest and stored embeddings for incremental index rebuilds.
+
+The manifest records which embedding model and index type built the files
+on disk, plus a fingerprint per product in store order. Embeddings are kept
+in a raw float32 file (one row per product, same order), so a restart after
+a catalog edit only re-encodes products whose text changed.
+
+Derived indexes (BM25 postings, filter columns) are saved alongside as
+array bundles: .npy files that workers memory-map instead of rebuilding
+them from every product row.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.files import atomic_write
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def product_fingerprint(product: Dict, text: str) -> Dict[str, str]:
+    """
+    Fingerprint a product: a hash of the full record (any change) and of
+    the embedded text (changes that need re-encoding).
+    """
+    return {
+        "name": product.get("name", ""),
+        "content": _sha256(json.dumps(product, sort_keys=True, ensure_ascii=False)),
+        "text": _sha256(text),
+    }
+
+
+def catalog_digest(fingerprints: List[Dict[str, str]]) -> str:
+    """Hash of a catalog's product fingerprints, in store order"""
+    return _sha256("\n".join(fp["content"] for fp in fingerprints))
+
+
+class CatalogManifest:
+    def __init__(self, manifest_file: str, embeddings_file: str):
+        self.manifest_file = manifest_file
+        self.embeddings_file = embeddings_file
+
+    def load(self) -> Optional[Dict]:
+        """Return the manifest, or None if it is missing or unreadable"""
+        try:
+            with open(self.manifest_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, model: str, index_type: str, dim: int, products: List[Dict[str, str]]):
+        """Write the manifest atomically"""
+        with atomic_write(self.manifest_file, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "index_type": index_type, "dim": dim, "products": products}, f)
+
+    def read_embeddings(self, dim: int) -> np.ndarray:
+        """Memory-map the stored embeddings as an (n, dim) array"""
+        if not os.path.exists(self.embeddings_file) or not os.path.getsize(self.embeddings_file):
+            return np.empty((0, dim), dtype="float32")
+        return np.memmap(self.embeddings_file, dtype="float32", mode="r").reshape(-1, dim)
+
+    def append_embeddings(self, embeddings: np.ndarray):
+        with open(self.embeddings_file, "ab") as f:
+            f.write(np.ascontiguousarray(embeddings, dtype="float32").tobytes())
+
+    def write_embeddings(self, embeddings: np.ndarray):
+        """Replace the stored embeddings atomically"""
+        with atomic_write(self.embeddings_file) as f:
+            f.write(np.ascontiguousarray(embeddings, dtype="float32").tobytes())
+
+
+def save_arrays(prefix: str, meta: Dict, arrays: Dict[str, np.ndarray]):
+    """
+    Save arrays as <prefix>.<name>.npy and meta as <prefix>.json, each
+    replaced atomically. The JSON is written last and records every array's
+    shape, so a bundle caught mid-write is detected by load_arrays.
+    """
+    for name, array in arrays.items():
+        with atomic_write(f"{prefix}.{name}.npy") as f:
+            np.save(f, np.ascontiguousarray(array))
+    meta = dict(meta, shapes={name: list(array.shape) for name, array in arrays.items()})
+    with atomic_write(prefix + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def load_arrays(prefix: str) -> Optional[Tuple[Dict, Dict[str, np.ndarray]]]:
+    """Memory-map a bundle written by save_arrays; None if missing or inconsistent"""
+    try:
+        with open(prefix + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(f"{prefix}.{name}.npy", mmap_mode="r")
+            for name in meta["shapes"]
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    if any(list(arrays[name].shape) != shape for name, shape in meta["shapes"].items()):
+        return None
+    return meta, arrays
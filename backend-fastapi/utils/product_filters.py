@@ -0,0 +1,106 @@
+"""
+Structured product filters, resolved to candidate ids before vector search.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.cache import normalize_text
+
+
+@dataclass(frozen=True)
+class ProductFilters:
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    color: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        return self.category is None and self.min_price is None \
+            and self.max_price is None and self.color is None
+
+
+class ProductAttributeIndex:
+    """
+    Per-product category, price and colour columns.
+    A colour filter matches a full colour name ("thunder blue") or any word
+    in it ("blue"). Columns saved with to_arrays() load as views of the
+    (memory-mapped) arrays.
+    """
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.category_ids: Dict[str, List[int]] = defaultdict(list)
+        self.color_ids: Dict[str, List[int]] = defaultdict(list)
+        self._price_array: Optional[np.ndarray] = None
+
+    def add(self, product_id: int, product: Dict):
+        self._thaw()
+        self.prices.append(float(product.get("price", 0.0)))
+        self.category_ids[normalize_text(product.get("category", ""))].append(product_id)
+        keys = set()
+        for color in product.get("colors", []):
+            color = normalize_text(color)
+            keys.add(color)
+            keys.update(color.split())
+        for key in keys:
+            self.color_ids[key].append(product_id)
+        self._price_array = None
+
+    def to_arrays(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """(meta, arrays) holding the columns, for save_arrays"""
+        meta: Dict[str, Any] = {}
+        arrays = {"prices": np.asarray(self.prices, dtype="float64")}
+        for column, ids_by_key in (("category", self.category_ids), ("color", self.color_ids)):
+            keys = sorted(ids_by_key)
+            offsets = np.zeros(len(keys) + 1, dtype="int64")
+            offsets[1:] = np.cumsum([len(ids_by_key[key]) for key in keys])
+            meta[column] = keys
+            arrays[f"{column}_offsets"] = offsets
+            arrays[f"{column}_ids"] = np.asarray(
+                [i for key in keys for i in ids_by_key[key]], dtype="int64"
+            )
+        return meta, arrays
+
+    @classmethod
+    def from_arrays(cls, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> "ProductAttributeIndex":
+        index = cls()
+        index.prices = index._price_array = arrays["prices"]
+        for column, ids_by_key in (("category", index.category_ids), ("color", index.color_ids)):
+            offsets, ids = arrays[f"{column}_offsets"], arrays[f"{column}_ids"]
+            for row, key in enumerate(meta[column]):
+                ids_by_key[key] = ids[offsets[row]:offsets[row + 1]]
+        return index
+
+    def _thaw(self):
+        """Convert loaded columns back to lists so they can grow"""
+        if isinstance(self.prices, np.ndarray):
+            self.prices = self.prices.tolist()
+            for ids_by_key in (self.category_ids, self.color_ids):
+                for key, ids in ids_by_key.items():
+                    ids_by_key[key] = ids.tolist()
+
+    def select(self, filters: ProductFilters) -> np.ndarray:
+        """Return the sorted ids of products matching every filter"""
+        ids = None
+        if filters.category is not None:
+            ids = np.asarray(self.category_ids.get(normalize_text(filters.category), []), dtype='int64')
+        if filters.color is not None:
+            color_ids = np.asarray(self.color_ids.get(normalize_text(filters.color), []), dtype='int64')
+            ids = color_ids if ids is None else np.intersect1d(ids, color_ids, assume_unique=True)
+        if filters.min_price is not None or filters.max_price is not None:
+            if self._price_array is None:
+                self._price_array = np.asarray(self.prices, dtype='float64')
+            mask = np.ones(len(self._price_array), dtype=bool)
+            if filters.min_price is not None:
+                mask &= self._price_array >= filters.min_price
+            if filters.max_price is not None:
+                mask &= self._price_array <= filters.max_price
+            price_ids = np.flatnonzero(mask).astype('int64')
+            ids = price_ids if ids is None else np.intersect1d(ids, price_ids, assume_unique=True)
+        if ids is None:
+            ids = np.arange(len(self.prices), dtype='int64')
+        return ids
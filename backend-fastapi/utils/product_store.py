@@ -0,0 +1,120 @@
+"""
+Memory-mapped product metadata store.
+
+Products are stored as UTF-8 JSON rows in a data file, with a separate
+offsets file holding n + 1 little-endian uint64 row boundaries. Readers
+memory-map both files, so uvicorn workers share the pages through the OS
+page cache and only the rows a search returns are decoded.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List
+
+from utils.files import atomic_path
+
+OFFSET = struct.Struct("<Q")
+
+
+def _encode_row(product: Dict) -> bytes:
+    return json.dumps(product, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ProductMetadataStore:
+    def __init__(self, data_file: str, offsets_file: str):
+        self.data_file = data_file
+        self.offsets_file = offsets_file
+        self._data = None
+        self._offsets = None
+        self._offsets_view = None
+        self._count = 0
+        self._pending: List[Dict] = []  # appended rows not yet flushed
+        self._open()
+
+    def _open(self):
+        """Memory-map the data and offsets files if they exist"""
+        self._close()
+        if not os.path.exists(self.offsets_file) or os.path.getsize(self.offsets_file) < OFFSET.size:
+            return
+        with open(self.offsets_file, "rb") as f:
+            self._offsets = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets_view = memoryview(self._offsets).cast("Q")
+        self._count = len(self._offsets_view) - 1
+        if self._count and os.path.getsize(self.data_file):
+            with open(self.data_file, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close(self):
+        if self._offsets_view is not None:
+            self._offsets_view.release()
+            self._offsets_view = None
+        for mapped in (self._offsets, self._data):
+            if mapped is not None:
+                mapped.close()
+        self._offsets = self._data = None
+        self._count = 0
+
+    def reopen(self):
+        """Map the files afresh, e.g. after another process replaced them"""
+        if not self._pending:
+            self._open()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.offsets_file)
+
+    def __len__(self) -> int:
+        return self._count + len(self._pending)
+
+    def __getitem__(self, idx: int) -> Dict:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("product index out of range")
+        if idx >= self._count:
+            return self._pending[idx - self._count]
+        start, end = self._offsets_view[idx], self._offsets_view[idx + 1]
+        return json.loads(self._data[start:end])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def extend(self, products: Iterable[Dict]):
+        """Append products; they are written to disk on flush()"""
+        self._pending.extend(products)
+
+    def flush(self):
+        """Append pending rows to the data and offsets files"""
+        if not self._pending:
+            return
+        end = self._offsets_view[self._count] if self._offsets_view is not None else None
+        with open(self.data_file, "ab") as data, open(self.offsets_file, "ab") as offsets:
+            if end is None:
+                end = data.tell()
+                offsets.write(OFFSET.pack(end))
+            for product in self._pending:
+                row = _encode_row(product)
+                data.write(row)
+                end += len(row)
+                offsets.write(OFFSET.pack(end))
+        self._pending = []
+        self._open()
+
+    def rewrite(self, products: Iterable[Dict]):
+        """Replace the whole store with products, atomically"""
+        end = 0
+        # The offsets file is replaced last, since it decides the row count
+        with atomic_path(self.offsets_file) as offsets_tmp:
+            with atomic_path(self.data_file) as data_tmp:
+                with open(data_tmp, "wb") as data, open(offsets_tmp, "wb") as offsets:
+                    offsets.write(OFFSET.pack(end))
+                    for product in products:
+                        row = _encode_row(product)
+                        data.write(row)
+                        end += len(row)
+                        offsets.write(OFFSET.pack(end))
+                self._pending = []
+                self._close()
+        self._open()
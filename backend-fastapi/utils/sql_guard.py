@@ -0,0 +1,217 @@
+"""
+Guarded execution of generated SQL.
+
+Queries run on read-only SQLite connections in a thread pool, and are
+rejected (with a reason code) unless they are:
+- a single SELECT (or WITH ... SELECT) statement
+- reading only known tables, as reported by SQLite's authorizer while it
+  compiles the statement
+- free of full scans over tables larger than max_scan_rows, according to
+  EXPLAIN QUERY PLAN
+Results are capped at max_rows by wrapping the query in a LIMIT, and a
+progress handler aborts any query that runs longer than the time budget.
+"""
+
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.cache import LRUCache
+
+# Reason codes
+PARSE_ERROR = "parse_error"
+MULTIPLE_STATEMENTS = "multiple_statements"
+NOT_SELECT = "not_select"
+UNKNOWN_TABLE = "unknown_table"
+NOT_ALLOWED = "not_allowed"
+FULL_SCAN = "full_scan"
+TIMEOUT = "timeout"
+EXECUTION_ERROR = "execution_error"
+
+_COMMENT_RE = re.compile(r"^\s*(?:--[^\n]*\n|/\*.*?\*/)", re.S)
+# SQLite before 3.36 prints "SCAN TABLE outlets", later versions "SCAN outlets"
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+_TABLE_REF_RE = re.compile(r"\b(?:from|join)\s+(\w+)(?:\s+(?:as\s+)?(\w+))?", re.I)
+_NOT_ALIASES = {
+    "where", "join", "inner", "left", "right", "full", "cross", "natural", "on", "using",
+    "group", "order", "limit", "having", "union", "except", "intersect", "window",
+}
+
+# Internal reads SQLite makes for FTS5/R*Tree tables
+_ALLOWED_PRAGMAS = {"data_version"}
+
+
+class SQLRejected(Exception):
+    """A query refused by the guard; reason is one of the reason codes"""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(f"{reason}: {detail}")
+        self.reason = reason
+        self.detail = detail
+
+
+class SQLGuard:
+    def __init__(
+        self,
+        database_path: str,
+        known_tables: Iterable[str],
+        max_rows: int = 200,
+        time_budget_ms: float = 500,
+        max_scan_rows: int = 10_000,
+        workers: int = 4,
+        statement_cache_size: int = 256,
+    ):
+        self.database_path = database_path
+        self.known_tables = set(known_tables)
+        self.max_rows = max_rows
+        self.time_budget = time_budget_ms / 1000
+        self.max_scan_rows = max_scan_rows
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql-guard")
+        self._local = threading.local()
+        self._table_rows = LRUCache(maxsize=64, ttl=60)
+        # Statements that passed the checks; parameterized templates are
+        # checked once, and sqlite3 reuses their compiled statements
+        self.statement_cache_size = statement_cache_size
+        self._checked = LRUCache(maxsize=statement_cache_size, ttl=60)
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.rejections: Dict[str, int] = {}
+
+    async def execute(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Check and run a query off the event loop; raises SQLRejected"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.execute_sync, sql, params or {})
+
+    def execute_sync(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        try:
+            rows = self._execute(sql, params or {})
+        except SQLRejected as e:
+            with self._lock:
+                self.rejections[e.reason] = self.rejections.get(e.reason, 0) + 1
+            raise
+        with self._lock:
+            self.executed += 1
+        return rows
+
+    def _connection(self) -> sqlite3.Connection:
+        """Read-only connection for the current worker thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"file:{self.database_path}?mode=ro", uri=True, check_same_thread=False,
+                cached_statements=self.statement_cache_size
+            )
+            conn.execute("PRAGMA query_only = ON")
+            conn.row_factory = sqlite3.Row
+            # Connect FTS5/R*Tree tables before the authorizer is installed;
+            # their modules read the schema and prepare internal statements
+            for table in self.known_tables:
+                try:
+                    conn.execute(f"SELECT * FROM {table} LIMIT 0").fetchall()
+                except sqlite3.OperationalError:
+                    pass
+            conn.set_authorizer(self._authorize)
+            self._local.conn = conn
+        return conn
+
+    def _is_shadow(self, table: Optional[str]) -> bool:
+        # FTS5 and R*Tree keep their data in shadow tables named <table>_*
+        return bool(table) and any(table.startswith(f"{t}_") for t in self.known_tables)
+
+    def _authorize(self, action, arg1, arg2, db_name, trigger) -> int:
+        if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE):
+            return sqlite3.SQLITE_OK
+        if self._is_shadow(arg1):
+            # Internal statements of the virtual table modules; the
+            # connection itself is read-only
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_READ:
+            # db_name is None for CTE references
+            if arg1 in self.known_tables or db_name is None:
+                return sqlite3.SQLITE_OK
+            self._local.denied = (UNKNOWN_TABLE, f"table '{arg1}' is not allowed")
+            return sqlite3.SQLITE_DENY
+        if action == sqlite3.SQLITE_PRAGMA and arg1 in _ALLOWED_PRAGMAS:
+            return sqlite3.SQLITE_OK
+        self._local.denied = (NOT_ALLOWED, f"operation {action} ({arg1}) is not allowed")
+        return sqlite3.SQLITE_DENY
+
+    def _execute(self, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        statement = sql.strip().rstrip(";").strip()
+        body = statement
+        while _COMMENT_RE.match(body):
+            body = _COMMENT_RE.sub("", body, count=1)
+        if not re.match(r"(?:select|with)\b", body.strip(), re.I):
+            raise SQLRejected(NOT_SELECT, "only SELECT statements are allowed")
+
+        conn = self._connection()
+        if statement not in self._checked:
+            plan = self._plan(conn, statement, params)
+            self._check_scans(conn, statement, plan)
+            self._checked.set(statement, True)
+
+        # Newlines keep a trailing line comment from swallowing the ")"
+        wrapped = f"SELECT * FROM (\n{statement}\n) LIMIT {int(self.max_rows)}"
+        deadline = time.monotonic() + self.time_budget
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+        try:
+            return [dict(row) for row in conn.execute(wrapped, params)]
+        except sqlite3.OperationalError as e:
+            if "interrupted" in str(e):
+                raise SQLRejected(TIMEOUT, f"query exceeded {self.time_budget * 1000:.0f} ms") from e
+            raise SQLRejected(EXECUTION_ERROR, str(e)) from e
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def _plan(self, conn: sqlite3.Connection, statement: str, params: Dict[str, Any]) -> List[str]:
+        """Compile the statement under the authorizer and return its query plan"""
+        self._local.denied = None
+        try:
+            return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + statement, params)]
+        except (sqlite3.ProgrammingError, sqlite3.Warning) as e:
+            if "one statement" in str(e):
+                raise SQLRejected(MULTIPLE_STATEMENTS, "only a single statement is allowed") from e
+            raise SQLRejected(PARSE_ERROR, str(e)) from e
+        except sqlite3.DatabaseError as e:
+            if self._local.denied is not None:
+                raise SQLRejected(*self._local.denied) from e
+            raise SQLRejected(PARSE_ERROR, str(e)) from e
+
+    def _check_scans(self, conn: sqlite3.Connection, statement: str, plan: List[str]):
+        """Reject full scans over known tables with more than max_scan_rows rows"""
+        tables = {table: table for table in self.known_tables}
+        for table, alias in _TABLE_REF_RE.findall(statement):
+            if table in self.known_tables and alias and alias.lower() not in _NOT_ALIASES:
+                tables[alias] = table
+        for detail in plan:
+            match = _SCAN_RE.match(detail)
+            if match is None or "VIRTUAL TABLE" in detail:
+                continue
+            table = tables.get(match.group(1))
+            if table is None:
+                continue
+            rows = self._row_count(conn, table)
+            if rows > self.max_scan_rows:
+                raise SQLRejected(FULL_SCAN, f"full scan of {table} ({rows} rows)")
+
+    def _row_count(self, conn: sqlite3.Connection, table: str) -> int:
+        rows = self._table_rows.get(table)
+        if rows is None:
+            rows = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            self._table_rows.set(table, rows)
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_rows": self.max_rows,
+            "time_budget_ms": self.time_budget * 1000,
+            "max_scan_rows": self.max_scan_rows,
+            "executed": self.executed,
+            "checked_statements": self._checked.stats(),
+            "rejected": sum(self.rejections.values()),
+            "rejections": dict(self.rejections),
+        }
@@ -0,0 +1,299 @@
+"""
+Rule-based fast path for common outlet questions.
+
+Recognises the question shapes used as few-shot examples in the Text2SQL
+prompt (location, service, "open after", "open now/at" and weekday filters,
+in any combination) and compiles them straight to parameterized SQL.
+Locations are matched through the outlets_fts full-text index and hours
+through outlet_hours. Anything it cannot fully account for returns None so
+the caller falls back to the LLM.
+"""
+
+import logging
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.hours import WEEKDAYS, local_now
+
+logger = logging.getLogger(__name__)
+
+# Service codes as stored in outlet_services.code
+SERVICES = {
+    "dine-in": "dine-in",
+    "dine in": "dine-in",
+    "dinein": "dine-in",
+    "takeaway": "takeaway",
+    "take-away": "takeaway",
+    "take away": "takeaway",
+    "delivery": "delivery",
+}
+
+SERVICE_RE = re.compile(
+    r"\b(?:no-contact\s+)?(" + "|".join(re.escape(s) for s in sorted(SERVICES, key=len, reverse=True)) + r")\b"
+)
+
+TIME = r"(?:(noon|midnight)|(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?)"
+
+# "open after 8pm", "closing past 10:30": still open later than the time
+TIME_RE = re.compile(
+    r"\b(?:open|opened|opens|closing|closes|close)\s+(?:after|past|beyond|later than)\s+" + TIME
+)
+
+# "open until 10pm", "open till 2am": still open at the time, so outlets
+# closing exactly then count
+UNTIL_RE = re.compile(r"\b(?:open|opened|opens)\s+(?:until|till)\s+" + TIME)
+
+# "open now", "open at 3pm"
+OPEN_AT_RE = re.compile(
+    r"\b(?:(currently\s+open|open\s+(?:right\s+)?now)|(?:open|opened|opens)\s+at\s+" + TIME + ")"
+)
+
+# "on sunday", "today", "tomorrow"
+WEEKDAY_RE = re.compile(
+    r"\b(?:on\s+)?(" + "|".join(WEEKDAYS) + r"|today|tonight|tomorrow)s?\b"
+)
+
+# Named parameters in SQL or a question template (":location_0")
+PARAM_RE = re.compile(r"(?<![:\w]):([a-z_]+(?:_\d+)?)\b")
+
+# Delimits the spans lift() has replaced with placeholders
+_MARK = "\x00"
+
+# "open after 2am" means the night after the day asked about
+LATE_NIGHT_MINUTES = 6 * 60
+
+# "in Bangsar", "at SS 2", "near Petaling Jaya" - up to the next clause
+LOCATION_RE = re.compile(
+    r"\b(?:in|at|near|around)\s+(?!the\b)([a-z0-9][a-z0-9 /\-']*?)"
+    r"(?=\s+(?:with|that|which|offering|offer|offers|having|has|have|and|on|open|opened|opens|closing|closes)\b"
+    r"|\s*\x00|[?.!,]|$)"
+)
+
+# Words that carry no filter meaning in these question shapes
+FILLER = set("""
+    show me find list give get display all any the a an which what where are is there do does
+    outlet outlets store stores shop shops branch branches zus coffee cafe cafes location locations
+    please can you i want to know of that have has with offer offers offering provide provides
+    service services available and or option options support supports open
+""".split())
+
+
+def fts_tokens(text: str) -> List[str]:
+    """Split text into the word tokens outlets_fts indexes"""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def fts_phrase(text: str, column: Optional[str] = None) -> Optional[str]:
+    """FTS5 query matching the words of text as a phrase, optionally in one column"""
+    tokens = fts_tokens(text)
+    if not tokens:
+        return None
+    phrase = '"' + " ".join(tokens) + '"'
+    return f"{column} : {phrase}" if column else phrase
+
+
+def fts_any(text: str) -> Optional[str]:
+    """FTS5 query matching any non-filler word of text (as a prefix)"""
+    tokens = list(dict.fromkeys(t for t in fts_tokens(text) if t not in FILLER))
+    if not tokens:
+        return None
+    return " OR ".join(f'"{token}"*' for token in tokens)
+
+
+def used_params(sql: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """The params that sql refers to"""
+    used = set(PARAM_RE.findall(sql))
+    return {name: value for name, value in params.items() if name in used}
+
+
+def _parse_time(word: Optional[str], hour: Optional[str], minute: Optional[str],
+                meridiem: Optional[str]) -> Optional[int]:
+    """Minutes since midnight for the groups of TIME, or None if ambiguous"""
+    if word:
+        return 12 * 60 if word == "noon" else 0
+    hour_value, minute_value = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= hour_value <= 12:
+            return None
+        hour_value = hour_value % 12 + (12 if meridiem.startswith("p") else 0)
+    elif minute is None:
+        # "open after 8" is ambiguous without am/pm or minutes
+        return None
+    if hour_value > 23 or minute_value > 59:
+        return None
+    return hour_value * 60 + minute_value
+
+
+@dataclass
+class LiftedQuestion:
+    """A question with its literals replaced by placeholders (see RuleBasedSQLCompiler.lift)"""
+    template: str  # e.g. "outlets in :location_0 open after :after_0"
+    params: Dict[str, Any]  # placeholder name -> value to bind
+    conditions: List[str]  # WHERE conditions on outlets using the params
+    residual: str  # the question with lifted spans removed
+    complete: bool  # False if some literal couldn't be interpreted
+
+
+class RuleBasedSQLCompiler:
+    """
+    Compiles recognised outlet questions to (sql, params).
+    clock returns the current (weekday, minute) for "open now" and for
+    hours questions that don't name a day.
+    """
+
+    def __init__(self, clock: Callable[[], Tuple[int, int]] = local_now):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.compiled = 0
+        self.fallbacks = 0
+
+    def compile(self, question: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return (sql, params) for a recognised question, or None"""
+        result = self._compile(question)
+        with self._lock:
+            if result is None:
+                self.fallbacks += 1
+            else:
+                self.compiled += 1
+        logger.info(
+            "text2sql %s: %r (fast-path coverage %.1f%%)",
+            "fast path" if result else "llm fallback", question, self.coverage() * 100
+        )
+        return result
+
+    def _compile(self, question: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        lifted = self.lift(question)
+        # Every remaining word must be filler, otherwise the question asks
+        # for something these rules do not understand (counts, sorting, ...)
+        leftover = [word for word in re.findall(r"[a-z0-9'\-]+", lifted.residual) if word not in FILLER]
+        if not lifted.complete or not lifted.conditions or leftover:
+            return None
+        sql = "SELECT * FROM outlets WHERE " + " AND ".join(lifted.conditions)
+        # lift() binds :weekday for a named day even when only :after_day_N
+        # uses it; extra params would split the result cache by weekday
+        return sql, used_params(sql, lifted.params)
+
+    def lift(self, question: str) -> LiftedQuestion:
+        """
+        Replace the literals in a question (days, times, services,
+        locations) with named placeholders, e.g. "outlets in Bangsar" ->
+        "outlets in :location_0" with params {"location_0": 'address : "bangsar"'}.
+        Questions that differ only in those values share a template.
+        """
+        text = question.lower().strip()
+        conditions: List[str] = []
+        params: Dict[str, Any] = {}
+        counters: Dict[str, int] = defaultdict(int)
+        complete = True
+
+        def placeholder(kind: str) -> str:
+            name = f"{kind}_{counters[kind]}"
+            counters[kind] += 1
+            return name
+
+        today, now = self.clock()
+        weekdays = WEEKDAY_RE.findall(text)
+        weekday = today
+        if len(set(weekdays)) > 1:
+            complete = False
+            weekdays = []
+        elif weekdays:
+            if weekdays[0] in WEEKDAYS:
+                weekday = WEEKDAYS.index(weekdays[0])
+            elif weekdays[0] == "tomorrow":
+                weekday = (today + 1) % 7
+            text = WEEKDAY_RE.sub(f" {_MARK}on :weekday{_MARK} ", text)
+        hours: List[str] = []
+
+        def closing_lifter(kind: str, operator: str) -> Callable[[re.Match], str]:
+            """Lifts "open <kind> <time>" to close_min <operator> :<kind>_N"""
+            def lift_closing(match: re.Match) -> str:
+                nonlocal complete
+                minute = _parse_time(*match.groups())
+                if minute is None:
+                    complete = False
+                    return match.group(0)
+                name = placeholder(kind)
+                if kind == "until" and minute == 0:
+                    # Open until midnight: the day's interval ends at 1440
+                    minute = 24 * 60
+                if minute < LATE_NIGHT_MINUTES:
+                    # Still open in the early hours of the next day
+                    day = name.replace(kind, f"{kind}_day", 1)
+                    hours.append(f"weekday = :{day} AND open_min = 0 AND close_min {operator} :{name}")
+                    params[day] = (weekday + 1) % 7
+                else:
+                    hours.append(f"weekday = :weekday AND close_min {operator} :{name}")
+                params[name] = minute
+                return f" {_MARK}open {kind} :{name}{_MARK} "
+
+            return lift_closing
+
+        text = TIME_RE.sub(closing_lifter("after", ">"), text)
+        text = UNTIL_RE.sub(closing_lifter("until", ">="), text)
+
+        def lift_open_at(match: re.Match) -> str:
+            nonlocal complete
+            minute = now if match.group(1) else _parse_time(*match.groups()[1:])
+            if minute is None:
+                complete = False
+                return match.group(0)
+            name = placeholder("minute")
+            hours.append(f"weekday = :weekday AND open_min <= :{name} AND close_min > :{name}")
+            params[name] = minute
+            return f" {_MARK}open at :{name}{_MARK} "
+
+        text = OPEN_AT_RE.sub(lift_open_at, text)
+
+        if weekdays and not hours:
+            # "outlets in Bangsar on sunday": open at some point that day
+            hours.append("weekday = :weekday")
+        for condition in hours:
+            conditions.append(f"id IN (SELECT outlet_id FROM outlet_hours WHERE {condition})")
+        if weekdays or ":weekday" in " ".join(hours):
+            params["weekday"] = weekday
+
+        def lift_service(match: re.Match) -> str:
+            name = placeholder("service")
+            conditions.append(f"id IN (SELECT outlet_id FROM outlet_services WHERE code = :{name})")
+            params[name] = SERVICES[match.group(1)]
+            return f" {_MARK}:{name}{_MARK} "
+
+        text = SERVICE_RE.sub(lift_service, text)
+
+        def lift_location(match: re.Match) -> str:
+            nonlocal complete
+            location = match.group(1).strip()
+            phrase = fts_phrase(location, column="address")
+            if not location or location in FILLER or phrase is None:
+                complete = False
+                return match.group(0)
+            name = placeholder("location")
+            conditions.append(f"id IN (SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH :{name})")
+            params[name] = phrase
+            preposition = match.group(0)[:match.start(1) - match.start(0)]
+            return f" {_MARK}{preposition}:{name}{_MARK} "
+
+        text = LOCATION_RE.sub(lift_location, text)
+
+        return LiftedQuestion(
+            template=" ".join(text.replace(_MARK, "").split()),
+            params=params,
+            conditions=conditions,
+            residual=re.sub(f"{_MARK}[^{_MARK}]*{_MARK}", " ", text),
+            complete=complete,
+        )
+
+    def coverage(self) -> float:
+        total = self.compiled + self.fallbacks
+        return self.compiled / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fast_path": self.compiled,
+            "llm_fallback": self.fallbacks,
+            "coverage": self.coverage(),
+        }
@@ -2,14 +2,38 @@
 Text2SQL implementation for natural language to SQL conversion.
 """
 
-from typing import List, Dict
+from typing import Any, FrozenSet, List, Dict, Tuple
+import logging
 import os
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
+from utils.cache import LRUCache, normalize_text
+from utils.sql_rules import PARAM_RE, RuleBasedSQLCompiler, fts_any, used_params
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+PARAMETER_DESCRIPTIONS = {
+    "location": "full-text query for outlets_fts MATCH on the address",
+    "service": "service code for outlet_services.code",
+    "after": "time of day in minutes since midnight (opening hours after this time)",
+    "after_day": "weekday for hours after midnight (0 = Sunday)",
+    "until": "time of day in minutes since midnight (still open at this time)",
+    "until_day": "weekday for hours until a time after midnight (0 = Sunday)",
+    "minute": "time of day in minutes since midnight (open at this time)",
+    "weekday": "weekday asked about, or today (0 = Sunday)",
+}
+
+def _cache_key(template: str, params: Dict[str, Any]) -> Tuple[str, FrozenSet[str]]:
+    """
+    SQL cache key for a question template. Lifting can bind parameters
+    that don't appear in the template (:weekday for today, :after_day_0
+    for times after midnight), so their names are part of the key.
+    """
+    return normalize_text(template), frozenset(params)
+
 class Text2SQLGenerator:
     def __init__(self):
         self.schema = """
@@ -17,11 +41,43 @@ CREATE TABLE outlets (
     id INTEGER PRIMARY KEY,
     name TEXT,
     address TEXT,
-    opening_time TEXT,
-    closing_time TEXT,
-    services TEXT  -- JSON string array
+    opening_time TEXT,  -- "HH:MM", for display only
+    closing_time TEXT,  -- "HH:MM", for display only
+    services TEXT,  -- JSON string array, for display only
+    latitude REAL,
+    longitude REAL
+);
+
+-- One row per outlet service; filter services through this table
+CREATE TABLE outlet_services (
+    outlet_id INTEGER REFERENCES outlets(id),
+    code TEXT,  -- 'dine-in', 'takeaway' or 'delivery'
+    name TEXT,
+    PRIMARY KEY (outlet_id, code)
 );
+CREATE INDEX ix_outlet_services_code ON outlet_services (code, outlet_id);
+
+-- Opening intervals in minutes since midnight; weekday 0 = Sunday.
+-- Hours past midnight are stored as an interval starting at 0 on the next day.
+CREATE TABLE outlet_hours (
+    outlet_id INTEGER REFERENCES outlets(id),
+    weekday INTEGER,
+    open_min INTEGER,
+    close_min INTEGER,  -- at most 1440
+    PRIMARY KEY (outlet_id, weekday, open_min)
+);
+CREATE INDEX ix_outlet_hours_open ON outlet_hours (weekday, open_min, close_min, outlet_id);
+
+-- Full-text index over outlet name and address; rowid is outlets.id
+CREATE VIRTUAL TABLE outlets_fts USING fts5(name, address);
 """
+        # Deterministic compiler for common question shapes, tried before the LLM
+        self.rules = RuleBasedSQLCompiler()
+
+        # Cache generated SQL per normalized question template and parameter
+        # names, so questions that differ only in lifted values share one entry
+        self.sql_cache = LRUCache(maxsize=int(os.getenv("TEXT2SQL_CACHE_SIZE", "512")))
+
         # Initialize Groq
         self.llm = ChatGroq(
             temperature=0,  # Use 0 for more deterministic SQL generation
@@ -35,48 +91,129 @@ CREATE TABLE outlets (
 
 Convert this question to SQL: "{query}"
 
+Parameters (already bound, use them by name):
+{parameters}
+
 Rules:
 1. Use only the tables and columns shown in the schema
 2. Return a valid SQLite query
-3. For text searches, use LIKE with wildcards
-4. For time comparisons, compare as strings
-5. For services, use json_extract() and json_each() for SQLite array handling
+3. Use only the parameters listed above; where the question has a :name placeholder, use that same :name parameter in the SQL and never write its value as a literal
+4. For name or address searches, use id IN (SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH ...), not LIKE
+5. For opening hours, filter through outlet_hours in minutes since midnight, never compare opening_time/closing_time
+6. For services, filter with id IN (SELECT outlet_id FROM outlet_services WHERE code = ...), never on the services column
 
 Example queries:
-Q: "Show me outlets in Bangsar"
-A: SELECT * FROM outlets WHERE address LIKE '%Bangsar%';
-
-Q: "Which outlets are open after 8pm?"
-A: SELECT * FROM outlets WHERE closing_time > '20:00';
+Q: "Show me outlets in :location_0"
+A: SELECT * FROM outlets WHERE id IN (SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH :location_0);
 
-Q: "Find outlets in Petaling Jaya"
-A: SELECT * FROM outlets WHERE address LIKE '%Petaling Jaya%';
+Q: "Which outlets are open after :after_0?"
+A: SELECT * FROM outlets WHERE id IN (SELECT outlet_id FROM outlet_hours WHERE weekday = :weekday AND close_min > :after_0);
 
-Q: "Which outlets offer dine-in service?"
-A: SELECT * FROM outlets WHERE json_extract(services, '$') LIKE '%Dine-in%';
+Q: "How many outlets in :location_0 offer :service_0?"
+A: SELECT COUNT(*) AS outlet_count FROM outlets WHERE id IN (SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH :location_0) AND id IN (SELECT outlet_id FROM outlet_services WHERE code = :service_0);
 
-Q: "Show me outlets with delivery service"
-A: SELECT * FROM outlets WHERE json_extract(services, '$') LIKE '%delivery%';
+Q: "Which outlet closes the latest?"
+A: SELECT outlets.* FROM outlets JOIN outlet_hours ON outlet_hours.outlet_id = outlets.id ORDER BY outlet_hours.close_min DESC LIMIT 1;
 
 Generate SQL for this query: {query}
 
 Return ONLY the SQL query, nothing else.""")
         ])
 
-    def generate_sql(self, query: str) -> str:
-        """Convert natural language query to SQL"""
+    def generate(self, query: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Convert natural language query to (sql, params).
+        Recognised question shapes are compiled directly. Otherwise the
+        question's literals are lifted into parameters and the LLM writes
+        (or the cache supplies) SQL for the resulting template, with a
+        full-text search if that fails.
+        """
+        compiled = self.rules.compile(query)
+        if compiled is not None:
+            return compiled
+        lifted = self.rules.lift(query)
+        try:
+            sql = self.generate_template(lifted.template, lifted.params)
+            return sql, used_params(sql, lifted.params)
+        except Exception:
+            logger.warning("Text2SQL generation failed for %r, using full-text search", query, exc_info=True)
+            return self.fallback(query)
+
+    def generate_template(self, template: str, params: Dict[str, Any]) -> str:
+        """
+        SQL for a question template, using its placeholders as bound
+        parameters (raises if the LLM call fails or ignores them)
+        """
+        key = _cache_key(template, params)
+        sql = self.sql_cache.get(key)
+        if sql is not None:
+            return sql
+        # Use LangChain with Groq
+        chain = self.sql_prompt | self.llm
+        response = chain.invoke(self._prompt_inputs(template, params))
+        sql = self._check_template(response.content, template, params)
+        self.sql_cache.set(key, sql)
+        return sql
+
+    async def agenerate(self, query: str) -> Tuple[str, Dict[str, Any]]:
+        """Async version of generate() that doesn't block the event loop on the LLM"""
+        compiled = self.rules.compile(query)
+        if compiled is not None:
+            return compiled
+        lifted = self.rules.lift(query)
         try:
-            # Use LangChain with Groq
-            chain = self.sql_prompt | self.llm
-            response = chain.invoke({
-                "schema": self.schema,
-                "query": query
-            })
-            return response.content.strip()
-        except Exception as e:
-            # Fallback to basic search if AI fails
-            search_term = query.replace("'", "''")  # Basic SQL injection prevention
-            return f"SELECT * FROM outlets WHERE name LIKE '%{search_term}%' OR address LIKE '%{search_term}%'"
+            sql = await self.agenerate_template(lifted.template, lifted.params)
+            return sql, used_params(sql, lifted.params)
+        except Exception:
+            logger.warning("Text2SQL generation failed for %r, using full-text search", query, exc_info=True)
+            return self.fallback(query)
+
+    async def agenerate_template(self, template: str, params: Dict[str, Any]) -> str:
+        """Async version of generate_template()"""
+        key = _cache_key(template, params)
+        sql = self.sql_cache.get(key)
+        if sql is not None:
+            return sql
+        chain = self.sql_prompt | self.llm
+        response = await chain.ainvoke(self._prompt_inputs(template, params))
+        sql = self._check_template(response.content, template, params)
+        self.sql_cache.set(key, sql)
+        return sql
+
+    def _prompt_inputs(self, template: str, params: Dict[str, Any]) -> Dict[str, str]:
+        parameters = "\n".join(
+            f":{name} - {PARAMETER_DESCRIPTIONS[name.rstrip('0123456789').rstrip('_')]}"
+            for name in params
+        )
+        return {"schema": self.schema, "query": template, "parameters": parameters or "(none)"}
+
+    @staticmethod
+    def _check_template(sql: str, template: str, params: Dict[str, Any]) -> str:
+        """
+        Only cache SQL that binds every placeholder in the template and
+        names no other parameters, so it is valid for any values
+        """
+        sql = sql.strip()
+        used = set(PARAM_RE.findall(sql))
+        in_template = set(PARAM_RE.findall(template))
+        if not used <= set(params) or not in_template <= used:
+            raise ValueError(f"Generated SQL does not use the template parameters: {sql}")
+        return sql
+
+    @staticmethod
+    def fallback(query: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Ranked full-text search over outlet name and address for any
+        meaningful word in the question, used when the LLM fails
+        """
+        match = fts_any(query)
+        if match is None:
+            return "SELECT * FROM outlets WHERE 0", {}
+        return (
+            "SELECT outlets.* FROM outlets_fts JOIN outlets ON outlets.id = outlets_fts.rowid "
+            "WHERE outlets_fts MATCH :match ORDER BY bm25(outlets_fts, 2.0, 1.0)",
+            {"match": match},
+        )
 
 # Create a global instance
 sql_generator = Text2SQLGenerator() 
\ No newline at end of file
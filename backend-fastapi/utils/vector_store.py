@@ -4,31 +4,107 @@ Vector store implementation for product search.
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import pickle
+import logging
 import os
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Optional
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from data.mock_data import MOCK_PRODUCTS
+from utils.batcher import QueryBatcher
+from utils.cache import LRUCache, SummaryCache, normalize_text
+from utils.encoders import create_encoder
+from utils.files import FileLock, atomic_path
+from utils.index_factory import build_index, search_params
+from utils.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+from utils.manifest import CatalogManifest, catalog_digest, load_arrays, product_fingerprint, save_arrays
+from utils.product_filters import ProductAttributeIndex, ProductFilters
+from utils.product_store import ProductMetadataStore
 
 # Set tokenizers parallelism to false to avoid fork warnings
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class ProductVectorStore:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, data_dir: str = "data", catalog: Optional[Iterable[Dict]] = None):
+        # Encoder backend (torch, int8, onnx) for product and query embeddings
+        self.encoder = create_encoder(
+            os.getenv("EMBEDDING_BACKEND", "torch"),
+            os.getenv("EMBEDDING_MODEL", 'all-MiniLM-L6-v2'),
+            onnx_file=os.getenv("EMBEDDING_ONNX_FILE") or None
+        )
+        self.model_name = self.encoder.name
+        self.embedding_dim = self.encoder.dimension()
+        # Source of truth for the products; the files in data_dir are derived from it
+        self.catalog = MOCK_PRODUCTS if catalog is None else catalog
         self.index = None
-        self.products = []
+        self.index_mmapped = False
         
         # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(data_dir, exist_ok=True)
         
-        self.index_file = 'data/product_index.faiss'
-        self.products_file = 'data/products.pkl'
+        self.index_file = os.path.join(data_dir, 'product_index.faiss')
+        # Every worker opens the store at import; one at a time checks and
+        # rebuilds the files in data_dir
+        self.build_lock = FileLock(os.path.join(data_dir, '.build.lock'))
+        self.products = ProductMetadataStore(
+            os.path.join(data_dir, 'products.dat'),
+            os.path.join(data_dir, 'products.idx')
+        )
+        self.manifest = CatalogManifest(
+            os.path.join(data_dir, 'manifest.json'),
+            os.path.join(data_dir, 'product_embeddings.f32')
+        )
+        # Lexical index and filter columns, saved as memory-mappable arrays
+        self.lexical_file = os.path.join(data_dir, 'lexical_index')
+        self.attributes_file = os.path.join(data_dir, 'product_attributes')
+        self.fingerprints: List[Dict[str, str]] = []
+        self._pending_embeddings: List[np.ndarray] = []
+
+        # Cache query embeddings, since traffic has few distinct queries
+        cache_ttl = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+        self.query_cache = LRUCache(
+            maxsize=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            ttl=cache_ttl if cache_ttl > 0 else None
+        )
+
+        # Cache LLM summaries per query + result set, optionally on disk
+        self.summary_cache = SummaryCache(
+            maxsize=int(os.getenv("SUMMARY_CACHE_SIZE", "1024")),
+            db_file=os.path.join(data_dir, 'summary_cache.db')
+            if os.getenv("SUMMARY_CACHE_DISK", "false").lower() == "true" else None
+        )
+
+        # Index backend (flat, ivf_flat, ivf_pq, hnsw) and query-time tuning
+        self.index_type = os.getenv("PRODUCT_INDEX_TYPE", "flat")
+        self.index_nlist = int(os.getenv("PRODUCT_INDEX_NLIST", "0")) or None
+        self.nprobe = int(os.getenv("PRODUCT_INDEX_NPROBE", "8"))
+        self.ef_search = int(os.getenv("PRODUCT_INDEX_EF_SEARCH", "64"))
+
+        # Lexical index and filter columns, kept alongside the vector index
+        self.lexical = BM25Index()
+        self.attributes = ProductAttributeIndex()
+        self.lexical_weight = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+        self.filter_cache = LRUCache(maxsize=256)
+
+        # Bounded pool for CPU-bound encode/search work called from async code
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("SEARCH_EXECUTOR_WORKERS", "2")),
+            thread_name_prefix="product-search"
+        )
+
+        # Coalesce concurrent async queries into one encode + index search
+        self.batcher = QueryBatcher(
+            self._retrieve_many,
+            self.executor,
+            max_batch_size=int(os.getenv("SEARCH_BATCH_MAX_SIZE", "32")),
+            max_wait_ms=float(os.getenv("SEARCH_BATCH_MAX_WAIT_MS", "2")),
+            max_queue_size=int(os.getenv("SEARCH_BATCH_MAX_QUEUE", "1024"))
+        )
         
         # Initialize Groq
         self.llm = ChatGroq(
@@ -45,60 +121,227 @@ class ProductVectorStore:
         self.load_or_create_index()
 
     def load_or_create_index(self):
-        """Initialize or load existing FAISS index"""
-        if os.path.exists(self.index_file) and os.path.exists(self.products_file):
-            # Load existing index and products
+        """
+        Load the index from disk, bringing it up to date with the catalog.
+        Unchanged files are memory-mapped as-is; after a catalog edit only
+        new or changed products are re-encoded; a different embedding model
+        or index type (or missing files) triggers a full rebuild.
+        Runs under the build lock, so concurrently starting workers wait for
+        the first one's rebuild and then load its files.
+        """
+        catalog = list(self.catalog)
+        fingerprints = [product_fingerprint(p, self._product_text(p)) for p in catalog]
+        with self.build_lock:
+            # Pick up files another worker wrote while this one waited
+            self.products.reopen()
+            manifest = self.manifest.load()
+
+            if not self._manifest_matches_files(manifest):
+                logger.info("Building product index for %d products", len(catalog))
+                self.summary_cache.clear()
+                self._reset(clear_files=True)
+                self.add_products(catalog)
+            elif manifest["products"] == fingerprints:
+                # Memory-map the index so workers share its pages; products are
+                # already memory-mapped by the metadata store
+                self.index = faiss.read_index(self.index_file, self._MMAP_FLAGS)
+                self.index_mmapped = True
+                self.fingerprints = manifest["products"]
+                self._load_metadata_indexes()
+            else:
+                self._sync_catalog(catalog, fingerprints, manifest)
+
+    def _manifest_matches_files(self, manifest: Optional[Dict]) -> bool:
+        """Whether the files on disk were built by this model/index type and agree with each other"""
+        if manifest is None or not os.path.exists(self.index_file) or not self.products.exists():
+            return False
+        if (manifest.get("model"), manifest.get("index_type"), manifest.get("dim")) != \
+                (self.model_name, self.index_type, self.embedding_dim):
+            return False
+        count = len(manifest.get("products", []))
+        return count == len(self.products) == len(self.manifest.read_embeddings(self.embedding_dim))
+
+    def _sync_catalog(self, catalog: List[Dict], fingerprints: List[Dict[str, str]], manifest: Dict):
+        """
+        Rebuild the store for an edited catalog, reusing stored embeddings
+        for products whose embedded text is unchanged.
+        """
+        stored = self.manifest.read_embeddings(self.embedding_dim)
+        stored_rows = {fp["text"]: row for row, fp in enumerate(manifest["products"])}
+
+        embeddings = np.empty((len(catalog), self.embedding_dim), dtype='float32')
+        to_encode = []
+        for i, fp in enumerate(fingerprints):
+            row = stored_rows.get(fp["text"])
+            if row is None:
+                to_encode.append(i)
+            else:
+                embeddings[i] = stored[row]
+        if to_encode:
+            texts = [self._product_text(catalog[i]) for i in to_encode]
+            embeddings[to_encode] = self.encoder.encode(texts, batch_size=256)
+        del stored
+
+        current = {fp["content"] for fp in fingerprints}
+        changed = {fp["name"] for fp in manifest["products"] if fp["content"] not in current}
+        logger.info(
+            "Catalog changed: %d products re-encoded, %d reused, %d removed or changed",
+            len(to_encode), len(catalog) - len(to_encode), len(changed)
+        )
+        self.summary_cache.invalidate_products(changed)
+
+        self._reset()
+        self.products.rewrite(catalog)
+        self.manifest.write_embeddings(embeddings)
+        self.fingerprints = fingerprints
+        if len(catalog):
+            self.index = build_index(self.index_type, embeddings, nlist=self.index_nlist)
+            self.index.add(embeddings)
+            self._index_metadata(self.products, start=0)
+            self._save_to_disk()
+
+    def _reset(self, clear_files: bool = False):
+        """
+        Drop the in-memory index and metadata; clear_files also empties the
+        product and embedding files, for a rebuild that appends to them
+        """
+        self.index = None
+        self.index_mmapped = False
+        if clear_files:
+            self.products.rewrite([])
+            self.manifest.write_embeddings(np.empty((0, self.embedding_dim), dtype='float32'))
+        self.fingerprints = []
+        self._pending_embeddings = []
+        self.lexical = BM25Index()
+        self.attributes = ProductAttributeIndex()
+        self.filter_cache.clear()
+
+    # Flags for loading a shared, read-only index (IO_FLAG_MMAP_IFC maps flat
+    # codes on faiss versions that support it)
+    _MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, 'IO_FLAG_MMAP_IFC', 0)
+
+    def _ensure_index_writable(self):
+        """Reload a memory-mapped index into memory before modifying it"""
+        if self.index_mmapped:
             self.index = faiss.read_index(self.index_file)
-            with open(self.products_file, 'rb') as f:
-                self.products = pickle.load(f)
-        else:
-            # Create new index
-            embedding_size = self.model.get_sentence_embedding_dimension()
-            self.index = faiss.IndexFlatL2(embedding_size)
-            # Add mock products for testing
-            self._add_mock_products()
+            self.index_mmapped = False
+
+    @staticmethod
+    def _product_text(product_info: Dict) -> str:
+        """Create a text representation of the product for embedding"""
+        return f"{product_info['name']} {product_info['description']} Category: {product_info['category']}"
+
+    @staticmethod
+    def _lexical_tokens(product_info: Dict) -> List[str]:
+        """Tokens for the lexical index; name and colours count twice"""
+        names = f"{product_info['name']} {' '.join(product_info.get('colors', []))}"
+        return tokenize(names) * 2 + tokenize(f"{product_info['category']} {product_info['description']}")
 
-    def _add_mock_products(self):
-        """Add mock products for testing"""
-        for product in MOCK_PRODUCTS:
-            self.add_product(product)
+    def _index_metadata(self, products: Iterable[Dict], start: int):
+        """Add products to the lexical index and filter columns"""
+        for offset, product_info in enumerate(products):
+            self.lexical.add(start + offset, self._lexical_tokens(product_info))
+            self.attributes.add(start + offset, product_info)
+        self.filter_cache.clear()
+
+    def _load_metadata_indexes(self):
+        """
+        Memory-map the saved lexical index and filter columns, so startup
+        doesn't decode every product row; rebuild them if they are missing
+        or were saved for a different catalog
+        """
+        digest = catalog_digest(self.fingerprints)
+        lexical = load_arrays(self.lexical_file)
+        attributes = load_arrays(self.attributes_file)
+        if lexical and attributes and lexical[0].get("catalog") == attributes[0].get("catalog") == digest:
+            self.lexical = BM25Index.from_arrays(*lexical)
+            self.attributes = ProductAttributeIndex.from_arrays(*attributes)
+            self.filter_cache.clear()
+            return
+        logger.info("Rebuilding lexical index and filter columns for %d products", len(self.products))
+        self.lexical = BM25Index()
+        self.attributes = ProductAttributeIndex()
+        self._index_metadata(self.products, start=0)
+        self._save_metadata_indexes()
+
+    def _save_metadata_indexes(self):
+        digest = catalog_digest(self.fingerprints)
+        for prefix, index in ((self.lexical_file, self.lexical), (self.attributes_file, self.attributes)):
+            meta, arrays = index.to_arrays()
+            save_arrays(prefix, dict(meta, catalog=digest), arrays)
 
     def add_product(self, product_info: Dict):
         """Add a product to the vector store"""
-        # Create a text representation of the product
-        text = f"{product_info['name']} {product_info['description']} Category: {product_info['category']}"
-        
-        # Get embedding
-        embedding = self.model.encode([text])[0]
-        
-        # Add to FAISS index
-        self.index.add(np.array([embedding]).astype('float32'))
-        
-        # Store product info
-        self.products.append(product_info)
-        
-        # Save to disk
-        self._save_to_disk()
+        self.add_products([product_info])
 
-    def search(self, query: str, k: int = 3) -> Dict:
+    def add_products(self, products: Iterable[Dict], batch_size: int = 256) -> int:
+        """
+        Add many products to the vector store.
+        Products are encoded in batches, each batch is added to the index
+        with a single call, and the store is saved to disk once at the end.
+        If no index exists yet, one is built and trained on all the new
+        embeddings first. Returns the number of products added.
+        """
+        with self.build_lock:
+            return self._add_products(products, batch_size)
+
+    def _add_products(self, products: Iterable[Dict], batch_size: int) -> int:
+        self._ensure_index_writable()
+        added = 0
+        pending = []  # embeddings waiting for the index to be built
+        batch = []
+        for product_info in products:
+            batch.append(product_info)
+            if len(batch) >= batch_size:
+                self._add_batch(batch, batch_size, pending)
+                added += len(batch)
+                batch = []
+        if batch:
+            self._add_batch(batch, batch_size, pending)
+            added += len(batch)
+
+        if pending:
+            embeddings = np.vstack(pending)
+            self.index = build_index(self.index_type, embeddings, nlist=self.index_nlist)
+            self.index.add(embeddings)
+
+        # Save to disk once for the whole load
+        if added:
+            self._save_to_disk()
+        return added
+
+    def _add_batch(self, batch: List[Dict], batch_size: int, pending: List[np.ndarray]):
+        """Encode a batch of products and add them to the index"""
+        texts = [self._product_text(product_info) for product_info in batch]
+        embeddings = self.encoder.encode(texts, batch_size=batch_size)
+        if self.index is None:
+            pending.append(embeddings)
+        else:
+            self.index.add(embeddings)
+        self._index_metadata(batch, start=len(self.products))
+        self.products.extend(batch)
+        # Summaries mentioning an earlier product with the same id are stale
+        self.summary_cache.invalidate_products(self._product_id(p) for p in batch)
+        self._pending_embeddings.append(embeddings)
+        self.fingerprints.extend(
+            product_fingerprint(product_info, text) for product_info, text in zip(batch, texts)
+        )
+
+    def search(self, query: str, k: int = 3, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None, summarize: bool = True,
+               filters: Optional[ProductFilters] = None) -> Dict:
         """
         Search for similar products and generate AI summary
-        Returns dict with results and AI-generated summary
+        Returns dict with results and AI-generated summary.
+        nprobe/ef_search override the configured IVF/HNSW search depth,
+        and filters restrict the candidates before the search.
         """
-        # Get query embedding
-        query_embedding = self.model.encode([query])[0]
-        
-        # Search in FAISS
-        D, I = self.index.search(np.array([query_embedding]).astype('float32'), k)
-        
-        # Get matched products
-        results = []
-        for idx in I[0]:
-            if idx < len(self.products):
-                results.append(self.products[idx])
+        results = self._retrieve(query, k, nprobe, ef_search, filters)
 
         # Generate AI summary if results found
-        if results:
+        if not summarize:
+            summary = None
+        elif results:
             summary = self._generate_summary(query, results)
         else:
             summary = "No products found matching your query."
@@ -108,27 +351,152 @@ class ProductVectorStore:
             "summary": summary
         }
 
-    def _generate_summary(self, query: str, results: List[Dict]) -> str:
-        """Generate an AI summary of the search results using Groq"""
-        # Create context for LLM
+    async def asearch(self, query: str, k: int = 3, nprobe: Optional[int] = None,
+                      ef_search: Optional[int] = None, summarize: bool = True,
+                      filters: Optional[ProductFilters] = None) -> Dict:
+        """
+        Async version of search() for use from the event loop.
+        Encoding and the FAISS search run in the bounded search executor,
+        batched with other concurrent queries, and the summary is generated
+        with a non-blocking LLM call.
+        """
+        results = await self.batcher.submit(query, k, nprobe, ef_search, filters)
+
+        if not summarize:
+            summary = None
+        elif results:
+            summary = await self._agenerate_summary(query, results)
+        else:
+            summary = "No products found matching your query."
+
+        return {
+            "results": results,
+            "summary": summary
+        }
+
+    def _retrieve(self, query: str, k: int, nprobe: Optional[int] = None,
+                  ef_search: Optional[int] = None,
+                  filters: Optional[ProductFilters] = None) -> List[Dict]:
+        """Encode the query and return the k best matching products"""
+        return self._retrieve_many([query], k, nprobe, ef_search, filters)[0]
+
+    def _retrieve_many(self, queries: List[str], k: int, nprobe: Optional[int] = None,
+                       ef_search: Optional[int] = None,
+                       filters: Optional[ProductFilters] = None) -> List[List[Dict]]:
+        """
+        Return the k best matching products for each query.
+        Queries are encoded in one batch and searched with one index call;
+        vector and BM25 rankings are fused with reciprocal rank fusion.
+        Filters are resolved to an id selector before either search.
+        """
+        if self.index is None or not self.index.ntotal:
+            return [[] for _ in queries]
+
+        allowed, selector = None, None
+        if filters is not None and not filters.is_empty():
+            allowed = self._filter_ids(filters)
+            if not len(allowed):
+                return [[] for _ in queries]
+            selector = faiss.IDSelectorBatch(allowed)
+
+        # Look deeper than k when fusing, so either ranking can promote a product
+        depth = max(k * 4, 20) if self.lexical_weight > 0 else k
+
+        # Get query embeddings
+        query_embeddings = self._encode_queries(queries)
+
+        # Search in FAISS, all queries in one call
+        params = search_params(self.index, nprobe or self.nprobe, ef_search or self.ef_search, selector)
+        D, I = self.index.search(query_embeddings, depth, params=params)
+
+        results = []
+        for query, row in zip(queries, I):
+            # FAISS pads missing results with -1
+            ids = [int(idx) for idx in row if 0 <= idx < len(self.products)]
+            if self.lexical_weight > 0:
+                lexical_ids = [doc_id for doc_id, _ in self.lexical.search(query, depth, allowed)]
+                ids = reciprocal_rank_fusion([(ids, 1.0), (lexical_ids, self.lexical_weight)], k)
+            results.append([self.products[idx] for idx in ids[:k]])
+        return results
+
+    def _filter_ids(self, filters: ProductFilters) -> np.ndarray:
+        """Ids of the products matching filters"""
+        ids = self.filter_cache.get(filters)
+        if ids is None:
+            ids = self.attributes.select(filters)
+            self.filter_cache.set(filters, ids)
+        return ids
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Return embeddings for queries, encoding only the ones not in the query cache"""
+        keys = [normalize_text(query) for query in queries]
+        embeddings = [self.query_cache.get(key) for key in keys]
+        missing = sorted({key for key, embedding in zip(keys, embeddings) if embedding is None})
+        if missing:
+            encoded = dict(zip(missing, self.encoder.encode(missing)))
+            for key, embedding in encoded.items():
+                self.query_cache.set(key, embedding)
+            embeddings = [encoded[key] if embedding is None else embedding
+                          for key, embedding in zip(keys, embeddings)]
+        return np.asarray(embeddings, dtype='float32')
+
+    @staticmethod
+    def _product_id(product_info: Dict) -> str:
+        """Stable product identifier used by the summary cache"""
+        return product_info['name']
+
+    @staticmethod
+    def _summary_context(query: str, results: List[Dict]) -> str:
+        """Create context for LLM"""
         context = f"Query: {query}\n\nFound products:\n"
         for product in results:
             context += f"- {product['name']}: {product['description']} (${product['price']})\n"
+        return context
 
+    def _generate_summary(self, query: str, results: List[Dict]) -> str:
+        """Generate an AI summary of the search results using Groq"""
+        product_ids = [self._product_id(p) for p in results]
+        cached = self.summary_cache.get(query, product_ids)
+        if cached is not None:
+            return cached
         try:
             # Use LangChain with Groq
             chain = self.summary_prompt | self.llm
-            response = chain.invoke({"context": context})
+            response = chain.invoke({"context": self._summary_context(query, results)})
+            self.summary_cache.set(query, product_ids, response.content)
+            return response.content
+        except Exception as e:
+            # Fallback to basic summary if AI generation fails
+            return f"Found {len(results)} products matching your query. Top result: {results[0]['name']}"
+
+    async def _agenerate_summary(self, query: str, results: List[Dict]) -> str:
+        """Generate an AI summary of the search results without blocking the event loop"""
+        product_ids = [self._product_id(p) for p in results]
+        cached = self.summary_cache.get(query, product_ids)
+        if cached is not None:
+            return cached
+        try:
+            chain = self.summary_prompt | self.llm
+            response = await chain.ainvoke({"context": self._summary_context(query, results)})
+            self.summary_cache.set(query, product_ids, response.content)
             return response.content
         except Exception as e:
             # Fallback to basic summary if AI generation fails
             return f"Found {len(results)} products matching your query. Top result: {results[0]['name']}"
 
     def _save_to_disk(self):
-        """Save the index and products to disk"""
-        faiss.write_index(self.index, self.index_file)
-        with open(self.products_file, 'wb') as f:
-            pickle.dump(self.products, f)
+        """Save the index, products, embeddings, lexical index, filter columns and manifest to disk"""
+        self.products.flush()
+        for embeddings in self._pending_embeddings:
+            self.manifest.append_embeddings(embeddings)
+        self._pending_embeddings = []
+        self._save_metadata_indexes()
+        # Replace the file rather than truncating it, since other workers
+        # may have the old index memory-mapped
+        with atomic_path(self.index_file) as tmp_file:
+            faiss.write_index(self.index, tmp_file)
+        # Written last, so an interrupted save is detected on the next start
+        self.manifest.save(self.model_name, self.index_type, self.embedding_dim, self.fingerprints)
 
 # Create a global instance
 vector_store = ProductVectorStore() 
\ No newline at end of file
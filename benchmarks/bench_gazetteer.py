@@ -0,0 +1,79 @@
+"""
+Location extraction cost as the outlet list grows.
+
+Builds the gazetteer from synthetic outlets (10 up to 5,000) and times
+Gazetteer.locate over a corpus of chat turns. As a baseline it also times a
+single word-bounded regex alternation over the same aliases, which is what
+growing the old keyword checks would amount to.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_gazetteer
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_planner import CORPUS
+from gazetteer import Gazetteer, outlet_places
+
+WORDS = [
+    "bangsar", "utama", "taman", "melati", "sunway", "pyramid", "mid", "valley", "kota", "bukit",
+    "bintang", "usj", "setia", "alam", "cheras", "puchong", "klang", "shah", "subang", "mont",
+    "kiara", "ampang", "sri", "seksyen", "mall", "plaza", "central", "square", "park", "heights",
+]
+
+
+def synthetic_outlets(n: int, rng: random.Random):
+    for i in range(n):
+        place = " ".join(rng.sample(WORDS, 2)).title()
+        yield (
+            f"ZUS Coffee - {place} {i}",
+            f"{i}, Jalan {rng.choice(WORDS).title()}, {rng.choice(WORDS).title()} {rng.randint(1, 30)}, "
+            f"{rng.randint(10000, 99999)} {rng.choice(WORDS).title()}, Selangor",
+        )
+
+
+def time_us(fn, corpus, repeat):
+    """Median microseconds per turn over repeat passes of the corpus"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for turn in corpus:
+            fn(turn)
+        timings.append((time.perf_counter() - start) * 1e6 / len(corpus))
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=50, help="passes over the corpus")
+    args = parser.parse_args()
+
+    # No outlets database, so the gazetteer only holds the synthetic outlets
+    missing_db = os.path.join(tempfile.mkdtemp(), "missing.db")
+    print(f"{'outlets':>8} {'aliases':>8} {'build ms':>9} {'trie us':>8} {'regex us':>9}")
+    for size in args.sizes:
+        rows = list(synthetic_outlets(size, random.Random(0)))
+        gazetteer = Gazetteer(database_path=missing_db)
+        start = time.perf_counter()
+        gazetteer.build(rows)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        aliases = {place.name.lower() for name, address in rows for place in outlet_places(name, address)}
+        alternation = re.compile(
+            r"\b(?:" + "|".join(re.escape(a) for a in sorted(aliases, key=len, reverse=True)) + r")\b"
+        )
+        trie_us = time_us(gazetteer.locate, CORPUS, args.repeat)
+        regex_us = time_us(lambda turn: alternation.search(turn.lower()), CORPUS, args.repeat)
+        print(f"{size:>8} {gazetteer.aliases:>8} {build_ms:>9.1f} {trie_us:>8.2f} {regex_us:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
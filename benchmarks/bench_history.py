@@ -0,0 +1,86 @@
+"""
+Per-turn cost of chat history lookup with each history backend.
+
+Simulates conversations the way RunnableWithMessageHistory drives the store:
+each turn looks the session up, reads its messages (twice: once to fit the
+token budget, once for the prompt) and appends the user message and reply.
+Reports median and p95 milliseconds per turn for the in-memory store, SQLite
+in WAL mode, and a Redis-protocol server. Without --redis-url the Redis
+backend talks to fakeredis's TCP server as a local stand-in; with a real
+Redis the numbers include its actual network round trips.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_history
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from history_backends import RedisHistoryBackend, SQLiteHistoryBackend
+from session_store import SessionHistoryStore
+
+
+def local_redis_url() -> str:
+    """Serve fakeredis over TCP on a free port and return its URL"""
+    import fakeredis
+
+    server = fakeredis.TcpFakeServer(("127.0.0.1", 0))
+    # Its handler writes replies in pieces; without TCP_NODELAY each round
+    # trip waits on a delayed ACK (~40 ms) that real Redis never incurs
+    server.RequestHandlerClass.disable_nagle_algorithm = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0"
+
+
+def run(store: SessionHistoryStore, sessions: int, turns: int) -> list:
+    timings = []
+    for turn in range(turns):
+        for session in range(sessions):
+            start = time.perf_counter()
+            history = store.get(f"session-{session}")
+            history.messages
+            history.add_messages([
+                HumanMessage(content=f"Turn {turn}: what time does the SS2 outlet open on weekends?"),
+                AIMessage(content="The SS2 outlet opens at 8am and closes at 10pm on Saturdays and Sundays."),
+            ])
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=2000)
+    parser.add_argument("--redis-url", help="a running Redis-protocol server (default: local fakeredis)")
+    args = parser.parse_args()
+
+    os.environ["CHAT_HISTORY_BACKEND"] = "memory"
+    backends = {"memory": None}
+    backends["sqlite"] = SQLiteHistoryBackend(path=os.path.join(tempfile.mkdtemp(), "history.db"), ttl=3600)
+    try:
+        url = args.redis_url or local_redis_url()
+        backends["redis"] = RedisHistoryBackend(url=url, ttl=3600)
+    except ImportError as e:
+        print(f"skipping redis: {e}")
+
+    print(f"{args.sessions} sessions x {args.turns} turns, token budget {args.token_budget}")
+    print(f"{'backend':<8} {'median ms':>10} {'p95 ms':>8} {'trims':>6}")
+    for name, backend in backends.items():
+        store = SessionHistoryStore(max_sessions=args.sessions, ttl=3600, token_budget=args.token_budget,
+                                    backend=backend)
+        timings = sorted(run(store, args.sessions, args.turns))
+        p95 = timings[int(len(timings) * 0.95)]
+        print(f"{name:<8} {statistics.median(timings):>10.3f} {p95:>8.3f} {store.stats()['trims']:>6}")
+
+
+if __name__ == "__main__":
+    main()
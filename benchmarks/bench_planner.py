@@ -0,0 +1,140 @@
+"""
+Per-turn planning cost: the old pattern loops vs the compiled intent matcher.
+
+The old planner called re.search once per calculation and outlet pattern to
+classify a turn, then ran up to three more regexes to pull out the operands.
+The compiled matcher does both in one scan. Both versions run over a corpus
+of chat turns, and the benchmark checks that they agree on every one before
+timing them.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_planner
+"""
+
+import argparse
+import re
+import statistics
+import time
+
+from planner import AgenticPlanner, Intent
+
+CORPUS = [
+    "Hi there!",
+    "Hello, my name is Alice",
+    "What is my name?",
+    "Is there an outlet in Petaling Jaya?",
+    "SS 2, what's the opening time?",
+    "What about the closing time?",
+    "What are the opening hours?",
+    "Tell me about the Damansara outlet's closing time.",
+    "Which branch is closest to KLCC?",
+    "Do you have a store in Kuala Lumpur?",
+    "What is 10 plus 5?",
+    "What is 12 * 7",
+    "calculate 144 / 12 for me",
+    "I need a calculation.",
+    "whats 3 minus 8",
+    "15 divided by 3",
+    "can you tell me the sum of 4 and 9",
+    "Thanks, that's all for today!",
+    "I am looking for a coffee shop nearby",
+    "Tell me a joke about coffee",
+    "Recommend a tumbler that keeps drinks hot",
+    "Which drinkware comes in blue?",
+    "My order from last week never arrived and the app keeps crashing when I try to check the status",
+    "Does the SS15 outlet do dine-in?",
+    "How late is the Uptown Damansara store open on Sunday?",
+]
+
+
+class LegacyPlanner:
+    """The pattern loops the planner used before the compiled matcher"""
+
+    def __init__(self):
+        planner = AgenticPlanner()
+        self.operator_map = planner.operator_map
+        self.calculation_patterns = [
+            r'(\d+)\s*([\+\-\*\/])\s*(\d+)',
+            r'what is (\d+)\s*([\+\-\*\/])\s*(\d+)',
+            r'\d+\s*(plus|minus|times|multiply|divide|substract|divided by)\s*\d+',
+            r'sum of|difference of|product of|quotient of',
+            r'calculate|math',
+            r'what\'s|whats\s+[\w\s]*\d+',
+        ]
+        self.outlet_patterns = [
+            r'ss\s*\d+',
+            r'outlet|store|shop|location|branch',
+            r'opening|closing|hours|time',
+            r'damansara|petaling jaya|kuala lumpur|pj|kl',
+        ]
+
+    def analyze_intent(self, user_input):
+        user_input_lower = user_input.lower()
+        for pattern in self.calculation_patterns:
+            if re.search(pattern, user_input_lower):
+                return Intent.CALCULATION
+        for pattern in self.outlet_patterns:
+            if re.search(pattern, user_input_lower):
+                return Intent.OUTLET_INFO
+        return Intent.GENERAL_CHAT
+
+    def extract_calculation_data(self, user_input):
+        user_input_lower = user_input.lower()
+        match = re.search(r'(\d+)\s*([\+\-\*\/])\s*(\d+)', user_input)
+        if match:
+            return {'num1': float(match.group(1)), 'operator': match.group(2), 'num2': float(match.group(3))}
+        match = re.search(r'(\d+)\s*(plus|minus|times|multiply|divide|substract|divided by)\s*(\d+)', user_input_lower)
+        if match and self.operator_map.get(match.group(2)):
+            return {'num1': float(match.group(1)), 'operator': self.operator_map[match.group(2)],
+                    'num2': float(match.group(3))}
+        match = re.search(r'what is (\d+)\s*([\+\-\*\/])\s*(\d+)', user_input_lower)
+        if match:
+            return {'num1': float(match.group(1)), 'operator': match.group(2), 'num2': float(match.group(3))}
+        return None
+
+    def plan(self, user_input):
+        intent = self.analyze_intent(user_input)
+        data = self.extract_calculation_data(user_input) if intent == Intent.CALCULATION else None
+        return intent, data
+
+
+def compiled_plan(planner, user_input):
+    matched = planner.match_intent(user_input)
+    data = matched.calculation_data if matched.intent == Intent.CALCULATION else None
+    return matched.intent, data
+
+
+def time_us(fn, corpus, repeat):
+    """Median microseconds per turn over repeat passes of the corpus"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for turn in corpus:
+            fn(turn)
+        timings.append((time.perf_counter() - start) * 1e6 / len(corpus))
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the corpus")
+    args = parser.parse_args()
+
+    legacy = LegacyPlanner()
+    planner = AgenticPlanner()
+    for turn in CORPUS:
+        expected, actual = legacy.plan(turn), compiled_plan(planner, turn)
+        assert expected == actual, (turn, expected, actual)
+
+    legacy_us = time_us(legacy.plan, CORPUS, args.repeat)
+    compiled_us = time_us(lambda turn: compiled_plan(planner, turn), CORPUS, args.repeat)
+    print(f"{len(CORPUS)} turns, intents and operands identical")
+    print(f"{'planner':<10} {'us/turn':>9}")
+    print(f"{'legacy':<10} {legacy_us:>9.2f}")
+    print(f"{'compiled':<10} {compiled_us:>9.2f}")
+    print(f"speedup: {legacy_us / compiled_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+How many turns the embedding router keeps away from the LLM.
+
+Plans a labelled set of chat turns twice: with the patterns and gazetteer
+only, and with the embedding router as a second stage. Reports how many
+turns would go to the LLM each way, how many the router diverted (and to
+which intent), how many of those were routed to the right intent, and the
+router's per-turn latency. Needs sentence-transformers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_router
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from gazetteer import Gazetteer
+from intent_router import EmbeddingIntentRouter
+from planner import AgenticPlanner, Action, Intent
+
+# (turn, intent it should get); none of these are router examples
+LABELLED_TURNS = [
+    ("Do you have any flasks for sale?", Intent.PRODUCT_INFO),
+    ("How much does the ceramic mug cost?", Intent.PRODUCT_INFO),
+    ("I need a cup that keeps my latte hot for hours", Intent.PRODUCT_INFO),
+    ("Which tumblers come in green?", Intent.PRODUCT_INFO),
+    ("Got anything for iced drinks on the go?", Intent.PRODUCT_INFO),
+    ("Is the All-Can dishwasher safe?", Intent.PRODUCT_INFO),
+    ("Where's the nearest cafe to Mid Valley?", Intent.OUTLET_INFO),
+    ("Are you guys open on public holidays?", Intent.OUTLET_INFO),
+    ("Can I sit and work at your cafe?", Intent.OUTLET_INFO),
+    ("When do you close tonight?", Intent.OUTLET_INFO),
+    ("Is there a ZUS close to my office?", Intent.OUTLET_INFO),
+    ("What's seven multiplied by eight?", Intent.CALCULATION),
+    ("Can you add up a few numbers for me?", Intent.CALCULATION),
+    ("Half of ninety is what?", Intent.CALCULATION),
+    ("Hey, how's it going?", Intent.GENERAL_CHAT),
+    ("Thanks a lot, that was helpful", Intent.GENERAL_CHAT),
+    ("Tell me something interesting about coffee beans", Intent.GENERAL_CHAT),
+    ("Who made you?", Intent.GENERAL_CHAT),
+    ("My name is Bob", Intent.GENERAL_CHAT),
+    ("Do you remember what I said earlier?", Intent.GENERAL_CHAT),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20, help="timed routing passes")
+    args = parser.parse_args()
+
+    router = EmbeddingIntentRouter()
+    gazetteer = Gazetteer(database_path=os.path.join(tempfile.mkdtemp(), "missing.db"))
+    os.environ["INTENT_ROUTER"] = "off"
+    baseline = AgenticPlanner(gazetteer)
+    routed = AgenticPlanner(gazetteer, router=router)
+
+    router.scores("warm up")
+    if not router.available:
+        raise SystemExit("sentence-transformers is not installed; the router is disabled")
+
+    before = after = correct = 0
+    for turn, expected in LABELLED_TURNS:
+        plain = baseline.plan_next_action(turn)
+        result = routed.plan_next_action(turn)
+        before += plain.action == Action.RESPOND_DIRECTLY
+        after += result.action == Action.RESPOND_DIRECTLY
+        if plain.intent != result.intent:
+            correct += result.intent == expected
+            mark = "ok" if result.intent == expected else "WRONG"
+            print(f"{mark:>5}  {turn!r} -> {result.intent.value} ({result.confidence:.2f})")
+
+    stats = router.stats()
+    print(f"\nturns: {len(LABELLED_TURNS)}")
+    print(f"sent to the LLM: {before} without the router, {after} with it")
+    print(f"diverted: {stats['diverted']} ({correct} to the right intent) {stats['diverted_by_intent']}")
+
+    timings = []
+    for _ in range(args.repeat):
+        for turn, _ in LABELLED_TURNS:
+            start = time.perf_counter()
+            router.scores(turn)
+            timings.append((time.perf_counter() - start) * 1000)
+    print(f"routing latency: median {statistics.median(timings):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# mindhive-chatbot/gazetteer.py
+
+"""
+Outlet gazetteer for the chat planner.
+
+Place names come from a few built-in aliases plus the backend's outlets
+table: each outlet name (without the brand prefix) is an outlet, and the
+locality and city in its address are areas. Aliases are tokenized into
+words and numbers ("ss2", "SS 2" and "ss-2" are all ["ss", "2"]) and stored
+in a token trie, so a lookup walks the input once and only ever matches
+whole words, however many outlets there are.
+
+The gazetteer reloads itself when the outlets table changes: at most every
+GAZETTEER_RELOAD_INTERVAL seconds it compares the 'outlets' counter in
+table_versions (bumped by triggers on every write) with the one it was
+built from.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+OUTLET = "outlet"
+AREA = "area"
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend-fastapi", "data", "zus.db")
+
+# Canonical name -> (kind, aliases). Registered before the outlets table, so
+# these names win over derived ones for the same alias.
+SEED_PLACES = {
+    "SS2": (OUTLET, ["ss2"]),
+    "SS15": (OUTLET, ["ss15"]),
+    "Damansara": (OUTLET, ["damansara"]),
+    "Petaling Jaya": (AREA, ["petaling jaya", "pj"]),
+    "Kuala Lumpur": (AREA, ["kuala lumpur", "kl"]),
+}
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+")
+_BRAND_RE = re.compile(r"^\s*zus(?:\s+coffee)?\s*[-:|]\s*", re.I)
+# "..., Damansara Utama, 47400 Petaling Jaya, Selangor": the part before the
+# postcode is the locality, the part after it the city
+_POSTCODE_RE = re.compile(r"^(\d{5})\s+(.+)$")
+
+_END = None
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str  # canonical name, e.g. "SS2" or "Petaling Jaya"
+    kind: str  # OUTLET or AREA
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words and numbers, with letters and digits split apart"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def outlet_places(name: str, address: str) -> List[Place]:
+    """The outlet and the areas named by one outlets row"""
+    places = []
+    outlet = _BRAND_RE.sub("", name or "").strip()
+    if outlet:
+        places.append(Place(outlet, OUTLET))
+    parts = [part.strip() for part in (address or "").split(",")]
+    for i, part in enumerate(parts):
+        match = _POSTCODE_RE.match(part)
+        if match is None:
+            continue
+        if i > 0 and parts[i - 1] and not parts[i - 1][0].isdigit():
+            places.append(Place(parts[i - 1], AREA))
+        places.append(Place(match.group(2), AREA))
+        break
+    return places
+
+
+class Gazetteer:
+    def __init__(self, database_path: Optional[str] = None, reload_interval: Optional[float] = None,
+                 seed: Optional[Dict[str, Tuple[str, List[str]]]] = None):
+        self.database_path = database_path or os.getenv("GAZETTEER_DB_PATH", DEFAULT_DB_PATH)
+        self.reload_interval = (
+            float(os.getenv("GAZETTEER_RELOAD_INTERVAL", "5")) if reload_interval is None else reload_interval
+        )
+        self.seed = SEED_PLACES if seed is None else seed
+        self._lock = threading.Lock()
+        self._trie: Dict[Any, Any] = {}
+        self._version: Optional[int] = None
+        self._checked_at = float("-inf")
+        self.aliases = 0
+        self.reloads = 0
+        self.build([])
+
+    def build(self, rows: Iterable[Tuple[str, str]]):
+        """Rebuild the trie from the seed places and (name, address) outlet rows"""
+        trie: Dict[Any, Any] = {}
+        aliases = 0
+
+        def add(alias: str, place: Place):
+            nonlocal aliases
+            tokens = tokenize(alias)
+            if not tokens:
+                return
+            node = trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            current = node.get(_END)
+            # An alias keeps its first place, except that outlets beat areas
+            if current is None or (current.kind == AREA and place.kind == OUTLET):
+                aliases += current is None
+                node[_END] = place
+
+        for name, (kind, names) in self.seed.items():
+            for alias in [name] + names:
+                add(alias, Place(name, kind))
+        for name, address in rows:
+            for place in outlet_places(name, address):
+                add(place.name, place)
+        self._trie = trie
+        self.aliases = aliases
+
+    def places(self, text: str) -> List[Place]:
+        """Places mentioned in text, left to right, preferring the longest alias"""
+        self.refresh()
+        trie = self._trie
+        tokens = tokenize(text)
+        found = []
+        i, n = 0, len(tokens)
+        while i < n:
+            node = trie.get(tokens[i])
+            i += 1
+            if node is None:
+                continue
+            # Follow the trie for the longest alias starting at this token
+            end, place = i, node.get(_END)
+            j = i
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    end, place = j, node[_END]
+            if place is not None:
+                found.append(place)
+                i = end
+        return found
+
+    def locate(self, text: str) -> Optional[Place]:
+        """The first outlet mentioned in text, otherwise the first area"""
+        places = self.places(text)
+        for place in places:
+            if place.kind == OUTLET:
+                return place
+        return places[0] if places else None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload from the outlets table if it changed; returns True if it reloaded"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return False
+        with self._lock:
+            if not force and now - self._checked_at < self.reload_interval:
+                return False
+            self._checked_at = now
+            if not os.path.exists(self.database_path):
+                return False
+            try:
+                conn = sqlite3.connect(f"file:{self.database_path}?mode=ro", uri=True)
+                try:
+                    version = conn.execute(
+                        "SELECT version FROM table_versions WHERE name = 'outlets'"
+                    ).fetchone()[0]
+                    if version == self._version and not force:
+                        return False
+                    rows = conn.execute("SELECT name, address FROM outlets").fetchall()
+                finally:
+                    conn.close()
+            except (sqlite3.Error, TypeError):
+                # Not created by the backend yet; keep the current places
+                return False
+            self.build(rows)
+            self._version = version
+            self.reloads += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "aliases": self.aliases,
+            "version": self._version,
+            "reloads": self.reloads,
+        }
@@ -0,0 +1,339 @@
+# mindhive-chatbot/history_backends.py
+
+"""
+Shared, persistent storage for chat histories.
+
+By default histories live in the memory of one ChatbotController, so with
+several workers a user's next turn can land on a process that has never
+seen the session. CHAT_HISTORY_BACKEND selects where they are kept instead:
+
+- memory: in-process (the default)
+- sqlite: a SQLite database in WAL mode (CHAT_HISTORY_SQLITE_PATH), shared by
+  every process on the host
+- redis: a Redis-protocol server (CHAT_HISTORY_REDIS_URL); Redis itself, or
+  any compatible stand-in such as Valkey, KeyDB or fakeredis
+
+Writes append a turn's messages, and a history is read back in a single
+query or round trip. Trimming rewrites a history in one transaction that
+re-reads it first, so a turn another worker appended meanwhile is kept.
+Messages are stored as JSON in LangChain's dict form. Sessions idle for
+longer than the TTL are removed by the backend itself, so every process
+sees the same expiry.
+"""
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+
+def dump_message(message: BaseMessage) -> str:
+    return json.dumps(message_to_dict(message), separators=(",", ":"))
+
+
+def load_messages(rows: Sequence[Any]) -> List[BaseMessage]:
+    return messages_from_dict([json.loads(row) for row in rows])
+
+
+class PersistentChatMessageHistory(BaseChatMessageHistory):
+    """
+    One session's history in a shared backend. Messages are read on first
+    access and then served from memory, so a handle is meant to live for
+    a single turn; SessionHistoryStore hands out a fresh one per lookup.
+    """
+
+    def __init__(self, backend: "HistoryBackend", session_id: str):
+        self.backend = backend
+        self.session_id = session_id
+        self._messages: Optional[List[BaseMessage]] = None
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        if self._messages is None:
+            self._messages = self.backend.load(self.session_id)
+        return list(self._messages)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        messages = list(messages)
+        self.backend.append(self.session_id, messages)
+        if self._messages is not None:
+            self._messages.extend(messages)
+
+    def replace_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """
+        Swap the history this handle read for messages in one step, so other
+        workers never see it empty. Messages appended elsewhere since the
+        read are kept after them; if the history was rewritten meanwhile it
+        is left alone.
+        """
+        self._messages = self.backend.replace(self.session_id, self.messages, list(messages))
+
+    def clear(self) -> None:
+        self.backend.delete(self.session_id)
+        self._messages = []
+
+
+class HistoryBackend(abc.ABC):
+    """Storage operations a persistent backend provides"""
+
+    name = "base"
+
+    def history(self, session_id: str) -> PersistentChatMessageHistory:
+        return PersistentChatMessageHistory(self, session_id)
+
+    @abc.abstractmethod
+    def load(self, session_id: str) -> List[BaseMessage]:
+        """The session's messages in order"""
+
+    @abc.abstractmethod
+    def append(self, session_id: str, messages: Sequence[BaseMessage]):
+        """Add messages to the end of the session's history"""
+
+    @abc.abstractmethod
+    def replace(self, session_id: str, read: Sequence[BaseMessage],
+                messages: Sequence[BaseMessage]) -> Optional[List[BaseMessage]]:
+        """
+        Atomically swap the history's first len(read) messages, which must
+        still be read, for messages, keeping any stored after them.
+        Returns the new history, or None if it no longer starts with read
+        (rewritten or expired since) and was left unchanged.
+        """
+
+    @abc.abstractmethod
+    def delete(self, session_id: str):
+        """Remove the session's history"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class SQLiteHistoryBackend(HistoryBackend):
+    """
+    Histories in an append-only SQLite table. WAL lets any number of
+    processes read while one appends; idle sessions are purged at most
+    once per purge_interval.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                 purge_interval: float = 60.0):
+        self.path = path or os.getenv("CHAT_HISTORY_SQLITE_PATH", "chat_history.db")
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self.reads = 0
+        self.appends = 0
+        self.purged = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA busy_timeout=5000;
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                message TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_chat_messages_session ON chat_messages (session_id, id);
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_chat_sessions_updated ON chat_sessions (updated);
+        """)
+
+    def _rows(self, session_id: str, now: float) -> List[str]:
+        """The session's stored messages in order; empty once it has expired"""
+        cutoff = now - self.ttl if self.ttl else 0.0
+        return [row[0] for row in self._db.execute(
+            "SELECT m.message FROM chat_messages m JOIN chat_sessions s ON s.session_id = m.session_id"
+            " WHERE m.session_id = ? AND s.updated >= ? ORDER BY m.id",
+            (session_id, cutoff)
+        )]
+
+    def load(self, session_id: str) -> List[BaseMessage]:
+        """The session's messages in order, in one query; empty once it has expired"""
+        with self._lock:
+            rows = self._rows(session_id, time.time())
+            self.reads += 1
+        return load_messages(rows)
+
+    def _insert(self, session_id: str, rows: Sequence[str], now: float):
+        self._db.executemany(
+            "INSERT INTO chat_messages (session_id, message) VALUES (?, ?)", [(session_id, row) for row in rows]
+        )
+        self._db.execute(
+            "INSERT INTO chat_sessions (session_id, updated) VALUES (?, ?)"
+            " ON CONFLICT (session_id) DO UPDATE SET updated = excluded.updated",
+            (session_id, now)
+        )
+        self.appends += 1
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage]):
+        now = time.time()
+        rows = [dump_message(message) for message in messages]
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            session = self._db.execute(
+                "SELECT updated FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            # An expired session starts over rather than resurrecting old turns
+            if session and self.ttl and session[0] < now - self.ttl:
+                self._db.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            self._insert(session_id, rows, now)
+        self._maybe_purge(now)
+
+    def replace(self, session_id: str, read: Sequence[BaseMessage],
+                messages: Sequence[BaseMessage]) -> Optional[List[BaseMessage]]:
+        now = time.time()
+        expected = [dump_message(message) for message in read]
+        with self._lock, self._db:
+            # The write lock is held from the re-read on, so no append can
+            # land between it and the rewrite
+            self._db.execute("BEGIN IMMEDIATE")
+            rows = self._rows(session_id, now)
+            if rows[:len(expected)] != expected:
+                return None
+            later = rows[len(expected):]
+            self._db.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            self._insert(session_id, [dump_message(message) for message in messages] + later, now)
+        self._maybe_purge(now)
+        return list(messages) + load_messages(later)
+
+    def delete(self, session_id: str):
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def _maybe_purge(self, now: float):
+        if self.ttl is None or now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        self.purge(now)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Delete sessions idle for longer than the TTL; returns how many"""
+        if self.ttl is None:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.ttl
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                "DELETE FROM chat_messages WHERE session_id IN"
+                " (SELECT session_id FROM chat_sessions WHERE updated < ?)", (cutoff,)
+            )
+            purged = self._db.execute("DELETE FROM chat_sessions WHERE updated < ?", (cutoff,)).rowcount
+            self.purged += purged
+        return purged
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions, = self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "sessions": sessions,
+            "reads": self.reads,
+            "appends": self.appends,
+            "purged": self.purged,
+        }
+
+
+class RedisHistoryBackend(HistoryBackend):
+    """
+    Each history is a Redis list: RPUSH appends a turn, LRANGE reads it back,
+    and the key's TTL is renewed with every write, all in one round trip.
+    Trimming rewrites the list in a WATCH/MULTI transaction.
+    Needs the redis package.
+    """
+
+    name = "redis"
+
+    def __init__(self, client: Any = None, url: Optional[str] = None, ttl: Optional[float] = None,
+                 prefix: str = "chat_history:"):
+        self.url = url or os.getenv("CHAT_HISTORY_REDIS_URL", "redis://localhost:6379/0")
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(self.url)
+        self.client = client
+        self.ttl = int(ttl) if ttl and ttl > 0 else None
+        self.prefix = prefix
+        self.reads = 0
+        self.appends = 0
+
+    def _key(self, session_id: str) -> str:
+        return self.prefix + session_id
+
+    def load(self, session_id: str) -> List[BaseMessage]:
+        rows = self.client.lrange(self._key(session_id), 0, -1)
+        self.reads += 1
+        return load_messages(rows)
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage]):
+        key = self._key(session_id)
+        pipe = self.client.pipeline(transaction=False)
+        if messages:
+            pipe.rpush(key, *[dump_message(message) for message in messages])
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+        self.appends += 1
+
+    def replace(self, session_id: str, read: Sequence[BaseMessage],
+                messages: Sequence[BaseMessage]) -> Optional[List[BaseMessage]]:
+        key = self._key(session_id)
+        expected = [dump_message(message) for message in read]
+        rows = [dump_message(message) for message in messages]
+
+        def swap(pipe) -> Optional[List[str]]:
+            # WATCHed, so EXEC fails and the transaction retries if another
+            # worker appends after this read
+            stored = [row.decode() if isinstance(row, bytes) else row for row in pipe.lrange(key, 0, -1)]
+            if stored[:len(expected)] != expected:
+                return None
+            later = stored[len(expected):]
+            pipe.multi()
+            pipe.delete(key)
+            if rows or later:
+                pipe.rpush(key, *rows, *later)
+            if self.ttl:
+                pipe.expire(key, self.ttl)
+            return later
+
+        later = self.client.transaction(swap, key, value_from_callable=True)
+        if later is None:
+            return None
+        self.appends += 1
+        return list(messages) + load_messages(later)
+
+    def delete(self, session_id: str):
+        self.client.delete(self._key(session_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "url": self.url, "reads": self.reads, "appends": self.appends}
+
+
+BACKENDS = {
+    "sqlite": SQLiteHistoryBackend,
+    "redis": RedisHistoryBackend,
+}
+
+
+def create_backend(name: Optional[str] = None, ttl: Optional[float] = None) -> Optional[HistoryBackend]:
+    """The backend CHAT_HISTORY_BACKEND names, or None to keep histories in memory"""
+    name = (name or os.getenv("CHAT_HISTORY_BACKEND", "memory")).lower()
+    if name == "memory":
+        return None
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown CHAT_HISTORY_BACKEND {name!r}; expected memory, {', '.join(BACKENDS)}")
+    return BACKENDS[name](ttl=ttl)
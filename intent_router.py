@@ -0,0 +1,181 @@
+# mindhive-chatbot/intent_router.py
+
+"""
+Embedding-based second stage for the planner's intent matching.
+
+Turns that none of the planner's patterns recognise would otherwise go to
+the LLM. The router embeds them with the MiniLM model the product search
+uses (EMBEDDING_MODEL) and scores them against one centroid per intent, the
+normalized mean embedding of a few example utterances, in a single
+matrix-vector product. A turn is routed only if its best score reaches
+INTENT_ROUTER_MIN_SCORE and beats the runner-up by INTENT_ROUTER_MIN_MARGIN.
+General chat has a centroid too, so small talk stays with the LLM.
+
+sentence-transformers is optional: without it the router disables itself
+and unmatched turns go to the LLM as before.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GENERAL_CHAT = "general_chat"
+
+# Intent value -> example utterances the patterns don't catch
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "product_info": [
+        "do you sell tumblers",
+        "how much is the all day cup",
+        "which cups come in blue",
+        "recommend a mug for hot drinks",
+        "what drinkware do you have",
+        "is the ceramic mug dishwasher safe",
+        "show me your bottles and flasks",
+        "what colours does the all-can tumbler come in",
+        "any merchandise under 50 ringgit",
+        "I want to buy a cup that keeps coffee warm",
+    ],
+    "outlet_info": [
+        "where can I find your cafe",
+        "what time do you open",
+        "are you open on sunday",
+        "which cafe is nearest to me",
+        "is there a zus near my office",
+        "when does the cafe close tonight",
+        "can I dine in at your cafe",
+        "where's the closest zus",
+        "do you deliver to my area",
+        "how late are you open",
+    ],
+    "calculation": [
+        "what's eight times nine",
+        "add these numbers for me",
+        "how much is twelve divided by four",
+        "work out fifteen percent of eighty",
+        "multiply seven by six",
+        "subtract three from ten",
+        "what is the square root of 81",
+        "help me with some arithmetic",
+    ],
+    GENERAL_CHAT: [
+        "hello",
+        "how are you today",
+        "thanks for your help",
+        "tell me a joke",
+        "what's your name",
+        "good morning",
+        "who are you",
+        "bye for now",
+        "what can you do",
+        "I'm having a bad day",
+        "my name is alice",
+        "what is my name",
+    ],
+}
+
+
+def sentence_transformer_encoder(model_name: str) -> Callable[[List[str]], Any]:
+    """Encode function for a SentenceTransformer model, returning unit vectors"""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+
+
+class EmbeddingIntentRouter:
+    """
+    Routes a turn to the intent whose centroid is closest to its embedding.
+    encode maps a list of texts to an (n, dim) array; by default the
+    SentenceTransformer model is loaded by load(), or on first use.
+    Encoding is CPU-bound, so async callers run route() in a worker thread.
+    """
+
+    def __init__(self, encode: Optional[Callable[[List[str]], Any]] = None,
+                 examples: Optional[Dict[str, List[str]]] = None,
+                 min_score: Optional[float] = None, min_margin: Optional[float] = None,
+                 model_name: Optional[str] = None):
+        self.examples = INTENT_EXAMPLES if examples is None else examples
+        self.min_score = float(os.getenv("INTENT_ROUTER_MIN_SCORE", "0.45")) if min_score is None else min_score
+        self.min_margin = float(os.getenv("INTENT_ROUTER_MIN_MARGIN", "0.05")) if min_margin is None else min_margin
+        self.model_name = model_name or os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self._encode = encode
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.available = False
+        self.intents: List[str] = []
+        self.centroids = None
+        self.considered = 0
+        self.routed: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["EmbeddingIntentRouter"]:
+        """The router, or None if INTENT_ROUTER=off"""
+        if os.getenv("INTENT_ROUTER", "embedding").lower() in ("off", "false", "0", "none"):
+            return None
+        return cls()
+
+    def load(self):
+        """Load the encoder and compute the intent centroids, once"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                import numpy as np
+
+                if self._encode is None:
+                    self._encode = sentence_transformer_encoder(self.model_name)
+                intents = list(self.examples)
+                centroids = []
+                for intent in intents:
+                    embeddings = np.asarray(self._encode(self.examples[intent]), dtype="float32")
+                    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+                    centroid = embeddings.mean(axis=0)
+                    centroids.append(centroid / (np.linalg.norm(centroid) + 1e-12))
+            except Exception as e:
+                # Missing sentence-transformers/numpy, or the model failed to load
+                logger.warning("Intent router disabled: %s", e)
+                return
+            self.intents = intents
+            self.centroids = np.stack(centroids)
+            self.available = True
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Cosine similarity of text to each intent centroid"""
+        self.load()
+        if not self.available:
+            return {}
+        import numpy as np
+
+        embedding = np.asarray(self._encode([text]), dtype="float32")[0]
+        embedding /= np.linalg.norm(embedding) + 1e-12
+        return dict(zip(self.intents, (self.centroids @ embedding).tolist()))
+
+    def route(self, text: str) -> Optional[Tuple[str, float]]:
+        """(intent value, score) for a confident non-chat match, otherwise None"""
+        scores = self.scores(text)
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        intent, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        with self._lock:
+            self.considered += 1
+            if intent == GENERAL_CHAT or best < self.min_score or best - runner_up < self.min_margin:
+                return None
+            self.routed[intent] = self.routed.get(intent, 0) + 1
+        logger.info("intent router: %r -> %s (%.2f, margin %.2f)", text, intent, best, best - runner_up)
+        return intent, best
+
+    def stats(self) -> Dict[str, Any]:
+        diverted = sum(self.routed.values())
+        return {
+            "available": self.available,
+            "considered": self.considered,
+            "diverted": diverted,
+            "diverted_by_intent": dict(self.routed),
+            "diversion_rate": diverted / self.considered if self.considered else 0.0,
+        }
@@ -7,19 +7,24 @@ from langchain_core.runnables import RunnableConfig
 from langchain_community.chat_message_histories import ChatMessageHistory
 import asyncio 
 
-from planner import AgenticPlanner, Intent, Action, call_calculator_api, get_mock_outlet_info
+from session_store import SessionHistoryStore
+from planner import AgenticPlanner, Intent, Action, call_calculator_api, call_products_api, get_mock_outlet_info
 
 load_dotenv()
 
 class ChatbotController:
     def __init__(self):
         self.planner = AgenticPlanner()
+        # Load the embedding model now rather than on the first unmatched turn
+        if self.planner.router is not None:
+            self.planner.router.load()
         self.llm = ChatGroq(
             temperature=0.7,
             model="llama3-8b-8192", 
         )
 
-        self._history_store = {} 
+        # Bounded by session count, idle time and a per-session token budget
+        self._history_store = SessionHistoryStore()
 
         self.general_chat_prompt = ChatPromptTemplate.from_messages([
             ("system", "You are a helpful and friendly assistant."),
@@ -35,14 +40,19 @@ class ChatbotController:
         )
     
     def get_session_history(self, session_id: str) -> ChatMessageHistory:
-        if session_id not in self._history_store:
-            self._history_store[session_id] = ChatMessageHistory()
-        return self._history_store[session_id]
+        return self._history_store.get(session_id)
+
+    def stats(self) -> dict:
+        """Session memory and prompt-size metrics, plus intent router counters"""
+        return {
+            "sessions": self._history_store.stats(),
+            "intent_router": self.planner.router.stats() if self.planner.router else None,
+        }
 
     async def process_user_input(self, user_input: str, session_id: str = "default") -> str:
         config = RunnableConfig(configurable={"session_id": session_id})
 
-        planning_result = self.planner.plan_next_action(user_input)
+        planning_result = await self.planner.aplan_next_action(user_input)
         
         print(f"\n[DEBUG] Planner Intent: {planning_result.intent}")
         print(f"[DEBUG] Planner Action: {planning_result.action}")
@@ -95,6 +105,13 @@ class ChatbotController:
             history.add_user_message(user_input)
             history.add_ai_message(response_content)
         
+        elif planning_result.action == Action.USE_PRODUCT_SEARCH:
+            extracted = planning_result.extracted_data
+            response_content = await call_products_api(extracted['query'] if extracted else user_input)
+            print(f"[DEBUG] Product search returned: {response_content}")
+            history.add_user_message(user_input)
+            history.add_ai_message(response_content)
+        
         elif planning_result.action == Action.RESPOND_DIRECTLY:
             response = await self.conversation_with_history.ainvoke(
                 {"input": user_input},
@@ -2,13 +2,19 @@
 
 from enum import Enum
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import asyncio
+import os
 import re
 import httpx # <--- ADDED: Necessary for making async HTTP requests
 
+from gazetteer import AREA, Gazetteer, Place
+from intent_router import EmbeddingIntentRouter
+
 class Intent(Enum):
     CALCULATION = "calculation"
     OUTLET_INFO = "outlet_info"
+    PRODUCT_INFO = "product_info"
     GENERAL_CHAT = "general_chat"
     UNKNOWN = "unknown"
 
@@ -16,6 +22,7 @@ class Action(Enum):
     ASK_FOR_INFO = "ask_for_info"       # When more details are needed from the user
     USE_CALCULATOR = "use_calculator"   # When a mathematical calculation is requested
     USE_OUTLET_DB = "use_outlet_db"     # When information about a specific outlet is requested
+    USE_PRODUCT_SEARCH = "use_product_search" # When the user asks about products
     RESPOND_DIRECTLY = "respond_directly" # For general conversational replies using the LLM
     
 @dataclass
@@ -26,25 +33,76 @@ class PlanningResult:
     extracted_data: Optional[Dict[str, Any]] = None
     confidence: float = 0.0
 
+# Operator words for "10 plus 5". Only those in operator_map yield operands.
+OPERATOR_WORDS = ['plus', 'minus', 'times', 'multiply', 'divide', 'substract', 'divided by']
+
+# Keyword -> what must follow it (a regex, checked without consuming it)
+CALCULATION_KEYWORDS = {
+    'sum of': '', 'difference of': '', 'product of': '', 'quotient of': '',
+    'calculate': '', 'math': '',
+    "what's": '', 'whats': r'\s+[\w\s]*\d',
+}
+
+# Place names are matched by the gazetteer
+OUTLET_KEYWORDS = {
+    'outlet': '', 'store': '', 'shop': '', 'location': '', 'branch': '',
+    'opening': '', 'closing': '', 'hours': '', 'time': '',
+}
+
+
+def keyword_regex(keywords: Dict[str, str]) -> str:
+    """
+    Alternation over keywords factored into a trie, so the regex engine
+    branches once per character instead of trying every keyword in turn
+    """
+    trie: Dict[Any, Any] = {}
+    for keyword, follows in keywords.items():
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[None] = f'(?={follows})' if follows else ''
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(
+            (char, child) for char, child in node.items() if char is not None)]
+        if None in node:
+            branches.append(node[None])
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+def compile_intent_matcher() -> re.Pattern:
+    """
+    One regex that finds, left to right, the calculation expressions
+    ("5 + 3", "10 plus 5") and the calculation and outlet keywords of the
+    input. An expression consumes its first number and operator; keywords
+    are matched as lookaheads so that one keyword never hides another that
+    starts inside it.
+    """
+    return re.compile(
+        r'(?P<num1>\d+)\s*(?:(?P<operator>[\+\-\*\/])|(?P<word_operator>'
+        + keyword_regex(dict.fromkeys(OPERATOR_WORDS, '')) + r'))(?=\s*(?P<num2>\d+))'
+        + '|(?=(?P<keyword>' + keyword_regex({**CALCULATION_KEYWORDS, **OUTLET_KEYWORDS}) + '))'
+    )
+
+
+INTENT_MATCHER = compile_intent_matcher()
+
+
+@dataclass
+class IntentMatch:
+    intent: Intent
+    calculation_data: Optional[Dict[str, Any]] = None
+    place: Optional[Place] = None
+
+
 class AgenticPlanner:
-    def __init__(self):
-        # Patterns for identifying calculation-related intents
-        self.calculation_patterns = [
-            r'(\d+)\s*([\+\-\*\/])\s*(\d+)',
-            r'what is (\d+)\s*([\+\-\*\/])\s*(\d+)',
-            r'\d+\s*(plus|minus|times|multiply|divide|substract|divided by)\s*\d+',
-            r'sum of|difference of|product of|quotient of',
-            r'calculate|math',
-            r'what\'s|whats\s+[\w\s]*\d+',
-        ]
-        
-        self.outlet_patterns = [
-            r'ss\s*\d+',
-            r'outlet|store|shop|location|branch',
-            r'opening|closing|hours|time',
-            r'damansara|petaling jaya|kuala lumpur|pj|kl',
-        ]
-        
+    def __init__(self, gazetteer: Optional[Gazetteer] = None,
+                 router: Optional[EmbeddingIntentRouter] = None):
+        self.gazetteer = gazetteer or Gazetteer()
+        # Second stage for turns no pattern matches; None if INTENT_ROUTER=off
+        self.router = router if router is not None else EmbeddingIntentRouter.from_env()
         self.operator_map = {
             'plus': '+', 'add': '+',
             'minus': '-', 'subtract': '-',
@@ -52,79 +110,60 @@ class AgenticPlanner:
             'divide': '/', 'divided by': '/'
         }
     
+    def match_intent(self, user_input: str) -> IntentMatch:
+        """
+        Classify the input and capture calculation operands in one scan.
+        Calculation patterns take priority over outlet patterns wherever they
+        occur, and a symbolic expression ("5 + 3") over a worded one ("5 plus 3").
+        Otherwise a place known to the gazetteer also makes it an outlet question.
+        """
+        calculation = outlet = False
+        worded = None
+        for match in INTENT_MATCHER.finditer(user_input.lower()):
+            keyword = match['keyword']
+            if keyword is not None:
+                if keyword in CALCULATION_KEYWORDS:
+                    calculation = True
+                else:
+                    outlet = True
+            elif match['operator']:
+                return IntentMatch(Intent.CALCULATION, {
+                    # IMPORTANT: Cast to float, as the FastAPI expects floats
+                    'num1': float(match['num1']),
+                    'operator': match['operator'],
+                    'num2': float(match['num2'])
+                })
+            else:
+                calculation = True
+                worded = worded or match
+
+        calculation_data = None
+        operator_symbol = self.operator_map.get(worded['word_operator']) if worded else None
+        if operator_symbol:
+            calculation_data = {
+                'num1': float(worded['num1']),
+                'operator': operator_symbol,
+                'num2': float(worded['num2'])
+            }
+        if calculation:
+            return IntentMatch(Intent.CALCULATION, calculation_data)
+        place = self.gazetteer.locate(user_input)
+        if outlet or place:
+            return IntentMatch(Intent.OUTLET_INFO, calculation_data, place)
+        return IntentMatch(Intent.GENERAL_CHAT, calculation_data)
+
     def analyze_intent(self, user_input: str) -> Intent:
-        user_input_lower = user_input.lower()
-        
-        for pattern in self.calculation_patterns:
-            if re.search(pattern, user_input_lower):
-                return Intent.CALCULATION
-        
-        for pattern in self.outlet_patterns:
-            if re.search(pattern, user_input_lower):
-                return Intent.OUTLET_INFO
-                
-        return Intent.GENERAL_CHAT
+        return self.match_intent(user_input).intent
     
     def extract_calculation_data(self, user_input: str) -> Optional[Dict[str, Any]]:
-        user_input_lower = user_input.lower()
-        
-        math_pattern = r'(\d+)\s*([\+\-\*\/])\s*(\d+)'
-        match = re.search(math_pattern, user_input)
-        if match:
-            try:
-                # IMPORTANT: Cast to float, as the FastAPI expects floats
-                return {
-                    'num1': float(match.group(1)),
-                    'operator': match.group(2),
-                    'num2': float(match.group(3))
-                }
-            except ValueError:
-                pass
-        
-        nl_math_pattern = r'(\d+)\s*(plus|minus|times|multiply|divide|substract|divided by)\s*(\d+)'
-        match_nl = re.search(nl_math_pattern, user_input_lower)
-        if match_nl:
-            op_word = match_nl.group(2)
-            operator_symbol = self.operator_map.get(op_word)
-            if operator_symbol:
-                try:
-                    return {
-                        'num1': float(match_nl.group(1)),
-                        'operator': operator_symbol,
-                        'num2': float(match_nl.group(3))
-                    }
-                except ValueError:
-                    pass
-        
-        what_is_pattern = r'what is (\d+)\s*([\+\-\*\/])\s*(\d+)'
-        match_what_is = re.search(what_is_pattern, user_input_lower)
-        if match_what_is:
-            try:
-                return {
-                    'num1': float(match_what_is.group(1)),
-                    'operator': match_what_is.group(2),
-                    'num2': float(match_what_is.group(3))
-                }
-            except ValueError:
-                pass
-        
-        return None
+        return self.match_intent(user_input).calculation_data
     
     def extract_outlet_data(self, user_input: str) -> Optional[Dict[str, Any]]:
+        return self._outlet_data(user_input, self.gazetteer.locate(user_input))
+
+    def _outlet_data(self, user_input: str, place: Optional[Place]) -> Optional[Dict[str, Any]]:
         user_input_lower = user_input.lower()
         
-        location = None
-        if 'ss2' in user_input_lower or 'ss 2' in user_input_lower:
-            location = 'SS2'
-        elif 'ss15' in user_input_lower or 'ss 15' in user_input_lower:
-            location = 'SS15'
-        elif 'damansara' in user_input_lower:
-            location = 'Damansara'
-        elif 'petaling jaya' in user_input_lower or 'pj' in user_input_lower:
-            location = 'Petaling Jaya'
-        elif 'kuala lumpur' in user_input_lower or 'kl' in user_input_lower:
-            location = 'Kuala Lumpur'
-        
         info_type = None
         if 'opening' in user_input_lower or 'open' in user_input_lower:
             info_type = 'opening_hours'
@@ -133,12 +172,37 @@ class AgenticPlanner:
         elif 'hours' in user_input_lower or 'time' in user_input_lower:
             info_type = 'hours'
 
-        if location or info_type:
-            return {'location': location, 'info_type': info_type}
+        if place or info_type:
+            return {
+                'location': place.name if place else None,
+                'location_kind': place.kind if place else None,
+                'info_type': info_type
+            }
         return None
     
+    def _should_route(self, matched: IntentMatch) -> bool:
+        # Avoid an LLM call for tool questions worded in ways the patterns miss
+        return matched.intent == Intent.GENERAL_CHAT and self.router is not None
+
     def plan_next_action(self, user_input: str) -> PlanningResult:
-        intent = self.analyze_intent(user_input)
+        matched = self.match_intent(user_input)
+        routed = self.router.route(user_input) if self._should_route(matched) else None
+        return self._plan(user_input, matched, routed)
+
+    async def aplan_next_action(self, user_input: str) -> PlanningResult:
+        """Async version of plan_next_action() that embeds the turn in a worker thread"""
+        matched = self.match_intent(user_input)
+        routed = None
+        if self._should_route(matched):
+            routed = await asyncio.to_thread(self.router.route, user_input)
+        return self._plan(user_input, matched, routed)
+
+    def _plan(self, user_input: str, matched: IntentMatch,
+              routed: Optional[Tuple[str, float]]) -> PlanningResult:
+        intent = matched.intent
+        routed_score = None
+        if routed is not None:
+            intent, routed_score = Intent(routed[0]), routed[1]
         
         extracted_data = None
         missing_info = None
@@ -146,7 +210,7 @@ class AgenticPlanner:
         confidence = 0.5
         
         if intent == Intent.CALCULATION:
-            extracted_data = self.extract_calculation_data(user_input)
+            extracted_data = matched.calculation_data
             if extracted_data:
                 action = Action.USE_CALCULATOR
                 confidence = 0.9
@@ -156,20 +220,20 @@ class AgenticPlanner:
                 confidence = 0.8
                 
         elif intent == Intent.OUTLET_INFO:
-            extracted_data = self.extract_outlet_data(user_input)
+            extracted_data = self._outlet_data(user_input, matched.place)
+            is_area = bool(extracted_data) and extracted_data.get('location_kind') == AREA
             
-            if extracted_data and extracted_data.get('location') and \
-               extracted_data['location'] not in ['Petaling Jaya', 'Kuala Lumpur']:
+            if extracted_data and extracted_data.get('location') and not is_area:
                 action = Action.USE_OUTLET_DB
                 confidence = 0.9
             
-            elif extracted_data and (extracted_data.get('location') in ['Petaling Jaya', 'Kuala Lumpur'] or not extracted_data.get('location')) \
+            elif extracted_data and (is_area or not extracted_data.get('location')) \
                 and extracted_data.get('info_type'):
                 action = Action.ASK_FOR_INFO
-                missing_info = f"Yes, we have outlets in Petaling Jaya! Which specific outlet are you referring to (e.g., SS2, SS15, Damansara) to check the {extracted_data['info_type'].replace('_', ' ')}?"
+                missing_info = f"Yes, we have outlets in {extracted_data.get('location') or 'Petaling Jaya'}! Which specific outlet are you referring to (e.g., SS2, SS15, Damansara) to check the {extracted_data['info_type'].replace('_', ' ')}?"
                 confidence = 0.85
             
-            elif extracted_data and extracted_data.get('location') in ['Petaling Jaya', 'Kuala Lumpur'] and not extracted_data.get('info_type'):
+            elif is_area and not extracted_data.get('info_type'):
                 action = Action.ASK_FOR_INFO
                 missing_info = f"Yes, we have outlets in {extracted_data['location']}! Which specific outlet are you referring to?"
                 confidence = 0.85
@@ -178,6 +242,11 @@ class AgenticPlanner:
                 action = Action.ASK_FOR_INFO
                 missing_info = "Which outlet are you asking about? Please specify a location (e.g., SS2, SS15, Damansara) or what kind of information you're looking for."
                 confidence = 0.7
+
+        elif intent == Intent.PRODUCT_INFO:
+            action = Action.USE_PRODUCT_SEARCH
+            extracted_data = {'query': user_input}
+            confidence = routed_score if routed_score is not None else 0.8
         
         return PlanningResult(
             intent=intent,
@@ -232,6 +301,32 @@ async def call_calculator_api(num1: float, operator: str, num2: float) -> str:
         # Catch any other unexpected errors
         return f"An unexpected error occurred while calling the calculator: {str(e)}"
 
+async def call_products_api(query: str) -> str:
+    """
+    Calls the backend's /products search and returns its summary, or the
+    names of the matching products if there is no summary.
+    """
+    products_api_url = os.getenv("PRODUCTS_API_URL", "http://localhost:8000/products")
+
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(products_api_url, json={"query": query}, timeout=30.0)
+            response.raise_for_status()
+
+            data = response.json()
+            if data.get("summary"):
+                return data["summary"]
+            names = [product.get("name") for product in data.get("results", []) if product.get("name")]
+            if names:
+                return "Here are some products that might interest you: " + ", ".join(names) + "."
+            return "I couldn't find any products matching that."
+    except httpx.HTTPStatusError as e:
+        return f"Product search error: {e.response.status_code} - {e.response.text}"
+    except httpx.RequestError as e:
+        return f"Could not connect to the product search service. Please try again later. (Error: {e})"
+    except Exception as e:
+        return f"An unexpected error occurred while searching products: {str(e)}"
+
 def get_mock_outlet_info(location: Optional[str], info_type: Optional[str]) -> str:
     """
     Mocks retrieving specific information about coffee shop outlets.
@@ -0,0 +1,206 @@
+# mindhive-chatbot/session_store.py
+
+"""
+Bounded per-session chat history for ChatbotController.
+
+Sessions are kept in LRU order. A session idle for longer than
+CHAT_SESSION_TTL seconds is dropped, and beyond CHAT_MAX_SESSIONS sessions
+the least recently used ones are. Each history is held to
+CHAT_HISTORY_TOKEN_BUDGET (estimated) tokens: once a turn pushes it over,
+the oldest turns are folded into one summary message that keeps what the
+user said, so the history sent to the LLM stops growing.
+
+With a persistent backend (CHAT_HISTORY_BACKEND, see history_backends.py)
+histories are shared between processes: each lookup reads the session from
+the backend, which also enforces the TTL, and only the token budget is
+applied here.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from history_backends import HistoryBackend, create_backend
+
+SUMMARY_PREFIX = "Summary of the earlier conversation. The user said: "
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """Rough token count: about four characters per token plus role overhead"""
+    return 4 + len(str(message.content)) // 4
+
+
+def is_summary(message: BaseMessage) -> bool:
+    return isinstance(message, SystemMessage) and str(message.content).startswith(SUMMARY_PREFIX)
+
+
+class SessionHistoryStore:
+    def __init__(self, max_sessions: Optional[int] = None, ttl: Optional[float] = None,
+                 token_budget: Optional[int] = None, summary_tokens: Optional[int] = None,
+                 history_factory: Callable[[], BaseChatMessageHistory] = ChatMessageHistory,
+                 clock: Callable[[], float] = time.monotonic,
+                 backend: Optional[HistoryBackend] = None):
+        self.max_sessions = int(os.getenv("CHAT_MAX_SESSIONS", "1000")) if max_sessions is None else max_sessions
+        ttl = float(os.getenv("CHAT_SESSION_TTL", "3600")) if ttl is None else ttl
+        self.ttl = ttl if ttl > 0 else None
+        self.token_budget = (
+            int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000")) if token_budget is None else token_budget
+        )
+        # Share of the budget the summary of dropped turns may use
+        self.summary_tokens = self.token_budget // 4 if summary_tokens is None else summary_tokens
+        self.history_factory = history_factory
+        self.clock = clock
+        # None keeps histories in this process
+        self.backend = create_backend(ttl=self.ttl) if backend is None else backend
+        self._sessions = OrderedDict()  # session_id -> (last_used, history)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.trims = 0
+        self.trimmed_messages = 0
+        self.prompt_tokens_last = 0
+        self.prompt_tokens_max = 0
+        self.prompt_tokens_total = 0
+        self.lookups = 0
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        """The history for a session, created if needed and trimmed to the token budget"""
+        if self.backend is not None:
+            history = self.backend.history(session_id)
+            tokens = self.fit(history)
+            with self._lock:
+                self._record(tokens)
+            return history
+
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                history = self.history_factory()
+                self.created += 1
+            else:
+                history = entry[1]
+            self._sessions[session_id] = (now, history)
+            self._sessions.move_to_end(session_id)
+            while self.max_sessions > 0 and len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            self._record(self.fit(history))
+        return history
+
+    def _record(self, tokens: int):
+        self.lookups += 1
+        self.prompt_tokens_last = tokens
+        self.prompt_tokens_max = max(self.prompt_tokens_max, tokens)
+        self.prompt_tokens_total += tokens
+
+    def _expire(self, now: float):
+        """Drop sessions idle for longer than the TTL (oldest first)"""
+        if self.ttl is None:
+            return
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self.expirations += 1
+
+    def fit(self, history: BaseChatMessageHistory) -> int:
+        """
+        Once the history is over the token budget, fold the oldest whole
+        turns into the summary message until it is back under three
+        quarters of it; the latest turn is always kept.
+        Returns the history's estimated tokens.
+        """
+        messages = list(history.messages)
+        tokens = [estimate_tokens(message) for message in messages]
+        total = sum(tokens)
+        if self.token_budget <= 0 or total <= self.token_budget:
+            return total
+
+        start = 1 if messages and is_summary(messages[0]) else 0
+        keep_from = start
+        remaining = sum(tokens[start:])
+        # Trim to three quarters of the budget so the next few turns are
+        # plain appends rather than another rewrite
+        target = self.token_budget * 3 // 4
+        # Candidate cut points are the later turns' first messages, so the
+        # last turn is never dropped
+        for turn_start in [i for i in range(start + 1, len(messages)) if isinstance(messages[i], HumanMessage)]:
+            if remaining + self.summary_tokens <= target:
+                break
+            remaining -= sum(tokens[keep_from:turn_start])
+            keep_from = turn_start
+        if keep_from == start:
+            return total
+
+        dropped = messages[start:keep_from]
+        said = [str(m.content) for m in dropped if isinstance(m, HumanMessage)]
+        previous = str(messages[0].content)[len(SUMMARY_PREFIX):] if start else ""
+        summary = self._summarize([previous] + said if previous else said)
+        kept = ([SystemMessage(content=summary)] if summary else []) + messages[keep_from:]
+        if hasattr(history, "replace_messages"):
+            history.replace_messages(kept)
+        else:
+            history.clear()
+            history.add_messages(kept)
+        self.trims += 1
+        self.trimmed_messages += len(dropped)
+        return sum(estimate_tokens(message) for message in kept)
+
+    def _summarize(self, said: List[str]) -> str:
+        """Summary message text within summary_tokens; the earliest words are kept"""
+        if not said or self.summary_tokens <= 0:
+            return ""
+        text = SUMMARY_PREFIX + " | ".join(said)
+        limit = max(len(SUMMARY_PREFIX), (self.summary_tokens - 4) * 4)
+        return text if len(text) <= limit else text[:limit - 3] + "..."
+
+    def clear(self, session_id: str):
+        if self.backend is not None:
+            self.backend.delete(session_id)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def stats(self) -> Dict[str, Any]:
+        if self.backend is not None:
+            return {**self._prompt_stats(), "ttl": self.ttl, "history_backend": self.backend.stats()}
+        with self._lock:
+            histories = [history for _, history in self._sessions.values()]
+            messages = sum(len(history.messages) for history in histories)
+            stored_tokens = sum(estimate_tokens(m) for history in histories for m in history.messages)
+        return {
+            "sessions": len(histories),
+            "max_sessions": self.max_sessions,
+            "ttl": self.ttl,
+            "created": self.created,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "messages": messages,
+            "stored_tokens": stored_tokens,
+            **self._prompt_stats(),
+        }
+
+    def _prompt_stats(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "trims": self.trims,
+            "trimmed_messages": self.trimmed_messages,
+            "prompt_tokens_last": self.prompt_tokens_last,
+            "prompt_tokens_max": self.prompt_tokens_max,
+            "prompt_tokens_mean": self.prompt_tokens_total / self.lookups if self.lookups else 0.0,
+        }
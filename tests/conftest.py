@@ -0,0 +1,28 @@
+"""
+Make the backend's modules (utils.*, data.*) importable from the tests, the
+way they are when the API runs from backend-fastapi/. Appended, so the
+chatbot's own modules still win any name clash (main).
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend-fastapi")
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+
+@pytest.fixture
+def outlets_db(tmp_path):
+    """A new outlets database seeded with the mock outlets, as (path, engine)"""
+    from sqlalchemy import create_engine, event
+    from utils.database import _set_sqlite_pragmas, init_db
+
+    path = str(tmp_path / "zus.db")
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    init_db(bind=engine)
+    yield path, engine
+    engine.dispose()
@@ -0,0 +1,62 @@
+"""
+Tests for the product query micro-batcher: batching, in-flight dispatch
+tracking and queue backpressure.
+"""
+
+import asyncio
+import gc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from utils.batcher import QueryBatcher
+
+
+def echo_many(queries, k, *options):
+    return [[f"{query}:{i}" for i in range(k)] for query in queries]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_share_a_batch():
+    batcher = QueryBatcher(echo_many, ThreadPoolExecutor(1), max_batch_size=8, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(f"q{i}", 2) for i in range(5)))
+    assert results == [[f"q{i}:0", f"q{i}:1"] for i in range(5)]
+    assert batcher.stats()["batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatches_survive_garbage_collection():
+    release = threading.Event()
+
+    def slow_many(queries, k, *options):
+        release.wait(5)
+        return echo_many(queries, k)
+
+    batcher = QueryBatcher(slow_many, ThreadPoolExecutor(1), max_batch_size=4, max_wait_ms=1)
+    pending = asyncio.ensure_future(batcher.submit("q", 1))
+    while not batcher.stats()["in_flight"]:
+        await asyncio.sleep(0.001)
+    gc.collect()
+    release.set()
+    assert await asyncio.wait_for(pending, 5) == ["q:0"]
+    assert batcher.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure():
+    release = threading.Event()
+
+    def blocked_many(queries, k, *options):
+        release.wait(5)
+        return echo_many(queries, k)
+
+    batcher = QueryBatcher(blocked_many, ThreadPoolExecutor(1), max_batch_size=2, max_wait_ms=1,
+                           max_queue_size=2)
+    submits = [asyncio.ensure_future(batcher.submit(f"q{i}", 1)) for i in range(8)]
+    await asyncio.sleep(0.05)
+    # The queue never holds more than its bound; the rest wait to enqueue
+    assert batcher.stats()["queued"] <= 2
+    assert not any(submit.done() for submit in submits)
+    release.set()
+    results = await asyncio.wait_for(asyncio.gather(*submits), 5)
+    assert results == [[f"q{i}:0"] for i in range(8)]
@@ -0,0 +1,71 @@
+"""
+Tests for the build lock and atomic file replacement used by the product
+store's files.
+"""
+
+import fcntl
+import os
+import threading
+
+import pytest
+from utils.files import FileLock, atomic_write
+from utils.product_store import ProductMetadataStore
+
+
+def held_elsewhere(path):
+    """Whether another open file description can't take the lock"""
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def test_file_lock_is_exclusive_and_reentrant(tmp_path):
+    path = str(tmp_path / ".build.lock")
+    lock = FileLock(path)
+    with lock:
+        assert held_elsewhere(path)
+        with lock:
+            assert held_elsewhere(path)
+        assert held_elsewhere(path)
+    assert not held_elsewhere(path)
+
+
+def test_atomic_write_replaces_or_leaves_target(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        f.write("first")
+    with pytest.raises(RuntimeError):
+        with atomic_write(path, "w", encoding="utf-8") as f:
+            f.write("partial")
+            raise RuntimeError("interrupted")
+    assert open(path).read() == "first"
+    assert os.listdir(tmp_path) == ["manifest.json"]
+
+
+def test_concurrent_rewrites_use_their_own_temp_files(tmp_path):
+    data, offsets = str(tmp_path / "products.dat"), str(tmp_path / "products.idx")
+    catalogs = [[{"name": f"p{worker}-{i}"} for i in range(2000)] for worker in range(4)]
+    errors = []
+
+    def rewrite(catalog):
+        try:
+            ProductMetadataStore(data, offsets).rewrite(catalog)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=rewrite, args=(catalog,)) for catalog in catalogs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    store = ProductMetadataStore(data, offsets)
+    assert len(store) == 2000
+    assert list(store)[0]["name"].endswith("-0")
+    assert sorted(os.listdir(tmp_path)) == ["products.dat", "products.idx"]
@@ -0,0 +1,131 @@
+"""
+Tests for the outlet gazetteer: word-boundary matching, precedence between
+places, building from the outlets table and reloading when it changes.
+"""
+
+import sqlite3
+
+import pytest
+from gazetteer import AREA, OUTLET, Gazetteer, Place, outlet_places, tokenize
+from planner import AgenticPlanner, Intent, Action
+
+
+def create_outlets_db(path, outlets):
+    """A minimal outlets database with the backend's table_versions counter"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE outlets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, address TEXT);
+        CREATE TABLE table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0);
+        INSERT INTO table_versions (name, version) VALUES ('outlets', 0);
+        CREATE TRIGGER outlets_version_insert AFTER INSERT ON outlets
+        BEGIN UPDATE table_versions SET version = version + 1 WHERE name = 'outlets'; END;
+    """)
+    conn.executemany("INSERT INTO outlets (name, address) VALUES (?, ?)", outlets)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    # Built-in places only
+    return Gazetteer(database_path=str(tmp_path / "missing.db"))
+
+
+def test_tokenize_splits_letters_and_digits():
+    assert tokenize("SS2") == tokenize("ss 2") == tokenize("SS-2") == ["ss", "2"]
+    assert tokenize("the outlet's hours") == ["the", "outlet", "s", "hours"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Is there an outlet in Petaling Jaya?", Place("Petaling Jaya", AREA)),
+    ("any in PJ?", Place("Petaling Jaya", AREA)),
+    ("SS 2, what's the opening time?", Place("SS2", OUTLET)),
+    ("ss15 hours", Place("SS15", OUTLET)),
+    # Outlets win over areas wherever they are mentioned
+    ("In KL, or maybe damansara", Place("Damansara", OUTLET)),
+    # Aliases only match whole words
+    ("weekly specials", None),
+    ("class 2 starts soon", None),
+    ("the pjs are comfy", None),
+])
+def test_locate(gazetteer, text, expected):
+    assert gazetteer.locate(text) == expected
+
+
+def test_outlet_places_from_name_and_address():
+    places = outlet_places(
+        "ZUS Coffee - Uptown Damansara",
+        "44-G (Ground Floor, Jalan SS21/39, Damansara Utama, 47400 Petaling Jaya, Selangor",
+    )
+    assert places == [
+        Place("Uptown Damansara", OUTLET),
+        Place("Damansara Utama", AREA),
+        Place("Petaling Jaya", AREA),
+    ]
+
+
+def test_longest_alias_wins(tmp_path):
+    gazetteer = Gazetteer(database_path=str(tmp_path / "missing.db"))
+    gazetteer.build([("ZUS Coffee - Uptown Damansara", "1, Jalan A, Damansara Utama, 47400 Petaling Jaya, Selangor")])
+    assert gazetteer.places("uptown damansara or damansara utama?") == [
+        Place("Uptown Damansara", OUTLET), Place("Damansara Utama", AREA)
+    ]
+    assert gazetteer.locate("damansara") == Place("Damansara", OUTLET)
+
+
+def test_builds_from_outlets_table_and_reloads_on_change(tmp_path):
+    path = str(tmp_path / "zus.db")
+    create_outlets_db(path, [("ZUS Coffee - Bangsar South", "2, Jalan B, Bangsar, 59200 Kuala Lumpur, Wilayah Persekutuan")])
+    gazetteer = Gazetteer(database_path=path, reload_interval=0)
+
+    assert gazetteer.locate("is bangsar south open?") == Place("Bangsar South", OUTLET)
+    assert gazetteer.locate("outlets in bangsar") == Place("Bangsar", AREA)
+    assert gazetteer.locate("anything in cheras?") is None
+    assert gazetteer.reloads == 1
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO outlets (name, address) VALUES ('ZUS Coffee - Cheras Leisure Mall', '3, Jalan C, Cheras, 56100 Kuala Lumpur, Wilayah Persekutuan')")
+    conn.commit()
+    conn.close()
+
+    assert gazetteer.locate("anything in cheras?") == Place("Cheras", AREA)
+    assert gazetteer.locate("cheras leisure mall hours") == Place("Cheras Leisure Mall", OUTLET)
+    assert gazetteer.reloads == 2
+    # Unchanged table: the version check doesn't rebuild
+    gazetteer.locate("bangsar")
+    assert gazetteer.reloads == 2
+
+
+def test_reload_interval_throttles_version_checks(tmp_path):
+    path = str(tmp_path / "zus.db")
+    create_outlets_db(path, [])
+    gazetteer = Gazetteer(database_path=path, reload_interval=3600)
+    gazetteer.locate("hello")
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO outlets (name, address) VALUES ('ZUS Coffee - Cheras', '3, Jalan C, 56100 Kuala Lumpur')")
+    conn.commit()
+    conn.close()
+
+    assert gazetteer.locate("cheras") is None
+    assert gazetteer.refresh(force=True)
+    assert gazetteer.locate("cheras") == Place("Cheras", OUTLET)
+
+
+def test_planner_routes_places_from_gazetteer(tmp_path, monkeypatch):
+    monkeypatch.setenv("INTENT_ROUTER", "off")
+    path = str(tmp_path / "zus.db")
+    create_outlets_db(path, [("ZUS Coffee - Bangsar South", "2, Jalan B, Bangsar, 59200 Kuala Lumpur, Wilayah Persekutuan")])
+    planner = AgenticPlanner(Gazetteer(database_path=path))
+
+    result = planner.plan_next_action("Is Bangsar South busy?")
+    assert result.intent == Intent.OUTLET_INFO
+    assert result.action == Action.USE_OUTLET_DB
+    assert result.extracted_data['location'] == "Bangsar South"
+
+    result = planner.plan_next_action("Anything in Bangsar?")
+    assert result.action == Action.ASK_FOR_INFO
+    assert "Bangsar" in result.missing_info
+
+    # 'kl' inside another word is no longer a place
+    assert planner.plan_next_action("Any weekly promotions?").intent == Intent.GENERAL_CHAT
@@ -0,0 +1,129 @@
+"""
+Tests for nearest-outlet search: the bounding box, haversine reranking,
+and the outlets_rtree index kept in step with outlets.
+"""
+
+import math
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy import text
+from utils.database import MIGRATIONS, init_db
+from utils.geo import ANY_LOCATED_SQL, BOUNDING_BOX_SQL, EARTH_RADIUS_KM, bounding_box, haversine_km, nearest
+from utils.ingest import upsert_outlets
+
+# Menara UOA Bangsar
+LAT, LON = 3.1285, 101.6787
+
+
+def destination(lat, lon, bearing_deg, distance_km):
+    """The point distance_km from (lat, lon) along a great circle"""
+    phi, lam, theta = math.radians(lat), math.radians(lon), math.radians(bearing_deg)
+    delta = distance_km / EARTH_RADIUS_KM
+    phi2 = math.asin(math.sin(phi) * math.cos(delta) + math.cos(phi) * math.sin(delta) * math.cos(theta))
+    lam2 = lam + math.atan2(math.sin(theta) * math.sin(delta) * math.cos(phi),
+                            math.cos(delta) - math.sin(phi) * math.sin(phi2))
+    return math.degrees(phi2), math.degrees(lam2)
+
+
+def test_haversine_distance():
+    assert haversine_km(LAT, LON, LAT, LON) == 0
+    # One degree of latitude
+    assert haversine_km(0, 0, 1, 0) == pytest.approx(111.195, abs=0.01)
+    # SS2 to Menara UOA Bangsar
+    assert haversine_km(3.1186, 101.6221, LAT, LON) == pytest.approx(6.38, abs=0.05)
+
+
+@pytest.mark.parametrize("lat, lon, radius_km", [(LAT, LON, 10), (60.0, 10.0, 50), (-45.0, 170.0, 100)])
+def test_bounding_box_contains_the_circle(lat, lon, radius_km):
+    box = bounding_box(lat, lon, radius_km)
+    for bearing in range(0, 360, 5):
+        point_lat, point_lon = destination(lat, lon, bearing, radius_km * 0.999)
+        assert box["min_lat"] <= point_lat <= box["max_lat"]
+        assert box["min_lon"] <= point_lon <= box["max_lon"]
+
+
+def test_bounding_box_widens_near_the_poles_and_antimeridian():
+    assert bounding_box(89.95, 0.0, 10)["min_lon"] == -180.0
+    box = bounding_box(0.0, 179.99, 10)
+    assert (box["min_lon"], box["max_lon"]) == (-180.0, 180.0)
+
+
+def test_nearest_reranks_by_distance_within_radius():
+    rows = [
+        {"name": "far", "latitude": LAT + 0.2, "longitude": LON},
+        {"name": "near", "latitude": LAT + 0.01, "longitude": LON},
+        {"name": "middle", "latitude": LAT, "longitude": LON + 0.05},
+    ]
+    ranked = nearest(rows, LAT, LON, k=5, radius_km=10)
+    assert [row["name"] for _, row in ranked] == ["near", "middle"]
+    assert ranked[0][0] == pytest.approx(1.112, abs=0.01)
+    assert [row["name"] for _, row in nearest(rows, LAT, LON, k=1, radius_km=10)] == ["near"]
+    assert nearest(rows, LAT, LON, k=5, radius_km=1) == []
+
+
+def located(name, lat, lon):
+    return {"name": name, "address": f"1 Jalan {name}, Kuala Lumpur", "opening_time": "08:00",
+            "closing_time": "22:00", "latitude": lat, "longitude": lon}
+
+
+def search(engine, lat, lon, k, radius_km):
+    with engine.connect() as conn:
+        candidates = [dict(row._mapping) for row in conn.execute(text(BOUNDING_BOX_SQL),
+                                                                 bounding_box(lat, lon, radius_km))]
+    return candidates, [row["name"] for _, row in nearest(candidates, lat, lon, k, radius_km)]
+
+
+def test_box_corner_outside_the_radius_is_a_candidate_but_not_a_result(outlets_db):
+    _, engine = outlets_db
+    box = bounding_box(LAT, LON, 2)
+    corner = (box["max_lat"] - 0.0005, box["max_lon"] - 0.0005)
+    assert haversine_km(LAT, LON, *corner) > 2
+    upsert_outlets(engine, [located("Corner", *corner), located("Inside", *destination(LAT, LON, 45, 1.9))])
+
+    candidates, names = search(engine, LAT, LON, k=5, radius_km=2)
+    assert {row["name"] for row in candidates} == {"ZUS Coffee - Menara UOA Bangsar", "Corner", "Inside"}
+    assert names == ["ZUS Coffee - Menara UOA Bangsar", "Inside"]
+
+
+def test_seeded_outlets_are_found_nearest_first(outlets_db):
+    _, engine = outlets_db
+    _, names = search(engine, 3.12, 101.62, k=2, radius_km=20)
+    assert names == ["ZUS Coffee - SS2", "ZUS Coffee - Uptown Damansara"]
+
+
+def test_rtree_follows_inserts_updates_and_deletes(outlets_db):
+    _, engine = outlets_db
+
+    def indexed(name):
+        with engine.connect() as conn:
+            row = conn.execute(text(
+                "SELECT r.min_lat, r.min_lon FROM outlets_rtree r JOIN outlets o ON o.id = r.id WHERE o.name = :name"
+            ), {"name": name}).fetchone()
+        return None if row is None else (round(row[0], 4), round(row[1], 4))
+
+    upsert_outlets(engine, [located("Moving", 3.0, 101.5)])
+    assert indexed("Moving") == (3.0, 101.5)
+    upsert_outlets(engine, [located("Moving", 3.2, 101.7)])
+    assert indexed("Moving") == (3.2, 101.7)
+    assert search(engine, 3.0, 101.5, k=5, radius_km=1)[1] == []
+    upsert_outlets(engine, [located("Moving", None, None)])
+    assert indexed("Moving") is None
+    upsert_outlets(engine, [located("Moving", 3.2, 101.7)])
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM outlets WHERE name = 'Moving'"))
+        assert conn.execute(text("SELECT COUNT(*) FROM outlets_rtree")).scalar() == 4
+
+
+def test_migration_backfills_mock_outlet_coordinates(outlets_db):
+    _, engine = outlets_db
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE outlets SET latitude = NULL, longitude = NULL"))
+        assert not conn.execute(text(ANY_LOCATED_SQL)).scalar()
+        conn.execute(text(f"PRAGMA user_version = {len(MIGRATIONS) - 1}"))
+    init_db(bind=engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM outlets_rtree")).scalar() == 4
+    assert search(engine, LAT, LON, k=1, radius_km=1)[1] == ["ZUS Coffee - Menara UOA Bangsar"]
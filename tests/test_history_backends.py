@@ -0,0 +1,178 @@
+"""
+Tests for the persistent chat history backends: histories shared between
+workers, append-only writes, trimming and idle expiry. The Redis backend runs
+against fakeredis as a local stand-in for the server.
+"""
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("langchain_community")
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from history_backends import HistoryBackend, RedisHistoryBackend, SQLiteHistoryBackend, create_backend
+from session_store import SessionHistoryStore, is_summary
+
+
+def add_turn(history, user, reply):
+    history.add_messages([HumanMessage(content=user), AIMessage(content=reply)])
+
+
+@pytest.fixture
+def sqlite_workers(tmp_path):
+    """Two backends on one database file, as two worker processes would have"""
+    path = str(tmp_path / "history.db")
+    return SQLiteHistoryBackend(path=path, ttl=3600), SQLiteHistoryBackend(path=path, ttl=3600)
+
+
+@pytest.fixture
+def redis_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return (
+        RedisHistoryBackend(client=fakeredis.FakeRedis(server=server), ttl=3600),
+        RedisHistoryBackend(client=fakeredis.FakeRedis(server=server), ttl=3600),
+    )
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def workers(request):
+    return request.getfixturevalue(f"{request.param}_workers")
+
+
+def test_history_is_shared_between_workers(workers):
+    first = SessionHistoryStore(token_budget=0, backend=workers[0])
+    second = SessionHistoryStore(token_budget=0, backend=workers[1])
+
+    add_turn(first.get("alice"), "my name is Alice", "Hi Alice!")
+    add_turn(second.get("alice"), "what is my name?", "You're Alice.")
+
+    messages = first.get("alice").messages
+    assert [m.content for m in messages] == ["my name is Alice", "Hi Alice!", "what is my name?", "You're Alice."]
+    assert [type(m) for m in messages] == [HumanMessage, AIMessage] * 2
+    assert first.get("bob").messages == []
+
+
+def test_one_read_per_lookup(workers):
+    backend = workers[0]
+    store = SessionHistoryStore(token_budget=100, backend=backend)
+    history = store.get("s")
+    add_turn(history, "hello", "hi")
+    history.messages
+    history.messages
+    assert backend.stats()["reads"] == 1
+    assert backend.stats()["appends"] == 1
+
+
+def test_trim_replaces_history_for_every_worker(workers):
+    first = SessionHistoryStore(token_budget=120, summary_tokens=40, backend=workers[0])
+    second = SessionHistoryStore(token_budget=120, summary_tokens=40, backend=workers[1])
+    add_turn(first.get("s"), "my name is Alice", "Nice to meet you")
+    for i in range(6):
+        add_turn(first.get("s"), f"question {i} " + "x" * 60, "y" * 80)
+
+    messages = second.get("s").messages
+    assert is_summary(messages[0])
+    assert "my name is Alice" in messages[0].content
+    assert messages[-2].content.startswith("question 5")
+    assert second.stats()["trims"] >= 1
+
+
+def contents(backend, session_id="s"):
+    return [m.content for m in backend.history(session_id).messages]
+
+
+def test_replace_keeps_turns_appended_since_the_read(workers):
+    first, second = workers
+    add_turn(first.history("s"), "one", "1")
+    add_turn(first.history("s"), "two", "2")
+
+    trimming = first.history("s")
+    assert len(trimming.messages) == 4
+    # Another worker answers a turn while this one is trimming
+    add_turn(second.history("s"), "three", "3")
+    trimming.replace_messages([SystemMessage(content="summary"), *trimming.messages[2:]])
+
+    assert contents(second) == ["summary", "two", "2", "three", "3"]
+    assert [m.content for m in trimming.messages] == ["summary", "two", "2", "three", "3"]
+
+
+def test_replace_leaves_a_history_rewritten_since_the_read(workers):
+    first, second = workers
+    add_turn(first.history("s"), "one", "1")
+    add_turn(first.history("s"), "two", "2")
+    a, b = first.history("s"), second.history("s")
+    a.messages, b.messages
+
+    a.replace_messages([SystemMessage(content="summary a"), *a.messages[2:]])
+    add_turn(first.history("s"), "three", "3")
+    b.replace_messages([SystemMessage(content="summary b"), *b.messages[2:]])
+
+    assert contents(second) == ["summary a", "two", "2", "three", "3"]
+    # The skipped handle reads the history again
+    assert [m.content for m in b.messages] == ["summary a", "two", "2", "three", "3"]
+
+
+def test_backends_must_implement_storage():
+    with pytest.raises(TypeError):
+        HistoryBackend()
+
+    class Partial(HistoryBackend):
+        def load(self, session_id):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_clear(workers):
+    store = SessionHistoryStore(token_budget=0, backend=workers[0])
+    add_turn(store.get("s"), "hi", "hello")
+    store.clear("s")
+    assert SessionHistoryStore(token_budget=0, backend=workers[1]).get("s").messages == []
+
+
+def test_sqlite_writes_append_rows(sqlite_workers):
+    backend = sqlite_workers[0]
+    history = backend.history("s")
+    add_turn(history, "one", "1")
+    add_turn(history, "two", "2")
+    conn = sqlite3.connect(backend.path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM chat_messages WHERE session_id = 's' ORDER BY id")]
+    assert len(ids) == 4
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_sqlite_idle_sessions_expire(sqlite_workers):
+    backend = sqlite_workers[0]
+    add_turn(backend.history("old"), "hi", "hello")
+    add_turn(backend.history("new"), "hi", "hello")
+    backend._db.execute("UPDATE chat_sessions SET updated = updated - 7200 WHERE session_id = 'old'")
+
+    assert backend.history("old").messages == []
+    assert len(backend.history("new").messages) == 2
+    # A new turn on an expired session starts it over
+    add_turn(backend.history("old"), "back again", "welcome back")
+    assert [m.content for m in backend.history("old").messages] == ["back again", "welcome back"]
+
+    backend._db.execute("UPDATE chat_sessions SET updated = updated - 7200 WHERE session_id = 'new'")
+    assert backend.purge() == 1
+    assert backend.stats()["sessions"] == 1
+
+
+def test_redis_key_ttl_is_renewed_on_write(redis_workers):
+    backend = redis_workers[0]
+    add_turn(backend.history("s"), "hi", "hello")
+    assert 0 < backend.client.ttl("chat_history:s") <= 3600
+
+
+def test_create_backend_from_env(monkeypatch, tmp_path):
+    monkeypatch.delenv("CHAT_HISTORY_BACKEND", raising=False)
+    assert create_backend() is None
+    monkeypatch.setenv("CHAT_HISTORY_BACKEND", "sqlite")
+    monkeypatch.setenv("CHAT_HISTORY_SQLITE_PATH", str(tmp_path / "history.db"))
+    backend = create_backend(ttl=60)
+    assert isinstance(backend, SQLiteHistoryBackend) and backend.ttl == 60
+    with pytest.raises(ValueError):
+        create_backend("postgres")
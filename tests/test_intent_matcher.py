@@ -0,0 +1,75 @@
+"""
+Tests for the planner's compiled intent matcher: intent priority and operand
+capture in a single scan.
+"""
+
+import pytest
+from gazetteer import Gazetteer
+from planner import AgenticPlanner, Intent, Action, INTENT_MATCHER, keyword_regex
+import re
+
+
+@pytest.fixture
+def planner(tmp_path, monkeypatch):
+    # Patterns and built-in places only
+    monkeypatch.setenv("INTENT_ROUTER", "off")
+    return AgenticPlanner(Gazetteer(database_path=str(tmp_path / "missing.db")))
+
+
+@pytest.mark.parametrize("user_input, intent", [
+    ("Hello, my name is Alice", Intent.GENERAL_CHAT),
+    ("Is there an outlet in Petaling Jaya?", Intent.OUTLET_INFO),
+    ("What are the opening hours?", Intent.OUTLET_INFO),
+    ("SS 2 please", Intent.OUTLET_INFO),
+    ("Tell me a joke about coffee", Intent.GENERAL_CHAT),
+    ("What is 10 plus 5?", Intent.CALCULATION),
+    ("Can you calculate this for me?", Intent.CALCULATION),
+    ("whats 3 and 4", Intent.CALCULATION),
+    ("whats up", Intent.GENERAL_CHAT),
+    # Calculation keywords win even after an outlet keyword
+    ("Which outlet is cheaper, can you do the math?", Intent.CALCULATION),
+    ("The store hours times 2", Intent.OUTLET_INFO),
+])
+def test_analyze_intent(planner, user_input, intent):
+    assert planner.analyze_intent(user_input) == intent
+
+
+@pytest.mark.parametrize("user_input, data", [
+    ("What is 12 * 7", {'num1': 12.0, 'operator': '*', 'num2': 7.0}),
+    ("10 divided by 2", {'num1': 10.0, 'operator': '/', 'num2': 2.0}),
+    ("What is 10 PLUS 5?", {'num1': 10.0, 'operator': '+', 'num2': 5.0}),
+    # A symbolic expression beats an earlier worded one
+    ("5 plus 3*4", {'num1': 3.0, 'operator': '*', 'num2': 4.0}),
+    # The first worded expression is used, even if its word has no operator
+    ("9 substract 2 or 4 minus 1", None),
+    ("8 multiply 3", {'num1': 8.0, 'operator': '*', 'num2': 3.0}),
+    ("calculate something", None),
+])
+def test_extract_calculation_data(planner, user_input, data):
+    assert planner.extract_calculation_data(user_input) == data
+
+
+def test_keywords_inside_other_keywords_are_found():
+    """Keywords are matched as lookaheads, so overlapping ones are all reported"""
+    keywords = [m['keyword'] for m in INTENT_MATCHER.finditer("shoproduct of hoursum of") if m['keyword']]
+    assert keywords == ['shop', 'product of', 'hours', 'sum of']
+
+
+def test_keyword_regex_matches_like_plain_alternation():
+    keywords = {'divide': '', 'divided by': '', 'dig': '', 'd': r'\d'}
+    trie = re.compile(keyword_regex(keywords))
+    plain = re.compile('divided by|divide|dig|d(?=\\d)')
+    for text in ["divided by", "divide", "dividend", "dig", "d1", "dx", "x"]:
+        expected, actual = plain.match(text), trie.match(text)
+        assert (expected and expected.group()) == (actual and actual.group()), text
+
+
+def test_plan_next_action_uses_single_match(planner):
+    result = planner.plan_next_action("What is 10 plus 5?")
+    assert result.intent == Intent.CALCULATION
+    assert result.action == Action.USE_CALCULATOR
+    assert result.extracted_data == {'num1': 10.0, 'operator': '+', 'num2': 5.0}
+
+    result = planner.plan_next_action("Can you calculate this for me?")
+    assert result.action == Action.ASK_FOR_INFO
+    assert result.extracted_data is None
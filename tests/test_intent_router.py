@@ -0,0 +1,116 @@
+"""
+Tests for the embedding intent router, using a bag-of-words stand-in for the
+sentence embedding model.
+"""
+
+import threading
+
+import pytest
+from gazetteer import Gazetteer
+from intent_router import EmbeddingIntentRouter
+from planner import AgenticPlanner, Intent, Action
+
+EXAMPLES = {
+    "product_info": ["tumbler cup", "mug cup"],
+    "outlet_info": ["cafe branch", "cafe open"],
+    "general_chat": ["hello thanks", "joke hello"],
+}
+VOCABULARY = ["tumbler", "cup", "mug", "cafe", "branch", "open", "hello", "thanks", "joke"]
+
+
+@pytest.fixture
+def encode():
+    np = pytest.importorskip("numpy")
+
+    def bag_of_words(texts):
+        vectors = np.zeros((len(texts), len(VOCABULARY)), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                if word in VOCABULARY:
+                    vectors[row, VOCABULARY.index(word)] += 1
+        return vectors
+
+    return bag_of_words
+
+
+@pytest.fixture
+def router(encode):
+    return EmbeddingIntentRouter(encode=encode, examples=EXAMPLES, min_score=0.3, min_margin=0.05)
+
+
+def test_routes_to_closest_centroid(router):
+    intent, score = router.route("a blue mug")
+    assert intent == "product_info"
+    assert score > 0.3
+    assert router.route("is the branch near you")[0] == "outlet_info"
+
+
+def test_keeps_chat_and_unclear_turns_for_the_llm(router):
+    assert router.route("hello there") is None
+    # Equally close to products and outlets
+    assert router.route("cup cafe") is None
+    # Nothing in common with any intent
+    assert router.route("quantum chromodynamics") is None
+
+
+def test_stats_report_diverted_turns(router):
+    router.route("a blue mug")
+    router.route("cafe branch")
+    router.route("hello")
+    stats = router.stats()
+    assert stats["available"]
+    assert stats["considered"] == 3
+    assert stats["diverted"] == 2
+    assert stats["diverted_by_intent"] == {"product_info": 1, "outlet_info": 1}
+
+
+def test_disabled_without_encoder():
+    def missing_model(texts):
+        raise ImportError("No module named 'sentence_transformers'")
+
+    router = EmbeddingIntentRouter(encode=missing_model, examples=EXAMPLES)
+    assert router.route("a blue mug") is None
+    assert not router.stats()["available"]
+
+
+def test_from_env_can_turn_the_router_off(monkeypatch):
+    monkeypatch.setenv("INTENT_ROUTER", "off")
+    assert EmbeddingIntentRouter.from_env() is None
+
+
+def test_planner_uses_router_when_no_pattern_matches(router, tmp_path):
+    planner = AgenticPlanner(Gazetteer(database_path=str(tmp_path / "missing.db")), router=router)
+
+    result = planner.plan_next_action("Got a tumbler cup?")
+    assert result.intent == Intent.PRODUCT_INFO
+    assert result.action == Action.USE_PRODUCT_SEARCH
+    assert result.extracted_data == {'query': "Got a tumbler cup?"}
+
+    result = planner.plan_next_action("is your cafe open")
+    assert result.intent == Intent.OUTLET_INFO
+    assert result.action == Action.ASK_FOR_INFO
+
+    assert planner.plan_next_action("hello thanks").action == Action.RESPOND_DIRECTLY
+    # Pattern matches never reach the router
+    assert planner.plan_next_action("What is 2 + 2?").action == Action.USE_CALCULATOR
+    assert router.stats()["considered"] == 3
+
+
+@pytest.mark.asyncio
+async def test_async_planner_embeds_off_the_event_loop(encode, tmp_path):
+    threads = []
+
+    def recording_encode(texts):
+        threads.append(threading.get_ident())
+        return encode(texts)
+
+    router = EmbeddingIntentRouter(encode=recording_encode, examples=EXAMPLES, min_score=0.3, min_margin=0.05)
+    router.load()
+    planner = AgenticPlanner(Gazetteer(database_path=str(tmp_path / "missing.db")), router=router)
+    threads.clear()
+
+    result = await planner.aplan_next_action("Got a tumbler cup?")
+    assert result.action == Action.USE_PRODUCT_SEARCH
+    assert threads and threading.get_ident() not in threads
+    assert (await planner.aplan_next_action("What is 2 + 2?")).action == Action.USE_CALCULATOR
+    assert router.stats()["considered"] == 1
@@ -0,0 +1,99 @@
+"""
+Tests for the BM25 index and product filter columns, including the saved
+array form that workers memory-map at startup.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from utils.lexical import BM25Index, tokenize
+from utils.manifest import load_arrays, save_arrays
+from utils.product_filters import ProductAttributeIndex, ProductFilters
+
+PRODUCTS = [
+    {"name": "ZUS All-Can Tumbler", "category": "Tumbler", "price": 105.0, "colors": ["Thunder Blue", "Black"],
+     "description": "Stainless steel tumbler for hot and cold drinks"},
+    {"name": "ZUS OG Cup", "category": "Cup", "price": 55.0, "colors": ["White"],
+     "description": "Ceramic cup for your daily coffee"},
+    {"name": "ZUS Frozee Cold Cup", "category": "Cup", "price": 59.0, "colors": ["Ocean Blue"],
+     "description": "Double wall cold cup for iced drinks"},
+    {"name": "ZUS Aqua Bottle", "category": "Bottle", "price": 79.0, "colors": ["Mint"],
+     "description": "Bottle that keeps water cold all day"},
+]
+
+
+def build():
+    lexical, attributes = BM25Index(), ProductAttributeIndex()
+    for doc_id, product in enumerate(PRODUCTS):
+        lexical.add(doc_id, tokenize(f"{product['name']} {product['description']}"))
+        attributes.add(doc_id, product)
+    return lexical, attributes
+
+
+def saved(tmp_path, index, cls):
+    meta, arrays = index.to_arrays()
+    save_arrays(str(tmp_path / "bundle"), meta, arrays)
+    meta, arrays = load_arrays(str(tmp_path / "bundle"))
+    assert all(isinstance(array, np.memmap) for array in arrays.values())
+    return cls.from_arrays(meta, arrays)
+
+
+def test_tokenize_hyphenated_words():
+    assert tokenize("All-Can") == ["all-can", "all", "can", "allcan"]
+
+
+def test_bm25_ranks_matching_documents():
+    lexical, _ = build()
+    ranked = [doc_id for doc_id, _ in lexical.search("cold cup", 4)]
+    assert ranked[0] == 2
+    assert set(ranked) == {0, 1, 2, 3}
+    assert {doc_id for doc_id, _ in lexical.search("cup", 4)} == {1, 2}
+    assert [doc_id for doc_id, _ in lexical.search("cold", 4, allowed=np.array([1, 3]))] == [3]
+    assert lexical.search("espresso", 4) == []
+
+
+@pytest.mark.parametrize("query", ["cold cup", "allcan tumbler", "blue bottle", "coffee"])
+def test_loaded_bm25_matches_built(tmp_path, query):
+    lexical, _ = build()
+    loaded = saved(tmp_path, lexical, BM25Index)
+    assert loaded.search(query, 4) == pytest.approx(lexical.search(query, 4))
+    assert len(loaded) == len(lexical)
+
+
+def test_loaded_bm25_can_grow(tmp_path):
+    lexical, _ = build()
+    loaded = saved(tmp_path, lexical, BM25Index)
+    extra = tokenize("ZUS Cold Brew Flask")
+    lexical.add(4, extra)
+    loaded.add(4, extra)
+    assert loaded.search("cold flask", 5) == pytest.approx(lexical.search("cold flask", 5))
+
+
+@pytest.mark.parametrize("filters", [
+    ProductFilters(category="cup"),
+    ProductFilters(color="blue"),
+    ProductFilters(color="thunder blue", max_price=200),
+    ProductFilters(min_price=60, max_price=100),
+    ProductFilters(category="cup", min_price=56),
+])
+def test_loaded_attributes_match_built(tmp_path, filters):
+    _, attributes = build()
+    loaded = saved(tmp_path, attributes, ProductAttributeIndex)
+    assert loaded.select(filters).tolist() == attributes.select(filters).tolist()
+
+
+def test_select_filters():
+    _, attributes = build()
+    assert attributes.select(ProductFilters(color="blue")).tolist() == [0, 2]
+    assert attributes.select(ProductFilters(category="Cup", max_price=56)).tolist() == [1]
+
+
+def test_incomplete_bundle_is_ignored(tmp_path):
+    lexical, _ = build()
+    meta, arrays = lexical.to_arrays()
+    prefix = str(tmp_path / "bundle")
+    save_arrays(prefix, meta, arrays)
+    # An array replaced by a later save that didn't get to write its JSON
+    np.save(prefix + ".tfs.npy", np.zeros(3, dtype="int32"))
+    assert load_arrays(prefix) is None
+    assert load_arrays(str(tmp_path / "missing")) is None
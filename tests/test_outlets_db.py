@@ -0,0 +1,174 @@
+"""
+Tests for the outlets schema: upgrading databases created by older
+versions, and the bulk loader's upsert and prune.
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from utils.database import MIGRATIONS, _set_sqlite_pragmas, init_db, set_weekly_hours
+from utils.ingest import upsert_outlets
+
+LEGACY_OUTLETS = [
+    ("Alpha", "1 Jalan Alpha, Bangsar", "08:00", "22:00", '["Delivery"]', 3.13, 101.67),
+    ("Beta", "2 Jalan Beta, Cheras", "18:00", "02:00", '["Dine-in", "Takeaway"]', 3.08, 101.74),
+]
+
+
+def derived_counts(conn):
+    """Rows the data migrations (1-4) derive from outlets, in MIGRATIONS order"""
+    return [
+        conn.execute(text("SELECT COUNT(*) FROM outlet_services")).scalar(),
+        # MATCH reads the index itself rather than the external content table
+        conn.execute(text("SELECT COUNT(*) FROM outlets_fts WHERE outlets_fts MATCH 'jalan'")).scalar(),
+        conn.execute(text("SELECT COUNT(DISTINCT outlet_id) FROM outlet_hours")).scalar(),
+        conn.execute(text("SELECT COUNT(*) FROM outlets_rtree")).scalar(),
+    ]
+
+
+@pytest.mark.parametrize("version", range(len(MIGRATIONS) + 1))
+def test_migrates_from_each_user_version(tmp_path, version):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE outlets (id INTEGER PRIMARY KEY, name VARCHAR, address VARCHAR, "
+            "opening_time VARCHAR, closing_time VARCHAR, services VARCHAR, latitude FLOAT, longitude FLOAT)"
+        ))
+        conn.execute(
+            text("INSERT INTO outlets (name, address, opening_time, closing_time, services, latitude, longitude) "
+                 "VALUES (:name, :address, :opening, :closing, :services, :lat, :lon)"),
+            [dict(zip(["name", "address", "opening", "closing", "services", "lat", "lon"], row))
+             for row in LEGACY_OUTLETS],
+        )
+        conn.execute(text(f"PRAGMA user_version = {version}"))
+
+    init_db(seed=False, bind=engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA user_version")).scalar() == len(MIGRATIONS)
+        # Migrations up to the database's version were already applied and
+        # are not repeated; the rest backfill both outlets
+        expected = [0 if target <= version else 2 for target in range(1, 5)]
+        assert [min(count, 2) for count in derived_counts(conn)] == expected
+        if version < 3:
+            # Beta's overnight hours spill into the next morning
+            rows = conn.execute(text(
+                "SELECT open_min, close_min FROM outlet_hours h JOIN outlets o ON o.id = h.outlet_id "
+                "WHERE o.name = 'Beta' AND weekday = 2 ORDER BY open_min"
+            )).fetchall()
+            assert [tuple(row) for row in rows] == [(0, 120), (1080, 1440)]
+    engine.dispose()
+
+
+def record(name, **overrides):
+    outlet = {
+        "name": name,
+        "address": f"1 Jalan {name}, Kuala Lumpur",
+        "opening_time": "08:00",
+        "closing_time": "22:00",
+        "services": ["Delivery"],
+        "latitude": 3.1,
+        "longitude": 101.6,
+    }
+    outlet.update(overrides)
+    return outlet
+
+
+def outlets(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT name, closing_time, services FROM outlets ORDER BY name"))
+        return {name: (closing, json.loads(services) if services else []) for name, closing, services in rows}
+
+
+@pytest.fixture
+def empty_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outlets.db'}")
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    init_db(seed=False, bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_upsert_inserts_updates_and_skips_unchanged(empty_db):
+    stats = upsert_outlets(empty_db, [record("A"), record("B"), record("C")], chunk_size=2)
+    assert stats == {"read": 3, "skipped": 0, "written": 3, "deleted": 0}
+
+    stats = upsert_outlets(empty_db, [record("A"), record("B", closing_time="23:00"), record("C")])
+    assert stats == {"read": 3, "skipped": 0, "written": 1, "deleted": 0}
+    assert outlets(empty_db)["B"] == ("23:00", ["Delivery"])
+    with empty_db.connect() as conn:
+        close_min = conn.execute(text(
+            "SELECT DISTINCT close_min FROM outlet_hours h JOIN outlets o ON o.id = h.outlet_id WHERE o.name = 'B'"
+        )).scalar()
+    assert close_min == 23 * 60
+
+
+def test_upsert_skips_invalid_records(empty_db):
+    records = [record("A"), {"name": "No address"}, record("B", latitude="north"), record("C", services="Dine-in; Takeaway")]
+    stats = upsert_outlets(empty_db, records)
+    assert stats == {"read": 4, "skipped": 2, "written": 2, "deleted": 0}
+    assert outlets(empty_db)["C"] == ("22:00", ["Dine-in", "Takeaway"])
+
+
+def test_prune_deletes_outlets_missing_from_the_feed(empty_db):
+    upsert_outlets(empty_db, [record("A"), record("B"), record("C")])
+    stats = upsert_outlets(empty_db, [record("A"), record("C")], prune=True)
+    assert stats["deleted"] == 1
+    assert set(outlets(empty_db)) == {"A", "C"}
+    with empty_db.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(DISTINCT outlet_id) FROM outlet_services")).scalar() == 2
+
+
+@pytest.mark.parametrize("feed", [[], [{"name": "No address"}]])
+def test_prune_keeps_outlets_when_the_feed_is_empty_or_unreadable(empty_db, feed):
+    upsert_outlets(empty_db, [record("A"), record("B")])
+    stats = upsert_outlets(empty_db, feed, prune=True)
+    assert stats["deleted"] == 0
+    assert set(outlets(empty_db)) == {"A", "B"}
+
+
+def test_upsert_keeps_weekly_hours_unless_times_change(empty_db):
+    upsert_outlets(empty_db, [record("A")])
+    with Session(empty_db) as db:
+        outlet_id = db.execute(text("SELECT id FROM outlets WHERE name = 'A'")).scalar()
+        set_weekly_hours(db, outlet_id, {0: ("10:00", "16:00"), 6: ("09:00", "23:00")})
+        db.commit()
+
+    def hours():
+        with empty_db.connect() as conn:
+            return conn.execute(text(
+                "SELECT weekday, open_min, close_min FROM outlet_hours WHERE outlet_id = :id ORDER BY weekday"
+            ), {"id": outlet_id}).fetchall()
+
+    weekly = [(0, 600, 960), (6, 540, 1380)]
+    assert hours() == weekly
+
+    # Only the address changes, but the upsert assigns every column
+    assert upsert_outlets(empty_db, [record("A", address="9 Jalan Baru, Bangsar")])["written"] == 1
+    assert hours() == weekly
+    with empty_db.connect() as conn:
+        assert conn.execute(text("SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH 'baru'")).scalar() == outlet_id
+        assert conn.execute(text("SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH 'kuala'")).scalar() is None
+
+    upsert_outlets(empty_db, [record("A", address="9 Jalan Baru, Bangsar", closing_time="20:00")])
+    assert hours() == [(day, 480, 1200) for day in range(7)]
+
+
+def test_migration_replaces_update_triggers_that_fire_on_unchanged_values(empty_db):
+    with empty_db.begin() as conn:
+        conn.execute(text("DROP TRIGGER outlet_hours_update"))
+        conn.execute(text(
+            "CREATE TRIGGER outlet_hours_update AFTER UPDATE OF id, opening_time, closing_time ON outlets "
+            "BEGIN DELETE FROM outlet_hours WHERE outlet_id = OLD.id; END"
+        ))
+        # Before migration 5
+        conn.execute(text("PRAGMA user_version = 4"))
+    init_db(seed=False, bind=empty_db)
+    with empty_db.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'outlet_hours_update'")).scalar()
+    assert "WHEN OLD.id IS NOT NEW.id" in sql
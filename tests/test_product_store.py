@@ -0,0 +1,96 @@
+"""
+Tests for the memory-mapped product metadata store: rows written and read
+back through the offsets file, appends, and rewrites after a catalog sync.
+"""
+
+import os
+
+import pytest
+from utils.product_store import OFFSET, ProductMetadataStore
+
+PRODUCTS = [
+    {"name": "ZUS All-Can Tumbler", "price": 105.0, "colors": ["Thunder Blue", "Black"]},
+    {"name": "ZUS OG Cup", "price": 55.0, "description": "Café-style ceramic cup ☕"},
+    {"name": "ZUS Frozee Cold Cup", "price": 59.0, "colors": []},
+]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "products.dat"), str(tmp_path / "products.idx")
+
+
+def test_new_store_is_empty(paths):
+    store = ProductMetadataStore(*paths)
+    assert not store.exists()
+    assert len(store) == 0
+    assert list(store) == []
+    with pytest.raises(IndexError):
+        store[0]
+
+
+def test_rows_round_trip_through_the_files(paths):
+    store = ProductMetadataStore(*paths)
+    store.extend(PRODUCTS)
+    # Pending rows are readable before they are flushed
+    assert store[1] == PRODUCTS[1]
+    store.flush()
+
+    reopened = ProductMetadataStore(*paths)
+    assert reopened.exists()
+    assert len(reopened) == 3
+    assert list(reopened) == PRODUCTS
+    assert reopened[-1] == PRODUCTS[2]
+    with pytest.raises(IndexError):
+        reopened[3]
+    with pytest.raises(IndexError):
+        reopened[-4]
+    # n + 1 row boundaries
+    assert os.path.getsize(paths[1]) == 4 * OFFSET.size
+
+
+def test_appends_extend_the_files(paths):
+    store = ProductMetadataStore(*paths)
+    store.extend(PRODUCTS[:2])
+    store.flush()
+    store.extend(PRODUCTS[2:])
+    assert len(store) == 3
+    assert store[2] == PRODUCTS[2]
+    store.flush()
+    assert list(ProductMetadataStore(*paths)) == PRODUCTS
+
+
+def test_rewrite_replaces_every_row(paths):
+    store = ProductMetadataStore(*paths)
+    store.extend(PRODUCTS)
+    store.flush()
+    other_worker = ProductMetadataStore(*paths)
+
+    synced = [dict(PRODUCTS[2], price=49.0), {"name": "ZUS Aqua Bottle", "price": 79.0}]
+    store.extend([{"name": "discarded"}])
+    store.rewrite(synced)
+    assert list(store) == synced
+    assert list(ProductMetadataStore(*paths)) == synced
+
+    # A worker that mapped the old files keeps reading them until it reopens
+    assert len(other_worker) == 3
+    other_worker.reopen()
+    assert list(other_worker) == synced
+
+    store.rewrite([])
+    assert len(store) == 0
+    assert store.exists()
+
+
+def test_reopen_keeps_unflushed_rows(paths):
+    store = ProductMetadataStore(*paths)
+    store.extend(PRODUCTS[:1])
+    store.reopen()
+    assert list(store) == PRODUCTS[:1]
+
+
+def test_rewrite_leaves_no_temp_files(paths, tmp_path):
+    store = ProductMetadataStore(*paths)
+    store.rewrite(PRODUCTS)
+    store.rewrite(PRODUCTS[:1])
+    assert sorted(os.listdir(tmp_path)) == ["products.dat", "products.idx"]
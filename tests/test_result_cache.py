@@ -0,0 +1,70 @@
+"""
+Tests for the outlet result cache: rows are reused while the outlets table
+is unchanged, and any write bumps table_versions so the next query is fresh.
+"""
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from utils.database import execute_cached, get_table_version, result_cache, set_weekly_hours
+from utils.ingest import upsert_outlets
+
+NAMES_SQL = "SELECT name FROM outlets ORDER BY name"
+SUNDAY_SQL = "SELECT outlet_id FROM outlet_hours WHERE weekday = :weekday ORDER BY outlet_id"
+
+
+@pytest.fixture
+def async_engine(outlets_db):
+    """The application's async access to the test database, with an empty result cache"""
+    path, _ = outlets_db
+    result_cache.clear()
+    # No pooled connections left to close after the test's event loop ends
+    yield create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    result_cache.clear()
+
+
+def names(rows):
+    return [row["name"].replace("ZUS Coffee - ", "") for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_table_serves_cached_rows(async_engine):
+    async with AsyncSession(async_engine) as db:
+        first = await execute_cached(db, NAMES_SQL)
+        hits = result_cache.stats()["hits"]
+        assert await execute_cached(db, NAMES_SQL) is first
+        assert result_cache.stats()["hits"] == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_outlet_writes_invalidate_cached_rows(async_engine, outlets_db):
+    _, engine = outlets_db
+    async with AsyncSession(async_engine) as db:
+        version = await get_table_version(db)
+        assert len(await execute_cached(db, NAMES_SQL)) == 4
+
+        # Written through another connection, as another worker or the loader would
+        upsert_outlets(engine, [{"name": "ZUS Coffee - Cheras", "address": "1 Jalan Cheras, Kuala Lumpur"}])
+        assert await get_table_version(db) > version
+        assert "Cheras" in names(await execute_cached(db, NAMES_SQL))
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM outlets WHERE name = 'ZUS Coffee - SS2'"))
+        assert "SS2" not in names(await execute_cached(db, NAMES_SQL))
+
+
+@pytest.mark.asyncio
+async def test_hours_writes_invalidate_cached_rows(async_engine, outlets_db):
+    _, engine = outlets_db
+    async with AsyncSession(async_engine) as db:
+        assert len(await execute_cached(db, SUNDAY_SQL, {"weekday": 0})) == 4
+
+        with Session(engine) as session:
+            set_weekly_hours(session, 1, {1: ("08:00", "17:00")})
+            session.commit()
+        rows = await execute_cached(db, SUNDAY_SQL, {"weekday": 0})
+        assert [row["outlet_id"] for row in rows] == [2, 3, 4]
@@ -0,0 +1,107 @@
+"""
+Tests for the bounded session history store: LRU cap, idle expiry,
+token-budget trimming into a summary message, and the reported metrics.
+"""
+
+import pytest
+
+pytest.importorskip("langchain_community")
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from session_store import SUMMARY_PREFIX, SessionHistoryStore, estimate_tokens, is_summary
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def add_turn(history, user, reply):
+    history.add_messages([HumanMessage(content=user), AIMessage(content=reply)])
+
+
+def test_lru_cap_evicts_least_recently_used():
+    store = SessionHistoryStore(max_sessions=2, ttl=0, token_budget=0)
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert "a" in store and "c" in store
+    assert "b" not in store
+    assert store.stats()["evictions"] == 1
+
+
+def test_idle_sessions_expire():
+    clock = Clock()
+    store = SessionHistoryStore(max_sessions=10, ttl=60, token_budget=0, clock=clock)
+    add_turn(store.get("a"), "hi", "hello")
+    clock.now = 30
+    store.get("b")
+    clock.now = 70
+    store.get("b")
+    assert "a" not in store
+    assert "b" in store
+    assert store.stats()["expirations"] == 1
+    # An expired session starts over
+    assert store.get("a").messages == []
+
+
+def test_history_is_trimmed_to_the_budget_and_keeps_what_the_user_said():
+    store = SessionHistoryStore(max_sessions=10, ttl=0, token_budget=120, summary_tokens=40)
+    history = store.get("s")
+    add_turn(history, "my name is Alice", "Nice to meet you, Alice!")
+    for i in range(10):
+        add_turn(history, f"question number {i} " + "x" * 40, "answer " + "y" * 80)
+        history = store.get("s")
+
+    messages = history.messages
+    assert sum(estimate_tokens(m) for m in messages) <= 120
+    assert is_summary(messages[0])
+    assert "my name is Alice" in messages[0].content
+    # The latest turn is always kept whole
+    assert messages[-2].content.startswith("question number 9")
+    assert isinstance(messages[-1], AIMessage)
+    assert sum(1 for m in messages if is_summary(m)) == 1
+
+
+def test_latest_turn_is_kept_even_over_budget():
+    store = SessionHistoryStore(max_sessions=10, ttl=0, token_budget=10)
+    history = store.get("s")
+    add_turn(history, "a" * 200, "b" * 200)
+    assert len(store.get("s").messages) == 2
+
+
+def test_summary_stays_within_its_share():
+    store = SessionHistoryStore(max_sessions=10, ttl=0, token_budget=60, summary_tokens=20)
+    history = store.get("s")
+    for i in range(6):
+        add_turn(history, f"turn {i} " + "z" * 60, "ok")
+        history = store.get("s")
+    summary = history.messages[0]
+    assert isinstance(summary, SystemMessage) and summary.content.startswith(SUMMARY_PREFIX)
+    assert estimate_tokens(summary) <= 20
+    assert summary.content.startswith(SUMMARY_PREFIX + "turn 0")
+
+
+def test_stats_report_prompt_tokens_and_trims():
+    store = SessionHistoryStore(max_sessions=10, ttl=0, token_budget=100, summary_tokens=25)
+    history = store.get("s")
+    for i in range(5):
+        add_turn(history, "w" * 60, "v" * 60)
+        history = store.get("s")
+    stats = store.stats()
+    assert stats["sessions"] == 1
+    assert stats["created"] == 1
+    assert stats["trims"] > 0 and stats["trimmed_messages"] > 0
+    assert stats["prompt_tokens_max"] <= 100
+    assert stats["stored_tokens"] == stats["prompt_tokens_last"]
+    assert 0 < stats["prompt_tokens_mean"] <= stats["prompt_tokens_max"]
+
+
+def test_clear_drops_session():
+    store = SessionHistoryStore(max_sessions=10, ttl=0, token_budget=0)
+    add_turn(store.get("s"), "hi", "hello")
+    store.clear("s")
+    assert len(store) == 0
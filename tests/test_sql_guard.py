@@ -0,0 +1,103 @@
+"""
+Tests for the guard that checks and runs generated SQL: each rejection
+reason, the row cap, and parsing of SQLite's query plans.
+"""
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from utils.sql_guard import (
+    FULL_SCAN, MULTIPLE_STATEMENTS, NOT_SELECT, PARSE_ERROR, TIMEOUT, UNKNOWN_TABLE,
+    SQLGuard, SQLRejected,
+)
+
+KNOWN_TABLES = ["outlets", "outlet_services", "outlet_hours", "outlets_fts", "outlets_rtree"]
+
+
+@pytest.fixture
+def guard(outlets_db):
+    path, _ = outlets_db
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE staff (id INTEGER PRIMARY KEY, salary INTEGER)")
+    conn.commit()
+    conn.close()
+    return SQLGuard(path, KNOWN_TABLES, max_rows=3, time_budget_ms=100, max_scan_rows=2, workers=1)
+
+
+def rejection(guard, sql, params=None):
+    with pytest.raises(SQLRejected) as excinfo:
+        guard.execute_sync(sql, params)
+    return excinfo.value.reason
+
+
+def test_runs_indexed_select(guard):
+    rows = guard.execute_sync(
+        "SELECT name FROM outlets WHERE id IN (SELECT outlet_id FROM outlet_services WHERE code = :code)",
+        {"code": "delivery"},
+    )
+    assert {row["name"] for row in rows} == {
+        "ZUS Coffee - SS2", "ZUS Coffee - Uptown Damansara", "ZUS Coffee - Menara UOA Bangsar"
+    }
+    assert guard.stats()["executed"] == 1
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM outlets",
+    "UPDATE outlets SET name = 'x'",
+    "DROP TABLE outlets",
+    "/* comment */ INSERT INTO outlets (name) VALUES ('x')",
+    "PRAGMA table_info(outlets)",
+])
+def test_rejects_statements_other_than_select(guard, sql):
+    assert rejection(guard, sql) == NOT_SELECT
+
+
+def test_rejects_unknown_tables(guard):
+    assert rejection(guard, "SELECT * FROM staff WHERE id = 1") == UNKNOWN_TABLE
+    assert rejection(guard, "SELECT name FROM sqlite_master") == UNKNOWN_TABLE
+    assert rejection(guard, "SELECT * FROM outlets WHERE id IN (SELECT id FROM staff)") == UNKNOWN_TABLE
+
+
+def test_rejects_everything_but_reads(guard):
+    assert rejection(guard, "SELECT * FROM outlets WHERE id = 1; DELETE FROM outlets") == MULTIPLE_STATEMENTS
+    assert rejection(guard, "SELECT * FROM nowhere") == PARSE_ERROR
+
+
+def test_rejects_full_scans_of_large_tables(guard):
+    # Four outlets, more than max_scan_rows
+    assert rejection(guard, "SELECT * FROM outlets WHERE address LIKE '%Bangsar%'") == FULL_SCAN
+    assert rejection(guard, "SELECT o.name FROM outlets o WHERE o.closing_time > '21:00'") == FULL_SCAN
+    # Index lookups are fine
+    assert guard.execute_sync("SELECT name FROM outlets WHERE id = 1")
+
+
+def test_recognises_scans_in_old_and_new_plan_formats(guard):
+    conn = sqlite3.connect(guard.database_path)
+    for detail in ("SCAN outlets", "SCAN TABLE outlets"):
+        with pytest.raises(SQLRejected) as excinfo:
+            guard._check_scans(conn, "SELECT * FROM outlets", [detail])
+        assert excinfo.value.reason == FULL_SCAN
+    guard._check_scans(conn, "SELECT * FROM outlets_fts", ["SCAN TABLE outlets_fts VIRTUAL TABLE INDEX 0:M2"])
+    conn.close()
+
+
+def test_stops_queries_over_the_time_budget(guard):
+    sql = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT count(*) FROM n"
+    assert rejection(guard, sql) == TIMEOUT
+    assert guard.stats()["rejections"][TIMEOUT] == 1
+
+
+def test_caps_returned_rows(guard):
+    sql = "SELECT outlet_id, weekday FROM outlet_hours WHERE weekday >= :weekday"
+    guard.max_scan_rows = 1000
+    assert len(guard.execute_sync(sql, {"weekday": 0})) == 3
+
+
+def test_connection_is_read_only(guard):
+    with pytest.raises(SQLRejected):
+        guard.execute_sync("WITH d AS (DELETE FROM outlets RETURNING id) SELECT * FROM d")
+    conn = sqlite3.connect(guard.database_path)
+    assert conn.execute("SELECT count(*) FROM outlets").fetchone()[0] == 4
+    conn.close()
@@ -0,0 +1,123 @@
+"""
+Tests for the rule-based Text2SQL fast path: the SQL it compiles for the
+question shapes it recognises, and that the SQL runs through the guard.
+"""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from utils.ingest import upsert_outlets
+from utils.sql_guard import SQLGuard
+from utils.sql_rules import PARAM_RE, RuleBasedSQLCompiler
+
+HOURS = "id IN (SELECT outlet_id FROM outlet_hours WHERE {})"
+FTS = "id IN (SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH :{})"
+SERVICE = "id IN (SELECT outlet_id FROM outlet_services WHERE code = :{})"
+
+
+@pytest.fixture
+def compiler():
+    # Monday, 10:00
+    return RuleBasedSQLCompiler(clock=lambda: (1, 600))
+
+
+def where(*conditions):
+    return "SELECT * FROM outlets WHERE " + " AND ".join(conditions)
+
+
+@pytest.mark.parametrize("question, sql, params", [
+    (
+        "Show me outlets in Bangsar",
+        where(FTS.format("location_0")),
+        {"location_0": 'address : "bangsar"'},
+    ),
+    (
+        "Which outlets are open after 8pm?",
+        where(HOURS.format("weekday = :weekday AND close_min > :after_0")),
+        {"after_0": 1200, "weekday": 1},
+    ),
+    (
+        "outlets in Kuala Lumpur that offer takeaway",
+        where(SERVICE.format("service_0"), FTS.format("location_0")),
+        {"service_0": "takeaway", "location_0": 'address : "kuala lumpur"'},
+    ),
+    (
+        "any outlets open after 1am on friday?",
+        where(HOURS.format("weekday = :after_day_0 AND open_min = 0 AND close_min > :after_0")),
+        {"after_day_0": 6, "after_0": 60},
+    ),
+    (
+        "Which outlets are open until 10pm?",
+        where(HOURS.format("weekday = :weekday AND close_min >= :until_0")),
+        {"until_0": 1320, "weekday": 1},
+    ),
+    (
+        "outlets open till 2am",
+        where(HOURS.format("weekday = :until_day_0 AND open_min = 0 AND close_min >= :until_0")),
+        {"until_day_0": 2, "until_0": 120},
+    ),
+    (
+        "outlets open until midnight",
+        where(HOURS.format("weekday = :weekday AND close_min >= :until_0")),
+        {"until_0": 1440, "weekday": 1},
+    ),
+    (
+        "outlets open now",
+        where(HOURS.format("weekday = :weekday AND open_min <= :minute_0 AND close_min > :minute_0")),
+        {"minute_0": 600, "weekday": 1},
+    ),
+    (
+        "outlets in SS 2 open at 9:30 pm on sunday",
+        where(HOURS.format("weekday = :weekday AND open_min <= :minute_0 AND close_min > :minute_0"),
+              FTS.format("location_0")),
+        {"minute_0": 1290, "weekday": 0, "location_0": 'address : "ss 2"'},
+    ),
+])
+def test_compiles_recognised_questions(compiler, question, sql, params):
+    assert compiler.compile(question) == (sql, params)
+    # Only the parameters the SQL uses are bound, so result cache keys match
+    assert set(params) == set(PARAM_RE.findall(sql))
+
+
+@pytest.mark.parametrize("question", [
+    "How many outlets are in Kuala Lumpur?",
+    "Which outlet closes the latest?",
+    "outlets open on monday and friday",
+])
+def test_falls_back_on_other_questions(compiler, question):
+    assert compiler.compile(question) is None
+
+
+def test_tracks_coverage(compiler):
+    compiler.compile("Show me outlets in Bangsar")
+    compiler.compile("How many outlets are in Kuala Lumpur?")
+    assert compiler.stats() == {"fast_path": 1, "llm_fallback": 1, "coverage": 0.5}
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Show me outlets in Bangsar", {"Menara UOA Bangsar"}),
+    ("Which outlets are open after 9:45pm?", {"Uptown Damansara", "Night Owl", "Late Bird"}),
+    ("outlets in Kuala Lumpur that offer delivery", {"Menara UOA Bangsar"}),
+    ("outlets in Petaling Jaya open at 7:15 am", {"SS2", "Uptown Damansara"}),
+    ("any outlets open after 1am on friday?", {"Night Owl", "Late Bird"}),
+    # SS2 and M3 close at exactly 21:40
+    ("Which outlets are open until 9:40pm?",
+     {"SS2", "Uptown Damansara", "M3 Shopping Mall", "Night Owl", "Late Bird"}),
+    ("Which outlets are open after 9:40pm?", {"Uptown Damansara", "Night Owl", "Late Bird"}),
+    # Night Owl closes at exactly 02:00, Late Bird at 01:59
+    ("outlets open till 2am", {"Night Owl"}),
+    ("any outlets open after 1:59 am", {"Night Owl"}),
+    ("outlets open until midnight", {"Night Owl", "Late Bird"}),
+])
+def test_compiled_sql_passes_the_guard(compiler, outlets_db, question, expected):
+    path, engine = outlets_db
+    upsert_outlets(engine, [
+        {"name": "ZUS Coffee - Night Owl", "address": "1 Jalan Malam, Cheras", "opening_time": "18:00",
+         "closing_time": "02:00"},
+        {"name": "ZUS Coffee - Late Bird", "address": "2 Jalan Malam, Cheras", "opening_time": "18:00",
+         "closing_time": "01:59"},
+    ])
+    guard = SQLGuard(path, ["outlets", "outlet_services", "outlet_hours", "outlets_fts"],
+                     max_rows=50, time_budget_ms=1000, max_scan_rows=2, workers=1)
+    rows = guard.execute_sync(*compiler.compile(question))
+    assert {row["name"].replace("ZUS Coffee - ", "") for row in rows} == expected
@@ -0,0 +1,82 @@
+"""
+Tests for the product summary cache: invalidation when a product changes,
+and the optional SQLite tier across restarts and full rebuilds.
+"""
+
+from utils.cache import SummaryCache
+
+
+def disk_cache(tmp_path, maxsize=16):
+    return SummaryCache(maxsize=maxsize, db_file=str(tmp_path / "summary_cache.db"))
+
+
+def test_key_uses_normalized_query_and_result_order():
+    cache = SummaryCache()
+    cache.set("Blue  Tumbler", ["a", "b"], "two tumblers")
+    assert cache.get("blue tumbler", ["a", "b"]) == "two tumblers"
+    assert cache.get("blue tumbler", ["b", "a"]) is None
+
+
+def test_changed_product_drops_every_summary_mentioning_it():
+    cache = SummaryCache()
+    cache.set("tumbler", ["a", "b"], "a and b")
+    cache.set("cup", ["b", "c"], "b and c")
+    cache.set("mug", ["c"], "c")
+
+    cache.invalidate_products(["b"])
+    assert cache.get("tumbler", ["a", "b"]) is None
+    assert cache.get("cup", ["b", "c"]) is None
+    assert cache.get("mug", ["c"]) == "c"
+    assert cache.stats()["invalidations"] == 2
+    # A new summary for the changed product is cached again
+    cache.set("tumbler", ["a", "b"], "a and the new b")
+    assert cache.get("tumbler", ["a", "b"]) == "a and the new b"
+
+
+def test_eviction_leaves_no_stale_reverse_index():
+    cache = SummaryCache(maxsize=1)
+    cache.set("tumbler", ["a"], "a")
+    cache.set("cup", ["b"], "b")
+    assert "a" not in cache._keys_by_product
+    cache.invalidate_products(["a"])
+    assert cache.get("cup", ["b"]) == "b"
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    disk_cache(tmp_path).set("tumbler", ["a", "b"], "a and b")
+
+    restarted = disk_cache(tmp_path)
+    assert restarted.get("tumbler", ["a", "b"]) == "a and b"
+    assert restarted.stats()["disk_hits"] == 1
+    # Served from memory afterwards
+    assert restarted.get("tumbler", ["a", "b"]) == "a and b"
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_drops_summaries_of_changed_products(tmp_path):
+    cache = disk_cache(tmp_path)
+    cache.set("tumbler", ["a", "b"], "a and b")
+    cache.set("mug", ["c"], "c")
+    # Another worker's catalog sync changed b
+    disk_cache(tmp_path).invalidate_products(["b"])
+
+    restarted = disk_cache(tmp_path)
+    assert restarted.get("tumbler", ["a", "b"]) is None
+    assert restarted.get("mug", ["c"]) == "c"
+
+
+def test_evicted_summaries_come_back_from_disk(tmp_path):
+    cache = disk_cache(tmp_path, maxsize=1)
+    cache.set("tumbler", ["a"], "a")
+    cache.set("cup", ["b"], "b")
+    assert cache.get("tumbler", ["a"]) == "a"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_full_rebuild_clears_both_tiers(tmp_path):
+    cache = disk_cache(tmp_path)
+    cache.set("tumbler", ["a"], "a")
+    # What load_or_create_index does before rebuilding from scratch
+    cache.clear()
+    assert cache.get("tumbler", ["a"]) is None
+    assert disk_cache(tmp_path).get("tumbler", ["a"]) is None
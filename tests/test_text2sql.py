@@ -0,0 +1,163 @@
+"""
+Tests for Text2SQL generation: lifting literals into question templates,
+the checks on LLM-written SQL, and the template cache.
+"""
+
+import logging
+import re
+
+import pytest
+
+pytest.importorskip("langchain_groq")
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from utils.sql_rules import PARAM_RE, RuleBasedSQLCompiler
+
+
+class FakeLLM:
+    """Answers prompts with SQL chosen by a function of the question template"""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    def __call__(self, prompt):
+        template = prompt.to_messages()[-1].content.split('"')[1]
+        self.calls.append(template)
+        return AIMessage(content=self.answer(template))
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    # The module builds a generator at import, and ChatGroq needs a key
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    from utils.text2sql import Text2SQLGenerator
+
+    generator = Text2SQLGenerator()
+    generator.rules = RuleBasedSQLCompiler(clock=lambda: (1, 600))
+    return generator
+
+
+def use_llm(generator, answer):
+    llm = FakeLLM(answer)
+    generator.llm = RunnableLambda(llm)
+    return llm
+
+
+def test_lift_shares_templates_between_values(generator):
+    bangsar = generator.rules.lift("How many outlets are in Bangsar?")
+    cheras = generator.rules.lift("How many outlets are in Cheras?")
+    assert bangsar.template == cheras.template == "how many outlets are in :location_0 ?"
+    assert bangsar.params == {"location_0": 'address : "bangsar"'}
+    assert cheras.params == {"location_0": 'address : "cheras"'}
+
+
+def test_lift_binds_the_next_day_after_midnight(generator):
+    evening = generator.rules.lift("How many outlets are open after 8pm?")
+    late = generator.rules.lift("How many outlets are open after 1am?")
+    assert evening.template == late.template == "how many outlets are open after :after_0 ?"
+    assert evening.params == {"after_0": 1200, "weekday": 1}
+    assert late.params == {"after_0": 60, "after_day_0": 2}
+
+
+def test_check_template_requires_every_placeholder(generator):
+    params = {"location_0": "x", "weekday": 1}
+    sql = "SELECT * FROM outlets WHERE id IN (SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH :location_0)"
+    assert generator._check_template(f"  {sql}\n", "outlets in :location_0", params) == sql
+    with pytest.raises(ValueError):
+        generator._check_template("SELECT * FROM outlets", "outlets in :location_0", params)
+    with pytest.raises(ValueError):
+        generator._check_template(sql + " AND id = :outlet_id", "outlets in :location_0", params)
+
+
+def prompt_examples(generator):
+    """(question template, sql) pairs from the prompt's examples"""
+    prompt = generator.sql_prompt.messages[-1].prompt.template
+    return re.findall(r'Q: "([^"]+)"\nA: (.+);', prompt)
+
+
+def test_prompt_examples_use_only_parameters_lift_binds(generator):
+    examples = prompt_examples(generator)
+    assert len(examples) >= 4
+    for template, sql in examples:
+        params = dict.fromkeys(PARAM_RE.findall(template))
+        if any(name.startswith(("after", "minute", "until")) for name in params):
+            # lift() binds today's weekday for hours conditions
+            params["weekday"] = None
+        assert generator._check_template(sql, template, params) == sql
+
+
+def test_latest_closing_question_is_answered_without_a_weekday(generator):
+    latest = dict(prompt_examples(generator))["Which outlet closes the latest?"]
+    llm = use_llm(generator, lambda template: latest)
+    assert generator.rules.lift("Which outlet closes the latest?").params == {}
+    assert generator.generate("Which outlet closes the latest?") == (latest, {})
+    assert len(llm.calls) == 1
+
+
+def test_cache_is_shared_by_questions_with_the_same_template(generator):
+    llm = use_llm(generator, lambda template: (
+        "SELECT COUNT(*) FROM outlets WHERE id IN "
+        "(SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH :location_0)"
+    ))
+    _, bangsar = generator.generate("How many outlets are in Bangsar?")
+    sql, cheras = generator.generate("How many outlets are in Cheras?")
+    assert len(llm.calls) == 1
+    assert bangsar == {"location_0": 'address : "bangsar"'}
+    assert cheras == {"location_0": 'address : "cheras"'}
+    assert ":location_0" in sql
+
+
+def test_cache_keeps_late_night_sql_apart(generator):
+    def answer(template):
+        # Written for whichever parameters the prompt listed
+        hours = "weekday = :weekday AND close_min > :after_0"
+        if "after_day_0" in answer.parameters:
+            hours = "weekday = :after_day_0 AND open_min = 0 AND close_min > :after_0"
+        return f"SELECT COUNT(*) FROM outlets WHERE id IN (SELECT outlet_id FROM outlet_hours WHERE {hours})"
+
+    prompts = generator._prompt_inputs
+
+    def record_parameters(template, params):
+        inputs = prompts(template, params)
+        answer.parameters = inputs["parameters"]
+        return inputs
+
+    generator._prompt_inputs = record_parameters
+    llm = use_llm(generator, answer)
+
+    late_sql, late = generator.generate("How many outlets are open after 1am?")
+    evening_sql, evening = generator.generate("How many outlets are open after 8pm?")
+    assert len(llm.calls) == 2
+    assert late == {"after_0": 60, "after_day_0": 2}
+    assert evening == {"after_0": 1200, "weekday": 1}
+    assert ":after_day_0" not in evening_sql
+
+    # Both are cached now
+    assert generator.generate("How many outlets are open after 2am?")[1] == {"after_0": 120, "after_day_0": 2}
+    assert generator.generate("How many outlets are open after 9pm?")[1] == {"after_0": 1260, "weekday": 1}
+    assert len(llm.calls) == 2
+
+
+def test_falls_back_to_full_text_search_and_logs(generator, caplog):
+    use_llm(generator, lambda template: "SELECT * FROM outlets WHERE name = 'Bangsar'")
+    with caplog.at_level(logging.WARNING, logger="utils.text2sql"):
+        sql, params = generator.generate("How many outlets are in Bangsar?")
+    assert "bm25(outlets_fts" in sql
+    assert '"bangsar"' in params["match"]
+    assert "Text2SQL generation failed" in caplog.text
+    assert "does not use the template parameters" in caplog.text
+    assert len(generator.sql_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_agenerate_uses_the_same_cache(generator):
+    llm = use_llm(generator, lambda template: (
+        "SELECT COUNT(*) FROM outlets WHERE id IN "
+        "(SELECT rowid FROM outlets_fts WHERE outlets_fts MATCH :location_0)"
+    ))
+    await generator.agenerate("How many outlets are in Bangsar?")
+    generator.generate("How many outlets are in Cheras?")
+    _, params = await generator.agenerate("How many outlets are in Damansara?")
+    assert len(llm.calls) == 1
+    assert params == {"location_0": 'address : "damansara"'}